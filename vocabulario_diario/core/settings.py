@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import tempfile
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -45,6 +46,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Métricas de SQL e tempo por view (só atua com LEARNING_METRICS['ENABLED'])
+    'learning.metrics.QueryMetricsMiddleware',
+    # Leituras do painel/catálogo nas réplicas (só atua com LEARNING_DB_REPLICAS['ALIASES'])
+    'learning.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -84,6 +89,22 @@ DATABASES = {
         'PASSWORD': 'Word_Learning',
         'HOST': 'localhost',
         'PORT': '3306',
+    },
+    # Réplicas de leitura (ver learning/routers.py e LEARNING_DB_REPLICAS abaixo), ex.:
+    # 'replica': {'ENGINE': 'django.db.backends.mysql', 'HOST': 'replica-1', ..., 'TEST': {'MIRROR': 'default'}},
+    # Para testar localmente com dois arquivos SQLite: --settings=core.settings_replica_sqlite
+}
+
+DATABASE_ROUTERS = ['learning.routers.PrimaryReplicaRouter']
+
+
+# Cache compartilhado pelos processos da máquina (web e run_workers): as versões do
+# progresso de learning/progress_cache.py precisam ser vistas por todos. Com vários
+# servidores, troque por Redis ou Memcached (django.core.cache.backends.redis.RedisCache).
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': Path(tempfile.gettempdir()) / 'vocabulario_diario_cache',
     }
 }
 
@@ -133,4 +154,67 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = 'login' #  Adicione esta linha no final para dizer ao Django qual é a nossa página de login
 LOGIN_REDIRECT_URL = 'home'   # Após um login bem-sucedido, redirecione o usuário para a URL com o nome home".
-LOGOUT_REDIRECT_URL = 'login' # Após o logout, redirecione o usuário de volta para a tela de login".
\ No newline at end of file
+LOGOUT_REDIRECT_URL = 'login' # Após o logout, redirecione o usuário de volta para a tela de login".
+
+# Serve as APIs JSON (check-answer, mark-as-correct, master-set, chart-data, reset-progress
+# e logout) com views assíncronas. Só faz diferença rodando pelo ASGI (core/asgi.py, ex.: uvicorn).
+LEARNING_ASYNC_API = False
+
+# Algoritmo de repetição espaçada (ver learning/scheduling.py): 'linear', 'sm2' ou 'exponential',
+# com os parâmetros do algoritmo em OPTIONS. Depois de trocar, rode o reschedule_reviews.
+LEARNING_SCHEDULER = {
+    'ALGORITHM': 'linear',
+    'OPTIONS': {},
+}
+
+# Métricas por view em /api/metrics/ (ver learning/metrics.py). SAMPLE_RATE é a fração
+# das requisições medidas; TOKEN (opcional) libera o acesso do Prometheus sem login.
+LEARNING_METRICS = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.1,
+    'TOKEN': None,
+}
+
+# Fila de tarefas em segundo plano (ver learning/jobs.py e o comando run_workers).
+# RETRY_DELAY: espera (s) antes da 1ª nova tentativa, dobrando a cada falha;
+# TIMEOUT: depois de quantos segundos em 'running' a tarefa volta para a fila;
+# BACKGROUND_RESET: "Reiniciar progresso" pela fila (só com o run_workers rodando).
+LEARNING_JOBS = {
+    'RETRY_DELAY': 10,
+    'TIMEOUT': 600,
+    'POLL_INTERVAL': 1.0,
+    'BACKGROUND_RESET': False,
+}
+
+# Baralho do dia montado à noite (ver learning/decks.py e o comando build_daily_decks).
+# TIME: horário local da montagem noturna (tarefa nightly_daily_decks da fila);
+# BATCH_SIZE: usuários por tarefa; MAX_REVIEWS: teto de revisões por baralho.
+LEARNING_DAILY_DECKS = {
+    'TIME': '03:00',
+    'BATCH_SIZE': 500,
+    'MAX_REVIEWS': 200,
+}
+
+# Aliases de DATABASES usados como réplicas de leitura pelo painel, gráfico, lista de
+# treinos e catálogo (ver learning/routers.py). PIN_SECONDS: por quanto tempo, depois de
+# uma escrita, as leituras do mesmo navegador continuam no primário.
+LEARNING_DB_REPLICAS = {
+    'ALIASES': [],
+    'PIN_SECONDS': 5,
+}
+
+# Modo de múltipla escolha (ver learning/distractors.py e o comando build_distractors).
+# CHOICES: distratores mostrados por cartão; STORED: quantos são guardados por palavra
+# (sorteados a cada exibição); WINDOW: vizinhos comparados de cada lado no cálculo.
+LEARNING_DISTRACTORS = {
+    'CHOICES': 3,
+    'STORED': 8,
+    'WINDOW': 2000,
+}
+
+# Cache por usuário do painel, lista de treinos e gráfico, com ETag/304 (ver
+# learning/progress_cache.py). TIMEOUT: segundos até descartar os dados de uma versão.
+LEARNING_PROGRESS_CACHE = {
+    'ENABLED': True,
+    'TIMEOUT': 3600,
+}
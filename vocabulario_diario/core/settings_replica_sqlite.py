@@ -0,0 +1,33 @@
+# Configuração local para rodar o projeto (e os testes) com primário e réplica sem MySQL:
+# dois arquivos SQLite, com o roteamento de learning/routers.py ligado. Nos testes a réplica
+# espelha o banco de testes do primário (TEST MIRROR), como numa réplica sem atraso.
+#
+#     python manage.py test learning --settings=core.settings_replica_sqlite
+#
+# O ReplicaSQLiteTest (learning/tests.py) só roda com um alias 'replica' configurado.
+
+from .settings import *
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'primary.sqlite3',
+    },
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'replica.sqlite3',
+        'TEST': {'MIRROR': 'default'},
+    },
+}
+
+LEARNING_DB_REPLICAS = {
+    'ALIASES': ['replica'],
+    'PIN_SECONDS': 5,
+}
+
+# Cache do processo: as versões do progresso não ficam de uma execução para outra
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
@@ -0,0 +1,34 @@
+# learning/answer_index.py
+
+# Índice de respostas aceitas por palavra: a tradução principal e cada sinônimo,
+# já normalizados (minúsculas, sem acentos, sem pontuação, espaços únicos).
+# O índice é calculado na importação e guardado em Word.answer_keys, uma forma por linha.
+
+import re
+import unicodedata
+
+# Separadores aceitos na coluna de sinônimos ("andar, seguir; caminhar / ir")
+SEPARADORES_DE_SINONIMOS = re.compile(r'[,;/|\n]')
+PONTUACAO = re.compile(r'[^\w\s]')
+
+
+def normalize_answer(texto):
+    texto = unicodedata.normalize('NFKD', texto.casefold())
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    texto = PONTUACAO.sub(' ', texto)
+    return ' '.join(texto.split())
+
+
+def build_answer_keys(text_portuguese, synonyms_portuguese=None):
+    formas = [text_portuguese or '']
+    if synonyms_portuguese:
+        formas += SEPARADORES_DE_SINONIMOS.split(synonyms_portuguese)
+    chaves = {normalize_answer(forma) for forma in formas}
+    chaves.discard('')
+    return '\n'.join(sorted(chaves))
+
+
+def is_accepted_answer(accepted_answers, user_answer):
+    # A única normalização por requisição é a da resposta digitada; o resto é uma busca
+    # no frozenset guardado no cache do catálogo (learning/catalog.py)
+    return normalize_answer(user_answer) in accepted_answers
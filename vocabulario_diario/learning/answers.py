@@ -0,0 +1,144 @@
+# learning/answers.py
+
+# Regras de correção e de repetição espaçada (SRS) compartilhadas pelas views
+# de resposta única (CheckAnswerView, MarkAsCorrectView), pela versão em lote e
+# pelas views assíncronas (learning/async_views.py).
+
+from django.db import transaction
+from django.shortcuts import get_object_or_404
+from .answer_index import is_accepted_answer
+from .bulk import upsert_options
+from .decks import advance_deck
+from .models import TrainingSet, UserWordStatus
+from .progress import Answer, learned_from_delta, record_answers
+from .progress_cache import bump_progress_version
+from .scheduling import get_scheduler
+from .seen import mark_seen
+from .stats import apply_stats_delta, stats_delta, stats_snapshot
+
+
+def grade_answer(word, user_answer):
+    # `word` é uma entrada do cache do catálogo (CatalogEntry).
+    # Aceita a tradução principal ou qualquer sinônimo, ignorando acentos, caixa e pontuação
+    return is_accepted_answer(word.accepted_answers, user_answer)
+
+
+def get_or_create_today_set(user, now):
+    # O conjunto aberto de hoje é único por (user, open_date): duas respostas erradas
+    # simultâneas fazem o mesmo upsert e leem a mesma linha, sem conjunto duplicado
+    hoje = now.date()
+    today_set = TrainingSet.objects.filter(user=user, open_date=hoje).first()
+    if today_set is None:
+        TrainingSet.objects.bulk_create(
+            [TrainingSet(user=user, creation_date=hoje, open_date=hoje)], **upsert_options(['user', 'open_date'], ['open_date']),
+        )
+        # Leitura com trava: no REPEATABLE READ do MySQL só ela enxerga a linha gravada por outra transação
+        today_set = TrainingSet.objects.select_for_update().get(user=user, open_date=hoje)
+    return today_set
+
+
+def lock_or_create_statuses(user, word_ids):
+    """
+    Status do usuário para `word_ids`, criando os que faltam, travados até o fim da transação.
+
+    Um INSERT ... ON DUPLICATE KEY UPDATE (ON CONFLICT DO UPDATE) cria as linhas novas e
+    trava as existentes de uma vez, sem a corrida do get_or_create (SELECT, INSERT e, no
+    conflito, IntegrityError). A atualização é word_id = word_id, que não muda nada.
+    Ids em ordem, para transações concorrentes travarem as linhas na mesma ordem.
+    """
+    word_ids = sorted(set(word_ids))
+    if not word_ids:
+        return {}
+    UserWordStatus.objects.bulk_create(
+        [UserWordStatus(user=user, word_id=word_id) for word_id in word_ids], **upsert_options(['user', 'word'], ['word']),
+    )
+    return {status.word_id: status for status in UserWordStatus.objects.select_for_update().filter(user=user, word_id__in=word_ids)}
+
+
+def is_new_status(status):
+    # 'Nao Visto' só existe entre o upsert e a gravação da primeira resposta, na mesma transação
+    return status.status == 'Nao Visto'
+
+
+def apply_answer(status, created, is_correct, now, get_today_set):
+    """
+    Aplica uma resposta ao status (sem salvar) e devolve os campos alterados.
+
+    `get_today_set` só é chamado quando a resposta está errada, para que acertos
+    não consultem a tabela de conjuntos de treino.
+    """
+    if is_correct:
+        if status.training_set_id:
+            # Acerto dentro de um conjunto de treino: a palavra conta como respondida nesta rodada
+            status.consecutive_correct_answers += 1
+            status.training_answered = True
+            return ['consecutive_correct_answers', 'training_answered']
+        status.status = 'Acertou de Primeira' if created else 'Dominado'
+        status.consecutive_correct_answers += 1
+        status.next_review_date = get_scheduler().next_review(status.consecutive_correct_answers, True, now)
+        status.training_set = None
+    else:
+        status.status = 'Em Revisao'
+        status.consecutive_correct_answers = 0
+        status.next_review_date = get_scheduler().next_review(0, False, now)
+        status.training_set = get_today_set()
+    status.training_answered = False
+    return ['status', 'consecutive_correct_answers', 'next_review_date', 'training_set', 'training_answered']
+
+
+def apply_mark_as_correct(status, now):
+    # Mesma regra do apply_answer, para quando o usuário corrige a nota manualmente
+    if status.training_set_id:
+        status.training_answered = True
+        return ['training_answered']
+    status.status = 'Dominado'
+    status.consecutive_correct_answers = 1
+    status.next_review_date = get_scheduler().next_review(1, True, now)
+    status.training_set = None
+    return ['status', 'consecutive_correct_answers', 'next_review_date', 'training_set']
+
+
+def save_answer(user, status, created, is_correct, now):
+    # Grava a resposta, o delta das estatísticas e o evento de revisão na mesma transação
+    # (savepoint=False: dentro da transação da view síncrona não abre um SAVEPOINT extra)
+    with transaction.atomic(savepoint=False):
+        antes = None if created else stats_snapshot(status)
+        apply_answer(status, created, is_correct, now, lambda: get_or_create_today_set(user, now))
+        status.save()
+        if created:
+            mark_seen(user.id, [status.word_id])
+        delta = stats_delta(antes, stats_snapshot(status))
+        apply_stats_delta(user.id, delta)
+        record_answers(user.id, [
+            Answer(status.word_id, 'correct' if is_correct else 'incorrect', now, learned_from_delta(delta))
+        ])
+        bump_progress_version(user.id)
+        advance_deck(user.id, [status.word_id], now)
+
+
+def answer_word(user, word_id, is_correct, now):
+    # Resposta única (CheckAnswerView síncrona e assíncrona): upsert do status e gravação na mesma transação
+    with transaction.atomic():
+        status = lock_or_create_statuses(user, [word_id])[word_id]
+        save_answer(user, status, is_new_status(status), is_correct, now)
+    return status
+
+
+def mark_word_as_correct(user, word_id, now):
+    with transaction.atomic():
+        # Travado: uma resposta simultânea à mesma palavra espera em vez de ser sobrescrita
+        status = get_object_or_404(UserWordStatus.objects.select_for_update(), user=user, word_id=word_id)
+        save_mark_as_correct(user, status, now)
+    return status
+
+
+def save_mark_as_correct(user, status, now):
+    antes = stats_snapshot(status)
+    campos = apply_mark_as_correct(status, now)
+    with transaction.atomic(savepoint=False):
+        if campos:
+            status.save(update_fields=[*campos, 'updated_at'])
+        delta = stats_delta(antes, stats_snapshot(status))
+        apply_stats_delta(user.id, delta)
+        record_answers(user.id, [Answer(status.word_id, 'marked_correct', now, learned_from_delta(delta))])
+        bump_progress_version(user.id)
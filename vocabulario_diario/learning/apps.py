@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class LearningConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'learning'
+
+    # Importa os sinais (invalidação do cache do catálogo) e registra as tarefas da fila
+    def ready(self):
+        import learning.signals
+        import learning.tasks
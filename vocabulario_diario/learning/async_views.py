@@ -0,0 +1,86 @@
+# learning/async_views.py
+
+# Versões assíncronas das APIs JSON, servidas nativamente pelo ASGI (core/asgi.py)
+# quando LEARNING_ASYNC_API = True. Autenticação, catálogo e leituras usam o ORM
+# assíncrono; cada gravação que precisa de transação é um único sync_to_async que
+# reaproveita as mesmas funções das views síncronas (answers.py, training.py).
+
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import Http404, JsonResponse
+from django.urls import reverse
+from django.utils import timezone
+from django.views import View
+from .answers import answer_word, grade_answer, mark_word_as_correct
+from .catalog import aget_word_or_404
+from .export import aexport_chunks, export_response, parse_export_request, progress_queryset
+from .jobs import enqueue
+from .models import DailyProgress, TrainingSet
+from .progress import cumulative_chart_data
+from .progress_cache import CACHE_DO_GRAFICO
+from .routers import ReplicaReadMixin
+from .stats import vocabulary_total
+from .training import master_training_set
+
+
+class AsyncLoginRequiredMixin:
+    # Equivalente ao LoginRequiredMixin que carrega o usuário com request.auser(),
+    # sem o acesso síncrono à sessão que o request.user faria dentro do event loop
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        request.user = user
+        return await super().dispatch(request, *args, **kwargs)
+
+
+class CheckAnswerView(AsyncLoginRequiredMixin, View):
+    async def post(self, request, *args, **kwargs):
+        data = json.loads(request.body)
+        word = await aget_word_or_404(data.get('word_id'))
+        is_correct = grade_answer(word, data.get('user_answer'))
+        await sync_to_async(answer_word)(request.user, word.id, is_correct, timezone.now())
+        return JsonResponse({'correct': is_correct, 'correct_answer': word.text_portuguese})
+
+
+class MarkAsCorrectView(AsyncLoginRequiredMixin, View):
+    async def post(self, request, *args, **kwargs):
+        data = json.loads(request.body)
+        await sync_to_async(mark_word_as_correct)(request.user, data.get('word_id'), timezone.now())
+        return JsonResponse({'status': 'success'})
+
+
+class MasterSetView(AsyncLoginRequiredMixin, View):
+    async def post(self, request, *args, **kwargs):
+        data = json.loads(request.body)
+        if data.get('background'):
+            if not await TrainingSet.objects.filter(id=data.get('set_id'), user=request.user).aexists():
+                raise Http404("Conjunto de treino não encontrado.")
+            job = await sync_to_async(enqueue)('master_set', {'user_id': request.user.id, 'set_id': data.get('set_id')}, user=request.user)
+            return JsonResponse({'status': 'accepted', 'job_id': job.id, 'status_url': reverse('job_status', args=[job.id])}, status=202)
+        word_count = await sync_to_async(master_training_set)(request.user, data.get('set_id'), timezone.now())
+        return JsonResponse({'status': 'success', 'words_mastered': word_count})
+
+
+class DashboardChartDataView(AsyncLoginRequiredMixin, ReplicaReadMixin, View):
+    @CACHE_DO_GRAFICO.conditional
+    async def get(self, request, *args, **kwargs):
+        progress_data = DailyProgress.objects.filter(user=request.user).exclude(words_learned=0).order_by('date').values_list('date', 'words_learned')
+
+        async def montar():
+            linhas = [linha async for linha in progress_data]
+            return cumulative_chart_data(linhas, await sync_to_async(vocabulary_total)(request.user))
+        return JsonResponse(await CACHE_DO_GRAFICO.aget_or_build(request, montar))
+
+
+class ExportProgressView(AsyncLoginRequiredMixin, View):
+    # Gerador assíncrono: sob ASGI o Django leria um iterador síncrono inteiro antes de enviar
+    async def get(self, request, *args, **kwargs):
+        try:
+            formato, updated_since, gzip = parse_export_request(request)
+        except ValueError as erro:
+            return JsonResponse({'error': str(erro)}, status=400)
+        iniciada_em = timezone.now()
+        statuses = progress_queryset([request.user.id], updated_since)
+        return export_response(request, aexport_chunks(statuses, formato, gzip=gzip), formato, gzip, iniciada_em)
@@ -0,0 +1,16 @@
+# learning/bulk.py
+
+from django.db import connections
+
+
+def upsert_options(unique_fields, update_fields, using='default'):
+    """
+    Opções de bulk_create para um upsert (INSERT ... ON CONFLICT / ON DUPLICATE KEY UPDATE).
+
+    O MySQL não aceita indicar as colunas do conflito (usa qualquer índice único),
+    então `unique_fields` só é enviado aos bancos que o suportam.
+    """
+    options = {'update_conflicts': True, 'update_fields': update_fields}
+    if connections[using].features.supports_update_conflicts_with_target:
+        options['unique_fields'] = unique_fields
+    return options
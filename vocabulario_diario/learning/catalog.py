@@ -0,0 +1,141 @@
+# learning/catalog.py
+
+# Cache do catálogo de palavras na memória do processo.
+#
+# A tabela Word praticamente só muda nas importações, então cada worker guarda uma
+# cópia compacta (id -> inglês, português, complexidade, respostas aceitas) e só a
+# recarrega quando o CatalogVersion do banco muda. A versão é consultada no máximo
+# uma vez a cada LEARNING_CATALOG_CHECK_INTERVAL segundos por processo, e é
+# incrementada pelo import_words, pelo rebuild_answer_index e pelos sinais de Word
+# (edições pelo admin ou pelo shell).
+
+import threading
+import time
+from contextlib import nullcontext
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import Http404
+from .answer_index import build_answer_keys
+from .models import CatalogVersion, Word
+from .routers import read_from_replica
+
+INTERVALO_PADRAO = 5.0
+
+
+class CatalogEntry:
+    __slots__ = ('id', 'text_english', 'text_portuguese', 'complexity', 'accepted_answers')
+
+    def __init__(self, id, text_english, text_portuguese, complexity, accepted_answers):
+        self.id = id
+        self.text_english = text_english
+        self.text_portuguese = text_portuguese
+        self.complexity = complexity
+        self.accepted_answers = accepted_answers
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __str__(self):
+        return self.text_english
+
+
+class Catalog:
+    def __init__(self, version, entries):
+        self.version = version
+        self._entries = entries
+        self._ids = None
+
+    def get(self, word_id):
+        return self._entries.get(word_id)
+
+    def in_bulk(self, word_ids):
+        return {word_id: self._entries[word_id] for word_id in word_ids if word_id in self._entries}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def id_array(self):
+        # Ids em ordem crescente como vetor do NumPy (usado com os mapas de learning/seen.py)
+        if self._ids is None:
+            self._ids = np.fromiter(sorted(self._entries), dtype=np.int64, count=len(self._entries))
+        return self._ids
+
+
+_catalogo = None
+_verificado_em = 0.0
+_lock = threading.Lock()
+
+
+def _carregar_catalogo(version):
+    entries = {}
+    linhas = Word.objects.values_list('id', 'text_english', 'text_portuguese', 'synonyms_portuguese', 'complexity', 'answer_keys')
+    for word_id, ingles, portugues, sinonimos, complexidade, answer_keys in linhas.iterator(chunk_size=5000):
+        answer_keys = answer_keys or build_answer_keys(portugues, sinonimos)
+        entries[word_id] = CatalogEntry(word_id, ingles, portugues, complexidade, frozenset(answer_keys.split('\n')))
+    return Catalog(version, entries)
+
+
+def _catalogo_recente(intervalo):
+    # A cópia deste processo, se a versão foi conferida há menos de `intervalo` segundos
+    catalogo = _catalogo
+    if catalogo is not None and time.monotonic() - _verificado_em < intervalo:
+        return catalogo
+    return None
+
+
+def get_catalog(verificar_versao=False):
+    global _catalogo, _verificado_em
+    intervalo = 0 if verificar_versao else getattr(settings, 'LEARNING_CATALOG_CHECK_INTERVAL', INTERVALO_PADRAO)
+    catalogo = _catalogo_recente(intervalo)
+    if catalogo is not None:
+        return catalogo
+    # A verificação periódica e a recarga podem ler da réplica (a cópia só fica atrasada o
+    # mesmo tanto que a réplica); a verificação forçada, de uma palavra recém-importada, não
+    leitura = nullcontext() if verificar_versao else read_from_replica()
+    with _lock, leitura:
+        if _catalogo is None or time.monotonic() - _verificado_em >= intervalo:
+            version = CatalogVersion.current()
+            if _catalogo is None or _catalogo.version != version:
+                _catalogo = _carregar_catalogo(version)
+            _verificado_em = time.monotonic()
+    return _catalogo
+
+
+def get_word_or_404(word_id):
+    try:
+        word_id = int(word_id)
+    except (TypeError, ValueError):
+        raise Http404("Palavra não encontrada.")
+    entry = get_catalog().get(word_id)
+    if entry is None:
+        # Pode ser uma palavra importada depois da última verificação da versão
+        entry = get_catalog(verificar_versao=True).get(word_id)
+    if entry is None:
+        raise Http404("Palavra não encontrada.")
+    return entry
+
+
+async def aget_word_or_404(word_id):
+    # Com o catálogo em dia a busca é só em memória, sem sair do event loop; recarga,
+    # conferência da versão e palavras desconhecidas vão para a versão síncrona numa thread
+    catalogo = _catalogo_recente(getattr(settings, 'LEARNING_CATALOG_CHECK_INTERVAL', INTERVALO_PADRAO))
+    if catalogo is not None:
+        try:
+            entry = catalogo.get(int(word_id))
+        except (TypeError, ValueError):
+            raise Http404("Palavra não encontrada.")
+        if entry is not None:
+            return entry
+    return await sync_to_async(get_word_or_404)(word_id)
+
+
+def invalidate_catalog():
+    # Descarta a cópia deste processo (usado logo após um bump feito aqui mesmo);
+    # os outros processos percebem a mudança pela versão
+    global _catalogo
+    _catalogo = None
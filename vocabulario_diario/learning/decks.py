@@ -0,0 +1,157 @@
+# learning/decks.py
+
+# Baralho do dia (DailyDeck/DailyDeckCard), montado em lote pelo comando
+# build_daily_decks ou pela tarefa noturna da fila (learning/tasks.py).
+#
+# A montagem faz um número fixo de consultas por lote de usuários: uma para as
+# revisões que vencem no dia, uma para a meta de cada um, uma para os mapas de
+# palavras vistas (learning/seen.py), de onde saem as palavras novas, e os INSERTs em massa. Durante o dia
+# a sessão de estudo lê os cartões não respondidos a partir do cursor, e cada resposta
+# marca o seu cartão (em qualquer ordem: uma palavra do baralho pode ser respondida num
+# treino) e leva o cursor ao primeiro cartão ainda não respondido, com dois UPDATEs. Sem baralho (ou com ele esgotado) as views voltam à
+# seleção ao vivo (fila de revisão + sorteio de palavras novas).
+
+import random
+from datetime import datetime, time, timedelta
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from users.models import Profile
+from .jobs import enqueue
+from .models import REVIEW_STATUSES, DailyDeck, DailyDeckCard, Job, UserWordStatus
+from .seen import get_seen_bits_bulk, sample_unseen
+
+CONFIG_PADRAO = {'TIME': '03:00', 'BATCH_SIZE': 500, 'MAX_REVIEWS': 200}
+META_PADRAO = 10
+
+
+def _fim_do_dia(date):
+    return timezone.make_aware(datetime.combine(date + timedelta(days=1), time.min))
+
+
+def build_daily_decks(user_ids, date, word_ids, max_reviews=None, rng=None):
+    """
+    Monta (ou remonta) o baralho do dia `date` para os usuários do lote.
+    `word_ids` são os ids do catálogo (Catalog.id_array()), carregados uma vez por execução.
+    Devolve o número de cartões gravados.
+    """
+    rng = rng or random.Random()
+    max_reviews = max_reviews or decks_config()['MAX_REVIEWS']
+    user_ids = list(user_ids)
+
+    # Revisões que vencem até o fim do dia, em ordem de vencimento (índice uws_due_queue_idx)
+    revisoes = {user_id: [] for user_id in user_ids}
+    vencidas = (
+        UserWordStatus.objects
+        .filter(user_id__in=user_ids, status__in=REVIEW_STATUSES, next_review_date__lt=_fim_do_dia(date))
+        .order_by('user_id', 'next_review_date')
+        .values_list('user_id', 'word_id')
+    )
+    for user_id, word_id in vencidas.iterator(chunk_size=5000):
+        if len(revisoes[user_id]) < max_reviews:
+            revisoes[user_id].append(word_id)
+
+    # Palavras novas: sorteadas entre as que têm o bit desligado no mapa de cada usuário
+    metas = dict(Profile.objects.filter(user_id__in=user_ids).values_list('user_id', 'daily_goal'))
+    mapas = get_seen_bits_bulk(user_ids)
+
+    cartoes_por_usuario = {}
+    for user_id in user_ids:
+        novas = sample_unseen(mapas[user_id], word_ids, metas.get(user_id, META_PADRAO), rng)
+        cartoes_por_usuario[user_id] = [(word_id, False) for word_id in revisoes[user_id]] + [(word_id, True) for word_id in novas]
+
+    with transaction.atomic():
+        # Remonta do zero: apaga os cartões e os baralhos antigos (ou do mesmo dia) do lote
+        antigos = DailyDeck.objects.filter(user_id__in=user_ids, date__lte=date)
+        DailyDeckCard.objects.filter(deck__in=antigos).delete()
+        antigos.delete()
+        DailyDeck.objects.bulk_create([
+            DailyDeck(user_id=user_id, date=date, size=len(cartoes)) for user_id, cartoes in cartoes_por_usuario.items()
+        ])
+        # O MySQL não devolve os ids do bulk_create: relê os baralhos recém-criados
+        decks = dict(DailyDeck.objects.filter(user_id__in=user_ids, date=date).values_list('user_id', 'id'))
+        cartoes = [
+            DailyDeckCard(deck_id=decks[user_id], position=posicao, word_id=word_id, is_new=is_new)
+            for user_id, lista in cartoes_por_usuario.items()
+            for posicao, (word_id, is_new) in enumerate(lista)
+        ]
+        DailyDeckCard.objects.bulk_create(cartoes, batch_size=5000)
+    return len(cartoes)
+
+
+def _cartoes_restantes(user, date):
+    return DailyDeckCard.objects.filter(
+        deck__user=user, deck__date=date, position__gte=F('deck__cursor'), answered=False,
+    ).order_by('position')
+
+
+def next_deck_word_ids(user, limite=1, excluir_ids=(), now=None):
+    # Próximos cartões do baralho de hoje, a partir do cursor (uma consulta pelo índice (deck, position))
+    cartoes = _cartoes_restantes(user, timezone.localdate(now))
+    if excluir_ids:
+        cartoes = cartoes.exclude(word_id__in=excluir_ids)
+    return list(cartoes.values_list('word_id', flat=True)[:limite])
+
+
+def cards_remaining(user, now=None):
+    # None quando o usuário não tem baralho para hoje
+    deck = DailyDeck.objects.filter(user=user, date=timezone.localdate(now)).values_list('size', 'answered').first()
+    if deck is None:
+        return None
+    size, answered = deck
+    return max(size - answered, 0)
+
+
+def advance_deck(user_id, word_ids, now):
+    # Marca como respondidos os cartões de `word_ids` no baralho de hoje e leva o cursor ao
+    # primeiro cartão não respondido: responder antes um cartão mais adiante não pula os anteriores
+    hoje = timezone.localdate(now)
+    respondidos = DailyDeckCard.objects.filter(
+        deck__user_id=user_id, deck__date=hoje, word_id__in=word_ids, answered=False,
+    ).update(answered=True)
+    if not respondidos:
+        return
+    proximo = (
+        DailyDeckCard.objects.filter(deck=OuterRef('pk'), position__gte=OuterRef('cursor'), answered=False)
+        .order_by('position').values('position')[:1]
+    )
+    DailyDeck.objects.filter(user_id=user_id, date=hoje).update(
+        answered=F('answered') + respondidos, cursor=Coalesce(Subquery(proximo), F('size')),
+    )
+
+
+def active_user_batches(batch_size):
+    # Ids dos usuários ativos em lotes, por chave (sem OFFSET)
+    ultimo_id = 0
+    while True:
+        user_ids = list(
+            User.objects.filter(is_active=True, id__gt=ultimo_id).order_by('id').values_list('id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return
+        ultimo_id = user_ids[-1]
+        yield user_ids
+
+
+def decks_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_DAILY_DECKS', {})}
+
+
+def next_nightly_run(now=None):
+    # Próximo horário LEARNING_DAILY_DECKS['TIME'] (hora local) a partir de agora
+    now = timezone.localtime(now)
+    hora, minuto = (int(parte) for parte in decks_config()['TIME'].split(':'))
+    execucao = now.replace(hour=hora, minute=minuto, second=0, microsecond=0)
+    return execucao if execucao > now else execucao + timedelta(days=1)
+
+
+def schedule_nightly_decks(now=None):
+    # Gancho do agendador: deixa uma (e só uma) montagem noturna na fila; a própria
+    # tarefa se agenda de novo para a noite seguinte ao terminar (learning/tasks.py)
+    pendente = Job.objects.filter(name='nightly_daily_decks', status='queued').first()
+    if pendente is not None:
+        return pendente
+    return enqueue('nightly_daily_decks', run_after=next_nightly_run(now))
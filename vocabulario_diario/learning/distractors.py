@@ -0,0 +1,193 @@
+# learning/distractors.py
+
+# Distratores do modo de múltipla escolha: para cada palavra, traduções de outras palavras
+# parecidas com a dela, pré-calculadas em lote (comando e tarefa build_distractors) e
+# guardadas em WordDistractors. Servir um cartão é uma leitura pela chave primária (uma
+# IN-list no lote do next-cards), com os textos vindo do catálogo em memória.
+#
+# A semelhança soma o cosseno das n-gramas de caracteres (2 e 3) da tradução normalizada,
+# com hashing para DIMENSOES baldes, e penalidades pela diferença de comprimento e de
+# Word.complexity. As palavras são ordenadas por (complexidade, comprimento) e cada uma só
+# é comparada com as ~WINDOW vizinhas de cada lado nessa ordem: o custo é O(N × WINDOW),
+# em blocos de multiplicação de matrizes do NumPy, em vez de O(N²).
+#
+# O import_words apaga as linhas das palavras cuja tradução ou complexidade mudou e põe um
+# build incremental na fila, que recalcula as palavras sem linha e as que tinham alguma
+# delas (ou uma palavra apagada) como distrator. Palavras novas só passam a ser distratores
+# das antigas num build completo (--full).
+#
+#     LEARNING_DISTRACTORS = {'CHOICES': 3, 'STORED': 8, 'WINDOW': 2000}
+
+import random
+import zlib
+import numpy as np
+from django.conf import settings
+from .answer_index import normalize_answer
+from .bulk import upsert_options
+from .catalog import get_catalog
+from .models import WordDistractors
+
+CONFIG_PADRAO = {'CHOICES': 3, 'STORED': 8, 'WINDOW': 2000}
+DIMENSOES = 512
+TAMANHO_DO_BLOCO = 1024
+PESO_COMPRIMENTO = 0.02
+PESO_COMPLEXIDADE = 0.02
+
+
+def distractors_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_DISTRACTORS', {})}
+
+
+def _ngramas(texto):
+    texto = f' {texto} '
+    return [texto[i:i + n] for n in (2, 3) for i in range(len(texto) - n + 1)]
+
+
+class _Vetores:
+    # N-gramas de todas as palavras como baldes + limites por palavra (formato CSR), de onde
+    # saem as matrizes densas só das faixas usadas em cada bloco
+    def __init__(self, textos):
+        baldes, limites = [], [0]
+        for texto in textos:
+            baldes.extend(zlib.crc32(grama.encode()) % DIMENSOES for grama in _ngramas(texto))
+            limites.append(len(baldes))
+        self.baldes = np.asarray(baldes, dtype=np.int64)
+        self.limites = np.asarray(limites, dtype=np.int64)
+
+    def matriz(self, inicio, fim):
+        # Palavras [inicio, fim) como matriz (fim - inicio) × DIMENSOES de linhas com norma 1
+        linhas = np.repeat(np.arange(fim - inicio), np.diff(self.limites[inicio:fim + 1]))
+        baldes = self.baldes[self.limites[inicio]:self.limites[fim]]
+        contagens = np.bincount(linhas * DIMENSOES + baldes, minlength=(fim - inicio) * DIMENSOES)
+        matriz = contagens.reshape(fim - inicio, DIMENSOES).astype(np.float32)
+        return matriz / np.maximum(np.linalg.norm(matriz, axis=1, keepdims=True), 1e-6)
+
+
+def compute_distractors(entries, word_ids=None, quantidade=None, janela=None):
+    """
+    Distratores das palavras `word_ids` (todas, se None) entre as `entries` do catálogo.
+    Devolve {word_id: [ids dos distratores, do mais para o menos parecido]}.
+    """
+    config = distractors_config()
+    quantidade = quantidade or config['STORED']
+    janela = janela or config['WINDOW']
+    if not entries:
+        return {}
+
+    textos = [normalize_answer(entry.text_portuguese) for entry in entries]
+    comprimentos = np.array([len(texto) for texto in textos], dtype=np.float32)
+    complexidades = np.array([entry.complexity for entry in entries], dtype=np.float32)
+    ordem = np.lexsort((comprimentos, complexidades))
+    entries = [entries[i] for i in ordem]
+    textos = [textos[i] for i in ordem]
+    comprimentos, complexidades = comprimentos[ordem], complexidades[ordem]
+    ids = np.array([entry.id for entry in entries], dtype=np.int64)
+    # Traduções iguais depois de normalizadas (inclusive a própria palavra) nunca são distratores uma da outra
+    _, texto_ids = np.unique(np.array(textos, dtype=object), return_inverse=True)
+    vetores = _Vetores(textos)
+
+    total = len(entries)
+    posicoes = np.arange(total) if word_ids is None else np.flatnonzero(np.isin(ids, list(word_ids)))
+    resultado = {}
+    # Blocos fixos de TAMANHO_DO_BLOCO posições, com a janela de candidatos do bloco inteiro:
+    # um build incremental encontra para cada palavra os mesmos candidatos do build completo
+    blocos = posicoes // TAMANHO_DO_BLOCO
+    for bloco in np.unique(blocos):
+        grupo = posicoes[blocos == bloco]
+        c0 = max(0, int(bloco) * TAMANHO_DO_BLOCO - janela)
+        c1 = min(total, (int(bloco) + 1) * TAMANHO_DO_BLOCO + janela)
+
+        candidatos = vetores.matriz(c0, c1)
+        notas = candidatos[grupo - c0] @ candidatos.T
+        notas -= PESO_COMPRIMENTO * np.abs(comprimentos[grupo, None] - comprimentos[None, c0:c1])
+        notas -= PESO_COMPLEXIDADE * np.abs(complexidades[grupo, None] - complexidades[None, c0:c1])
+        notas[texto_ids[grupo, None] == texto_ids[None, c0:c1]] = -np.inf
+
+        # Sobra para o filtro de sinônimos e traduções repetidas abaixo
+        k = min(quantidade * 2, c1 - c0)
+        melhores = np.argpartition(-notas, k - 1, axis=1)[:, :k]
+        melhores = np.take_along_axis(melhores, np.argsort(-np.take_along_axis(notas, melhores, 1), axis=1), 1)
+        validos = np.isfinite(np.take_along_axis(notas, melhores, 1))
+        for linha, posicao in enumerate(grupo):
+            escolhidos = (melhores[linha][validos[linha]] + c0).tolist()
+            resultado[int(ids[posicao])] = _filtrar(entries[posicao], escolhidos, entries, textos, quantidade)
+    return resultado
+
+
+def _filtrar(entry, candidatos, entries, textos, quantidade):
+    # Tira sinônimos da resposta certa (seriam aceitos) e traduções repetidas entre os distratores
+    escolhidos, vistos = [], set(entry.accepted_answers)
+    for posicao in candidatos:
+        if textos[posicao] in vistos:
+            continue
+        vistos.add(textos[posicao])
+        escolhidos.append(entries[posicao].id)
+        if len(escolhidos) == quantidade:
+            break
+    return escolhidos
+
+
+def _como_bytes(word_ids):
+    return np.asarray(word_ids, dtype='<i4').tobytes()
+
+
+def _como_ids(distractor_ids):
+    return np.frombuffer(bytes(distractor_ids), dtype='<i4')
+
+
+def rebuild_distractors(word_ids=None, batch_size=5000):
+    # Recalcula e grava (upsert) os distratores de `word_ids`, ou de todas as palavras; devolve quantas
+    catalogo = get_catalog(verificar_versao=True)
+    resultado = compute_distractors([catalogo.get(word_id) for word_id in catalogo], word_ids)
+    WordDistractors.objects.bulk_create(
+        [WordDistractors(word_id=word_id, distractor_ids=_como_bytes(ids)) for word_id, ids in resultado.items()],
+        batch_size=batch_size, **upsert_options(['word'], ['distractor_ids']),
+    )
+    return len(resultado)
+
+
+def stale_word_ids():
+    # Palavras sem linha (novas ou alteradas) e as que têm como distrator uma palavra sem
+    # linha ou que já não existe; uma leitura da tabela e um np.isin sobre todos os ids
+    catalogo = get_catalog(verificar_versao=True)
+    linhas = dict(WordDistractors.objects.values_list('word_id', 'distractor_ids').iterator(chunk_size=5000))
+    sem_linha = [word_id for word_id in catalogo if word_id not in linhas]
+    linhas = {word_id: _como_ids(ids) for word_id, ids in linhas.items() if catalogo.get(word_id) is not None}
+    if not linhas:
+        return sem_linha
+    donos = np.fromiter(linhas, dtype=np.int64, count=len(linhas))
+    tamanhos = np.fromiter((ids.size for ids in linhas.values()), dtype=np.int64, count=len(linhas))
+    distratores = np.concatenate(list(linhas.values()))
+    invalidos = ~np.isin(distratores, donos)
+    afetadas = np.unique(np.repeat(donos, tamanhos)[invalidos])
+    return sem_linha + afetadas.tolist()
+
+
+def choices_for(words, rng=None):
+    """
+    Opções de múltipla escolha dos cartões `words` (CatalogEntry), numa consulta:
+    {word_id: [tradução certa + CHOICES distratores, embaralhadas]}. Palavras sem
+    distratores suficientes ficam de fora e o cartão segue com resposta digitada.
+    """
+    rng = rng or random
+    quantidade = distractors_config()['CHOICES']
+    linhas = dict(WordDistractors.objects.filter(word_id__in=[word.id for word in words]).values_list('word_id', 'distractor_ids'))
+    catalogo = get_catalog()
+    opcoes = {}
+    for word in words:
+        if word.id not in linhas:
+            continue
+        # Conferidos no catálogo atual: o distrator pode ter sido apagado ou mudado de tradução desde o build
+        textos, vistos = [], set(word.accepted_answers)
+        for distrator in catalogo.in_bulk(_como_ids(linhas[word.id]).tolist()).values():
+            chave = normalize_answer(distrator.text_portuguese)
+            if chave not in vistos:
+                vistos.add(chave)
+                textos.append(distrator.text_portuguese)
+        if len(textos) < quantidade:
+            continue
+        # Sorteados entre os STORED guardados, para as opções variarem de uma revisão para outra
+        escolha = [word.text_portuguese, *rng.sample(textos, quantidade)]
+        rng.shuffle(escolha)
+        opcoes[word.id] = escolha
+    return opcoes
@@ -0,0 +1,196 @@
+# learning/export.py
+
+# Exportação do progresso (UserWordStatus + palavra) em CSV ou NDJSON, usada pela rota
+# /api/export-progress/ e pelo comando export_progress.
+#
+# As linhas saem em páginas por chave (id > último id, LIMIT chunk_size) com
+# select_related('word'), e cada página vira um pedaço da resposta: a memória do
+# servidor é a de uma página, qualquer que seja o tamanho do progresso. (O .iterator()
+# do Django não resolve isso no MySQL: o driver carrega o resultado inteiro do SELECT.)
+# A compressão gzip é feita pedaço a pedaço, conforme as páginas saem.
+#
+# `updated_since` filtra por UserWordStatus.updated_at, para exportações incrementais:
+# guarde o X-Export-Started-At (ou o horário de início do comando) e use-o na próxima.
+# Palavras apagadas pelo "Reiniciar progresso" não aparecem numa exportação incremental.
+
+import csv
+import io
+import json
+import re
+import zlib
+from datetime import datetime, time
+from asgiref.sync import sync_to_async
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date, parse_datetime
+from .models import UserWordStatus
+
+TAMANHO_DA_PAGINA = 2000
+ACEITA_GZIP = re.compile(r'\bgzip\b')
+COLUNAS = [
+    'word_id', 'text_english', 'text_portuguese', 'status', 'consecutive_correct_answers',
+    'next_review_date', 'training_set_id', 'updated_at',
+]
+# O comando exporta todos os usuários num arquivo só
+COLUNAS_COM_USUARIO = ['user_id', *COLUNAS]
+
+
+def parse_updated_since(valor):
+    # Data e hora ISO 8601 (sem fuso = fuso do projeto) ou só a data (meia-noite); ValueError se inválido
+    momento = parse_datetime(valor)
+    if momento is None:
+        data = parse_date(valor)
+        if data is None:
+            raise ValueError(f'Data inválida: {valor!r}')
+        momento = datetime.combine(data, time.min)
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def progress_queryset(user_ids=None, updated_since=None):
+    statuses = UserWordStatus.objects.select_related('word').only(
+        'user_id', 'status', 'consecutive_correct_answers', 'next_review_date', 'training_set_id', 'updated_at',
+        'word__text_english', 'word__text_portuguese',
+    )
+    if user_ids is not None:
+        statuses = statuses.filter(user_id__in=user_ids)
+    if updated_since is not None:
+        statuses = statuses.filter(updated_at__gte=updated_since)
+    return statuses
+
+
+def _pagina(statuses, ultimo_id, chunk_size):
+    return list(statuses.filter(pk__gt=ultimo_id).order_by('pk')[:chunk_size])
+
+
+def progress_pages(statuses, chunk_size=TAMANHO_DA_PAGINA):
+    ultimo_id = 0
+    while True:
+        pagina = _pagina(statuses, ultimo_id, chunk_size)
+        if not pagina:
+            return
+        ultimo_id = pagina[-1].pk
+        yield pagina
+
+
+async def aprogress_pages(statuses, chunk_size=TAMANHO_DA_PAGINA):
+    # Uma ida à thread do ORM por página; sob ASGI um iterador síncrono seria lido inteiro antes de enviar
+    ultimo_id = 0
+    while True:
+        pagina = await sync_to_async(_pagina)(statuses, ultimo_id, chunk_size)
+        if not pagina:
+            return
+        ultimo_id = pagina[-1].pk
+        yield pagina
+
+
+def _valores(status, com_usuario):
+    valores = [
+        status.word_id, status.word.text_english, status.word.text_portuguese, status.status,
+        status.consecutive_correct_answers,
+        status.next_review_date.isoformat() if status.next_review_date else None,
+        status.training_set_id, status.updated_at.isoformat(),
+    ]
+    return [status.user_id, *valores] if com_usuario else valores
+
+
+class CsvFormat:
+    content_type = 'text/csv; charset=utf-8'
+    extension = 'csv'
+
+    @staticmethod
+    def _linhas(linhas):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(linhas)
+        return buffer.getvalue()
+
+    def header(self, colunas):
+        return self._linhas([colunas])
+
+    def page(self, pagina, colunas, com_usuario):
+        # Campos vazios (None) saem como célula vazia
+        return self._linhas(_valores(status, com_usuario) for status in pagina)
+
+
+class NdjsonFormat:
+    content_type = 'application/x-ndjson; charset=utf-8'
+    extension = 'ndjson'
+
+    def header(self, colunas):
+        return ''
+
+    def page(self, pagina, colunas, com_usuario):
+        return ''.join(
+            json.dumps(dict(zip(colunas, _valores(status, com_usuario))), ensure_ascii=False) + '\n'
+            for status in pagina
+        )
+
+
+FORMATOS = {'csv': CsvFormat(), 'ndjson': NdjsonFormat()}
+
+
+class _Gzip:
+    # Um fluxo gzip só, esvaziado a cada pedaço (Z_SYNC_FLUSH) para o cliente receber os dados sem esperar o fim
+    def __init__(self):
+        self.compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def chunk(self, dados):
+        return self.compressor.compress(dados) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def end(self):
+        return self.compressor.flush()
+
+
+def export_chunks(statuses, formato, com_usuario=False, gzip=False, chunk_size=TAMANHO_DA_PAGINA):
+    # Pedaços (bytes) da exportação: o cabeçalho e um por página de `chunk_size` linhas
+    formato = FORMATOS[formato]
+    colunas = COLUNAS_COM_USUARIO if com_usuario else COLUNAS
+    compressor = _Gzip() if gzip else None
+    cabecalho = formato.header(colunas)
+    if cabecalho:
+        yield compressor.chunk(cabecalho.encode()) if compressor else cabecalho.encode()
+    for pagina in progress_pages(statuses, chunk_size):
+        texto = formato.page(pagina, colunas, com_usuario).encode()
+        yield compressor.chunk(texto) if compressor else texto
+    if compressor:
+        yield compressor.end()
+
+
+async def aexport_chunks(statuses, formato, com_usuario=False, gzip=False, chunk_size=TAMANHO_DA_PAGINA):
+    formato = FORMATOS[formato]
+    colunas = COLUNAS_COM_USUARIO if com_usuario else COLUNAS
+    compressor = _Gzip() if gzip else None
+    cabecalho = formato.header(colunas)
+    if cabecalho:
+        yield compressor.chunk(cabecalho.encode()) if compressor else cabecalho.encode()
+    async for pagina in aprogress_pages(statuses, chunk_size):
+        texto = formato.page(pagina, colunas, com_usuario).encode()
+        yield compressor.chunk(texto) if compressor else texto
+    if compressor:
+        yield compressor.end()
+
+
+
+def parse_export_request(request):
+    # (formato, updated_since, gzip) a partir de ?format=, ?updated_since= e do Accept-Encoding; ValueError se inválidos
+    formato = request.GET.get('format', 'csv')
+    if formato not in FORMATOS:
+        raise ValueError(f'Formato inválido: use {" ou ".join(FORMATOS)}.')
+    updated_since = request.GET.get('updated_since')
+    updated_since = parse_updated_since(updated_since) if updated_since else None
+    gzip = bool(ACEITA_GZIP.search(request.headers.get('Accept-Encoding', '')))
+    return formato, updated_since, gzip
+
+
+def export_response(request, chunks, formato, gzip, iniciada_em):
+    response = StreamingHttpResponse(chunks, content_type=FORMATOS[formato].content_type)
+    nome = f'progresso-{request.user.username}-{iniciada_em:%Y%m%d}.{FORMATOS[formato].extension}'
+    response.headers['Content-Disposition'] = f'attachment; filename="{nome}"'
+    # Valor para o updated_since da próxima exportação incremental
+    response.headers['X-Export-Started-At'] = iniciada_em.isoformat()
+    patch_vary_headers(response, ['Accept-Encoding'])
+    if gzip:
+        response.headers['Content-Encoding'] = 'gzip'
+    return response
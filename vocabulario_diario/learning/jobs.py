@@ -0,0 +1,177 @@
+# learning/jobs.py
+
+# Fila de tarefas em segundo plano sobre a tabela Job, sem broker externo.
+#
+#   - as tarefas são funções registradas com @register('nome') (ver learning/tasks.py)
+#     que recebem o payload (um dict JSON) e devolvem um resultado serializável em JSON;
+#   - enqueue() grava a tarefa e volta na hora; as views devolvem a URL de job_status;
+#   - o comando run_workers sobe um processo por núcleo, e cada um pega a próxima tarefa
+#     com SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8/PostgreSQL) seguido de um UPDATE
+#     condicional, que também garante a exclusividade no SQLite;
+#   - uma tarefa que falha volta para a fila com espera exponencial até max_attempts, menos
+#     nos erros definitivos (ERROS_DEFINITIVOS: objeto inexistente, 404, valor inválido),
+#     que falham na primeira tentativa;
+#     uma que fica 'running' além de LEARNING_JOBS['TIMEOUT'] (worker morto) também volta.
+#
+#     LEARNING_JOBS = {'RETRY_DELAY': 10, 'TIMEOUT': 600, 'POLL_INTERVAL': 1.0, 'BACKGROUND_RESET': False}
+#
+# BACKGROUND_RESET faz a página de configurações pedir o reset do progresso pela fila; só
+# ligue com workers rodando (run_workers), senão a tarefa fica 'queued' para sempre.
+
+import logging
+import os
+import signal
+import socket
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import DatabaseError, connection, connections, transaction
+from django.db.models import F
+from django.http import Http404
+from django.utils import timezone
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {'RETRY_DELAY': 10, 'TIMEOUT': 600, 'POLL_INTERVAL': 1.0, 'BACKGROUND_RESET': False}
+# Quantas candidatas olhar por vez ao disputar a próxima tarefa com outros workers
+CANDIDATAS = 10
+# Erros que se repetiriam em qualquer nova tentativa (o conjunto ou o usuário já não
+# existem, o payload é inválido): a tarefa falha de vez, sem esperar as retentativas
+ERROS_DEFINITIVOS = (ObjectDoesNotExist, Http404, ValueError)
+
+TASKS = {}
+
+
+def jobs_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_JOBS', {})}
+
+
+def register(name):
+    def decorator(func):
+        TASKS[name] = func
+        return func
+    return decorator
+
+
+def enqueue(name, payload=None, user=None, max_attempts=3, run_after=None):
+    if name not in TASKS:
+        raise ValueError(f"Tarefa desconhecida: {name!r}. Registradas: {', '.join(sorted(TASKS))}")
+    return Job.objects.create(
+        name=name, payload=payload or {}, user=user, max_attempts=max_attempts, run_after=run_after or timezone.now(),
+    )
+
+
+def requeue_stale_jobs(now=None):
+    # Tarefas presas em 'running' (o worker morreu no meio) voltam para a fila ou falham de vez
+    now = now or timezone.now()
+    limite = now - timedelta(seconds=jobs_config()['TIMEOUT'])
+    presas = Job.objects.filter(status='running', started_at__lt=limite)
+    falharam = presas.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', error='Tempo limite excedido.', finished_at=now,
+    )
+    voltaram = presas.update(status='queued', run_after=now, worker='')
+    return voltaram + falharam
+
+
+def claim_job(worker_id, now=None):
+    now = now or timezone.now()
+    # A transação só serve para o SKIP LOCKED segurar as candidatas; no SQLite ela faria a
+    # escrita falhar com "database is locked" quando vários workers disputam a fila
+    bloqueio = transaction.atomic() if connection.features.has_select_for_update_skip_locked else nullcontext()
+    with bloqueio:
+        candidatas = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(status='queued', run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:CANDIDATAS]
+        )
+        for job_id in candidatas:
+            # UPDATE condicional: só um worker consegue mudar a tarefa de 'queued' para 'running'
+            if Job.objects.filter(id=job_id, status='queued').update(
+                status='running', worker=worker_id, started_at=now, attempts=F('attempts') + 1,
+            ):
+                return Job.objects.get(id=job_id)
+    return None
+
+
+def run_job(job):
+    func = TASKS.get(job.name)
+    try:
+        if func is None:
+            raise LookupError(f"Tarefa não registrada: {job.name!r}")
+        result = func(job.payload)
+    except Exception as erro:
+        job.error = traceback.format_exc()
+        job.finished_at = timezone.now()
+        if job.attempts < job.max_attempts and func is not None and not isinstance(erro, ERROS_DEFINITIVOS):
+            # Espera exponencial: RETRY_DELAY, 2x, 4x, ...
+            job.status = 'queued'
+            job.run_after = job.finished_at + timedelta(seconds=jobs_config()['RETRY_DELAY'] * 2 ** (job.attempts - 1))
+        else:
+            job.status = 'failed'
+        logger.warning("Tarefa %s falhou (tentativa %s/%s)", job, job.attempts, job.max_attempts, exc_info=True)
+    else:
+        job.status = 'done'
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'result', 'error', 'run_after', 'finished_at'])
+    return job
+
+
+def run_next_job(worker_id):
+    # Executa uma tarefa da fila; devolve None se a fila estiver vazia
+    job = claim_job(worker_id)
+    if job is None:
+        requeue_stale_jobs()
+        return None
+    return run_job(job)
+
+
+def worker_loop(stop_event, poll_interval=None, burst=False, child=False):
+    # Laço de um worker: pega e executa tarefas até stop_event ou, com burst, até a fila esvaziar
+    if child:
+        import django
+        django.setup()  # necessário quando o processo é criado com 'spawn' (macOS, Windows)
+        # Ctrl+C chega a todo o grupo de processos: quem decide parar é o processo principal
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    worker_id = f'{socket.gethostname()}:{os.getpid()}'
+    poll_interval = poll_interval or jobs_config()['POLL_INTERVAL']
+    executadas = 0
+    try:
+        while not stop_event.is_set():
+            try:
+                job = run_next_job(worker_id)
+            except DatabaseError:
+                # Banco indisponível ou ocupado: descarta a conexão e tenta de novo depois
+                logger.exception("Worker %s: erro ao acessar a fila", worker_id)
+                connections.close_all()
+                stop_event.wait(poll_interval)
+                continue
+            if job is not None:
+                executadas += 1
+                continue
+            if burst:
+                break
+            stop_event.wait(poll_interval)
+    finally:
+        connections.close_all()
+    return executadas
+
+
+def job_as_dict(job):
+    return {
+        'id': job.id,
+        'name': job.name,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else None,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
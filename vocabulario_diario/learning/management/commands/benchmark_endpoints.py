@@ -0,0 +1,255 @@
+import json
+import math
+import random
+import subprocess
+import time
+from contextlib import ExitStack
+from asgiref.sync import async_to_sync
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, setup_test_environment
+from django.urls import reverse
+from django.utils import timezone
+from learning.answers import get_or_create_today_set
+from learning.catalog import get_catalog
+from learning.models import Job, UserWordStatus
+from learning.urls import urlpatterns as learning_urls
+from users.urls import urlpatterns as users_urls
+
+# Rotas que apagam o progresso do usuário de benchmark (só rodam com --include-destructive)
+ROTAS_DESTRUTIVAS = {'reset_progress'}
+
+
+class Endpoint:
+    __slots__ = ('method', 'build', 'setup', 'relogin')
+
+    def __init__(self, method, build, setup=None, relogin=False):
+        self.method = method
+        # build(contexto) -> (path, dados JSON ou None)
+        self.build = build
+        # setup(contexto) roda antes de cada repetição, fora da medição
+        self.setup = setup
+        # relogin: a rota encerra a sessão, então o cliente entra de novo antes da próxima repetição
+        self.relogin = relogin
+
+
+class Contexto:
+    def __init__(self, user, rng):
+        self.user = user
+        self.rng = rng
+        self.catalogo = get_catalog()
+        self.word_ids = list(self.catalogo)
+        self.set_id = None
+        self.job_id = None
+
+    def palavra(self):
+        return self.catalogo.get(self.rng.choice(self.word_ids))
+
+    def resposta(self):
+        word = self.palavra()
+        return {'word_id': word.id, 'user_answer': word.text_portuguese if self.rng.random() < 0.7 else 'errado'}
+
+    def palavra_vista(self):
+        word_id = UserWordStatus.objects.filter(user=self.user).values_list('word_id', flat=True).order_by('?').first()
+        return word_id or self.palavra().id
+
+    def preparar_conjunto(self):
+        # Um conjunto aberto com até 10 palavras do usuário em revisão (fora da medição)
+        agora = timezone.now()
+        with transaction.atomic():
+            training_set = get_or_create_today_set(self.user, agora)
+        ids = list(UserWordStatus.objects.filter(user=self.user).values_list('id', flat=True)[:10])
+        UserWordStatus.objects.filter(id__in=ids).update(
+            status='Em Revisao', training_set=training_set, consecutive_correct_answers=0, training_answered=False, next_review_date=agora, updated_at=agora,
+        )
+        self.set_id = training_set.id
+
+    def preparar_job(self):
+        # Uma tarefa já concluída do usuário, só para medir a consulta do andamento
+        self.job_id = Job.objects.create(name='reset_progress', user=self.user, status='done', result={}).id
+
+
+def _consumir(response):
+    # Views assíncronas (LEARNING_ASYNC_API) devolvem um iterador assíncrono
+    if response.is_async:
+        async def ler():
+            return [chunk async for chunk in response.streaming_content]
+        return async_to_sync(ler)()
+    return list(response.streaming_content)
+
+
+def _get(nome, query=None, args=None):
+    return lambda contexto: (reverse(nome, args=args(contexto) if args else None) + (f'?{query}' if query else ''), None)
+
+
+def _post(nome, dados=None):
+    return lambda contexto: (reverse(nome), dados(contexto) if dados else None)
+
+
+ENDPOINTS = {
+    # learning/urls.py
+    'home': Endpoint('GET', _get('home')),
+    'dashboard': Endpoint('GET', _get('dashboard')),
+    'training_set_list': Endpoint('GET', _get('training_set_list')),
+    'study_session': Endpoint('GET', _get('study_session')),
+    'training_session': Endpoint('GET', _get('training_session', args=lambda c: [c.set_id]), setup=lambda c: c.set_id or c.preparar_conjunto()),
+    'check_answer': Endpoint('POST', _post('check_answer', lambda c: c.resposta())),
+    'check_answers_batch': Endpoint('POST', _post('check_answers_batch', lambda c: {'answers': [c.resposta() for _ in range(20)]})),
+    'next_cards': Endpoint('GET', _get('next_cards', query='limit=10')),
+    'mark_as_correct': Endpoint('POST', _post('mark_as_correct', lambda c: {'word_id': c.palavra_vista()})),
+    'master_set': Endpoint('POST', _post('master_set', lambda c: {'set_id': c.set_id}), setup=Contexto.preparar_conjunto),
+    'chart_data': Endpoint('GET', _get('chart_data')),
+    'metrics': Endpoint('GET', _get('metrics', query='format=json')),
+    'export_progress': Endpoint('GET', _get('export_progress', query='format=ndjson')),
+    'job_status': Endpoint('GET', _get('job_status', args=lambda c: [c.job_id]), setup=lambda c: c.job_id or c.preparar_job()),
+    # users/urls.py
+    'signup': Endpoint('GET', _get('signup')),
+    'login': Endpoint('GET', _get('login')),
+    'logout': Endpoint('POST', _post('logout'), relogin=True),
+    'settings': Endpoint('GET', _get('settings')),
+    'reset_progress': Endpoint('POST', _post('reset_progress')),
+    'api_logout': Endpoint('POST', _post('api_logout'), relogin=True),
+}
+
+
+def percentil(valores_ordenados, p):
+    # Percentil pelo método do posto mais próximo (sem interpolação)
+    indice = max(math.ceil(p / 100 * len(valores_ordenados)) - 1, 0)
+    return valores_ordenados[indice]
+
+
+def commit_atual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede a latência (p50/p95/p99) e o número de consultas SQL de todas as rotas de learning/ e users/, '
+        'usando o cliente de testes do Django contra o banco configurado, e salva o resultado em JSON. '
+        'As rotas gravam no banco: use um banco com dados sintéticos (generate_synthetic_data).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=str, help='Username usado nas requisições (padrão: o primeiro usuário sintetico_u*)')
+        parser.add_argument('--iterations', type=int, default=50, help='Requisições medidas por rota (padrão: 50)')
+        parser.add_argument('--warmup', type=int, default=3, help='Requisições de aquecimento por rota, não medidas (padrão: 3)')
+        parser.add_argument('--endpoint', action='append', dest='endpoints', help='Mede só esta rota (nome da URL); pode repetir')
+        parser.add_argument('--include-destructive', action='store_true', help='Inclui rotas que apagam o progresso do usuário (reset_progress)')
+        parser.add_argument('--seed', type=int, default=42, help='Semente das respostas sorteadas (padrão: 42)')
+        parser.add_argument('--label', type=str, default='', help='Descrição livre gravada no JSON (ex.: "MySQL local, 10k usuários")')
+        parser.add_argument('--output', type=str, help='Arquivo JSON de saída (padrão: benchmark-<commit>-<data>.json)')
+        parser.add_argument('--compare', type=str, help='JSON de uma execução anterior, para mostrar a diferença de p95 e de consultas')
+
+    def handle(self, *args, **kwargs):
+        # Libera o host 'testserver' do cliente de testes sem alterar ALLOWED_HOSTS
+        setup_test_environment()
+        user = self._usuario(kwargs['user'])
+        contexto = Contexto(user, random.Random(kwargs['seed']))
+        client = Client(raise_request_exception=False)
+        client.force_login(user)
+
+        nomes = [padrao.name for padrao in learning_urls + users_urls if padrao.name]
+        if kwargs['endpoints']:
+            desconhecidos = set(kwargs['endpoints']) - set(nomes)
+            if desconhecidos:
+                raise CommandError(f"Rotas desconhecidas: {', '.join(sorted(desconhecidos))}")
+            nomes = [nome for nome in nomes if nome in kwargs['endpoints']]
+        elif not kwargs['include_destructive']:
+            nomes = [nome for nome in nomes if nome not in ROTAS_DESTRUTIVAS]
+
+        resultados = []
+        for nome in nomes:
+            endpoint = ENDPOINTS.get(nome)
+            if endpoint is None:
+                self.stdout.write(self.style.WARNING(f"Rota '{nome}' sem cenário de benchmark; ignorada."))
+                continue
+            resultado = self._medir(client, contexto, nome, endpoint, kwargs['iterations'], kwargs['warmup'])
+            resultados.append(resultado)
+            self.stdout.write(
+                f"{nome:<22} p50 {resultado['p50_ms']:8.2f}ms  p95 {resultado['p95_ms']:8.2f}ms  "
+                f"p99 {resultado['p99_ms']:8.2f}ms  consultas {resultado['queries_mean']:6.1f} (máx. {resultado['queries_max']})"
+            )
+
+        commit = commit_atual()
+        relatorio = {
+            'commit': commit,
+            'label': kwargs['label'],
+            'created_at': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'user': user.username,
+            'catalog_size': len(contexto.catalogo),
+            'user_statuses': UserWordStatus.objects.filter(user=user).count(),
+            'iterations': kwargs['iterations'],
+            'endpoints': resultados,
+        }
+        output = kwargs['output'] or f"benchmark-{commit or 'sem-commit'}-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(output, 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"\nResultados salvos em {output}"))
+
+        if kwargs['compare']:
+            self._comparar(kwargs['compare'], resultados)
+
+    def _usuario(self, username):
+        usuarios = User.objects.order_by('id')
+        user = usuarios.filter(username=username).first() if username else usuarios.filter(username__startswith='sintetico_u').first()
+        if user is None:
+            raise CommandError("Usuário não encontrado. Informe --user ou rode antes o generate_synthetic_data.")
+        return user
+
+    def _medir(self, client, contexto, nome, endpoint, iteracoes, aquecimento):
+        tempos, consultas, codigos = [], [], {}
+        for repeticao in range(aquecimento + iteracoes):
+            if endpoint.setup:
+                endpoint.setup(contexto)
+            path, dados = endpoint.build(contexto)
+            corpo = json.dumps(dados) if dados is not None else ''
+            # Conta as consultas de todos os bancos (primário e réplicas de LEARNING_DB_REPLICAS)
+            with ExitStack() as pilha:
+                capturadas = [pilha.enter_context(CaptureQueriesContext(connections[alias])) for alias in connections]
+                inicio = time.perf_counter()
+                response = client.generic(endpoint.method, path, corpo, content_type='application/json')
+                if response.streaming:
+                    # As consultas de uma resposta em streaming rodam enquanto ela é lida
+                    _consumir(response)
+                decorrido = time.perf_counter() - inicio
+            if endpoint.relogin:
+                client.force_login(contexto.user)
+            if repeticao < aquecimento:
+                continue
+            tempos.append(decorrido * 1000)
+            consultas.append(sum(len(captura) for captura in capturadas))
+            codigos[response.status_code] = codigos.get(response.status_code, 0) + 1
+        tempos.sort()
+        return {
+            'name': nome,
+            'method': endpoint.method,
+            'path': path,
+            'status_codes': {str(codigo): total for codigo, total in sorted(codigos.items())},
+            'p50_ms': round(percentil(tempos, 50), 3),
+            'p95_ms': round(percentil(tempos, 95), 3),
+            'p99_ms': round(percentil(tempos, 99), 3),
+            'mean_ms': round(sum(tempos) / len(tempos), 3),
+            'queries_mean': round(sum(consultas) / len(consultas), 2),
+            'queries_max': max(consultas),
+        }
+
+    def _comparar(self, arquivo_anterior, resultados):
+        with open(arquivo_anterior, encoding='utf-8') as arquivo:
+            anterior = json.load(arquivo)
+        antes = {resultado['name']: resultado for resultado in anterior['endpoints']}
+        self.stdout.write(f"\nComparação com {arquivo_anterior} (commit {anterior.get('commit')}):")
+        for resultado in resultados:
+            velho = antes.get(resultado['name'])
+            if velho is None:
+                continue
+            variacao = (resultado['p95_ms'] - velho['p95_ms']) / velho['p95_ms'] * 100 if velho['p95_ms'] else 0
+            self.stdout.write(
+                f"{resultado['name']:<22} p95 {velho['p95_ms']:8.2f} -> {resultado['p95_ms']:8.2f}ms ({variacao:+.0f}%)  "
+                f"consultas {velho['queries_mean']:.1f} -> {resultado['queries_mean']:.1f}"
+            )
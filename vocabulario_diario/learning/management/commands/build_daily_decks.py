@@ -0,0 +1,55 @@
+import random
+import time
+from datetime import date
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from learning.catalog import get_catalog
+from learning.decks import active_user_batches, build_daily_decks, decks_config, schedule_nightly_decks
+from learning.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Monta o baralho do dia de cada usuário (revisões vencidas + palavras novas até a meta diária) '
+        'em lotes de usuários. Rode fora do horário de pico, ou agende com --schedule.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', type=str, help='Dia do baralho, AAAA-MM-DD (padrão: hoje)')
+        parser.add_argument('--batch-size', type=int, help='Usuários por lote (padrão: LEARNING_DAILY_DECKS["BATCH_SIZE"])')
+        parser.add_argument('--max-reviews', type=int, help='Máximo de revisões por baralho (padrão: LEARNING_DAILY_DECKS["MAX_REVIEWS"])')
+        parser.add_argument('--seed', type=int, help='Semente do sorteio das palavras novas')
+        parser.add_argument('--background', action='store_true', help='Coloca cada lote na fila de tarefas, para os workers (run_workers) montarem em paralelo')
+        parser.add_argument('--schedule', action='store_true', help='Só agenda a montagem noturna na fila (ela se reagenda a cada noite)')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['schedule']:
+            job = schedule_nightly_decks()
+            self.stdout.write(self.style.SUCCESS(f"Montagem noturna agendada para {timezone.localtime(job.run_after):%d/%m/%Y %H:%M} (tarefa #{job.id})."))
+            return
+
+        try:
+            dia = date.fromisoformat(kwargs['date']) if kwargs['date'] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--date deve estar no formato AAAA-MM-DD")
+        config = decks_config()
+        batch_size = kwargs['batch_size'] or config['BATCH_SIZE']
+        max_reviews = kwargs['max_reviews'] or config['MAX_REVIEWS']
+        rng = random.Random(kwargs['seed'])
+        word_ids = get_catalog().id_array()
+
+        usuarios, cartoes = 0, 0
+        inicio = time.monotonic()
+        for user_ids in active_user_batches(batch_size):
+            usuarios += len(user_ids)
+            if kwargs['background']:
+                enqueue('build_daily_decks', {'user_ids': user_ids, 'date': dia.isoformat(), 'max_reviews': max_reviews})
+                continue
+            cartoes += build_daily_decks(user_ids, dia, word_ids, max_reviews, rng)
+            decorrido = max(time.monotonic() - inicio, 1e-6)
+            self.stdout.write(f"{usuarios} usuários, {cartoes} cartões ({usuarios / decorrido:.0f} usuários/s)")
+
+        if kwargs['background']:
+            self.stdout.write(self.style.SUCCESS(f"{usuarios} usuários na fila; acompanhe com run_workers."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Baralhos de {dia:%d/%m/%Y} montados: {usuarios} usuários, {cartoes} cartões."))
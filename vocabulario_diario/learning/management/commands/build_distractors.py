@@ -0,0 +1,29 @@
+import time
+from django.core.management.base import BaseCommand
+from learning.distractors import rebuild_distractors, stale_word_ids
+from learning.jobs import enqueue
+
+
+class Command(BaseCommand):
+    help = (
+        'Pré-calcula os distratores do modo de múltipla escolha (WordDistractors). Sem --full, só as '
+        'palavras sem distratores (novas ou alteradas pelo import_words) e as que dependiam delas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recalcula todas as palavras (palavras novas passam a ser distratores das antigas)')
+        parser.add_argument('--background', action='store_true', help='Coloca o cálculo na fila de tarefas (run_workers) e sai')
+
+    def handle(self, *args, **kwargs):
+        if kwargs['background']:
+            job = enqueue('build_distractors', {'full': kwargs['full']})
+            self.stdout.write(self.style.SUCCESS(f"Cálculo dos distratores colocado na fila como a tarefa #{job.id}."))
+            return
+
+        inicio = time.monotonic()
+        word_ids = None if kwargs['full'] else stale_word_ids()
+        if word_ids is not None and not word_ids:
+            self.stdout.write(self.style.SUCCESS("Os distratores já estão em dia; nada a fazer."))
+            return
+        palavras = rebuild_distractors(word_ids)
+        self.stdout.write(self.style.SUCCESS(f"Distratores de {palavras} palavras calculados em {time.monotonic() - inicio:.1f}s."))
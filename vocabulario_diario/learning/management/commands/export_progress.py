@@ -0,0 +1,49 @@
+import sys
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from learning.export import FORMATOS, TAMANHO_DA_PAGINA, export_chunks, parse_updated_since, progress_queryset
+
+
+class Command(BaseCommand):
+    help = 'Exporta o progresso (UserWordStatus) de todos os usuários em CSV ou NDJSON, em páginas e com memória constante'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=list(FORMATOS), default='csv', help='Formato da exportação (padrão: csv)')
+        parser.add_argument('--output', type=str, help='Arquivo de saída (padrão: saída padrão); terminado em .gz liga o --gzip')
+        parser.add_argument('--gzip', action='store_true', help='Comprime a saída com gzip')
+        parser.add_argument('--user', type=str, action='append', help='Exporta só este username (pode repetir)')
+        parser.add_argument('--updated-since', type=str, help='Só as linhas alteradas a partir desta data/hora ISO 8601 (exportação incremental)')
+        parser.add_argument('--chunk-size', type=int, default=TAMANHO_DA_PAGINA, help=f'Linhas lidas por consulta (padrão: {TAMANHO_DA_PAGINA})')
+
+    def handle(self, *args, **kwargs):
+        try:
+            updated_since = parse_updated_since(kwargs['updated_since']) if kwargs['updated_since'] else None
+        except ValueError as erro:
+            raise CommandError(str(erro))
+        user_ids = None
+        if kwargs['user']:
+            user_ids = list(User.objects.filter(username__in=kwargs['user']).values_list('id', flat=True))
+            if len(user_ids) != len(set(kwargs['user'])):
+                raise CommandError("Usuário não encontrado.")
+
+        saida = kwargs['output']
+        gzip = kwargs['gzip'] or bool(saida and saida.endswith('.gz'))
+        iniciada_em = timezone.now()
+        chunks = export_chunks(
+            progress_queryset(user_ids, updated_since), kwargs['format'], com_usuario=True, gzip=gzip, chunk_size=kwargs['chunk_size'],
+        )
+        arquivo = open(saida, 'wb') if saida else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                arquivo.write(chunk)
+        finally:
+            if saida:
+                arquivo.close()
+            else:
+                arquivo.flush()
+
+        # Na saída de erros, para não se misturar com a exportação quando ela vai para a saída padrão
+        self.stderr.write(self.style.SUCCESS(
+            f"Exportação concluída. Use --updated-since {iniciada_em.isoformat()} na próxima exportação incremental."
+        ))
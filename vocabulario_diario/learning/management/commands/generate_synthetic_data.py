@@ -0,0 +1,151 @@
+import time
+from datetime import timedelta
+import numpy as np
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from learning.answer_index import build_answer_keys
+from learning.catalog import invalidate_catalog
+from learning.models import CatalogVersion, DailyProgress, TrainingSet, UserWordStatus, Word
+from learning.seen import rebuild_seen_words
+from learning.stats import recompute_user_stats
+from users.models import Profile
+
+SILABAS = [
+    'ba', 'be', 'bi', 'bo', 'ca', 'ce', 'co', 'da', 'de', 'di', 'do', 'fa', 'fe', 'fi', 'ga', 'go', 'la', 'le',
+    'li', 'lo', 'ma', 'me', 'mi', 'mo', 'na', 'ne', 'no', 'pa', 'pe', 'pi', 'po', 'ra', 're', 'ri', 'ro', 'sa',
+    'se', 'si', 'so', 'ta', 'te', 'ti', 'to', 'va', 've', 'vi', 'ção', 'nha', 'lhe', 'ão', 'ar', 'er', 'or',
+]
+
+# Distribuição dos status gerados (a mesma ordem de STATUS_GERADOS)
+STATUS_GERADOS = ['Acertou de Primeira', 'Dominado', 'Em Revisao']
+PROBABILIDADES = [0.4, 0.4, 0.2]
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera um catálogo e usuários sintéticos (com status, conjuntos de treino e histórico diário) '
+        'para testes de carga. Tudo é gravado com INSERTs em massa e é reproduzível pela --seed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--words', type=int, default=100000, help='Quantas palavras sintéticas criar (padrão: 100000)')
+        parser.add_argument('--users', type=int, default=1000, help='Quantos usuários sintéticos criar (padrão: 1000)')
+        parser.add_argument('--statuses-per-user', type=int, default=500, help='Quantas palavras já vistas por usuário (padrão: 500)')
+        parser.add_argument('--days', type=int, default=30, help='Dias de histórico (DailyProgress) por usuário (padrão: 30)')
+        parser.add_argument('--prefix', type=str, default='sintetico', help='Prefixo dos usernames criados (padrão: sintetico)')
+        parser.add_argument('--password', type=str, default='sintetico', help='Senha de todos os usuários criados')
+        parser.add_argument('--seed', type=int, default=42, help='Semente do gerador aleatório (padrão: 42)')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Linhas por INSERT em massa (padrão: 10000)')
+        parser.add_argument('--users-per-batch', type=int, default=100, help='Usuários processados por transação (padrão: 100)')
+
+    def handle(self, *args, **kwargs):
+        self.rng = np.random.default_rng(kwargs['seed'])
+        self.batch_size = kwargs['batch_size']
+        inicio = time.monotonic()
+
+        self._gerar_palavras(kwargs['words'])
+        word_ids = np.array(Word.objects.order_by('id').values_list('id', flat=True), dtype=np.int64)
+        self.stdout.write(f"Catálogo com {len(word_ids)} palavras.")
+
+        user_ids = self._gerar_usuarios(kwargs['users'], kwargs['prefix'], kwargs['password'])
+        # Só recebem status os usuários que ainda não têm nenhum: rodar de novo com --users maior só completa
+        sem_status = list(
+            User.objects.filter(id__in=user_ids)
+            .exclude(Exists(UserWordStatus.objects.filter(user=OuterRef('pk'))))
+            .order_by('id').values_list('id', flat=True)
+        )
+        por_usuario = min(kwargs['statuses_per_user'], len(word_ids))
+        por_lote = kwargs['users_per_batch']
+        linhas = 0
+        for i in range(0, len(sem_status), por_lote):
+            lote = sem_status[i:i + por_lote]
+            linhas += self._gerar_progresso(lote, word_ids, por_usuario, kwargs['days'])
+            decorrido = max(time.monotonic() - inicio, 1e-6)
+            self.stdout.write(f"{i + len(lote)}/{len(sem_status)} usuários, {linhas} status ({linhas / decorrido:.0f} linhas/s)")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\nDados sintéticos gerados em {time.monotonic() - inicio:.1f}s: "
+            f"{len(user_ids)} usuários '{kwargs['prefix']}_u*', {linhas} novos status."
+        ))
+
+    def _palavra(self):
+        quantidade = int(self.rng.integers(2, 6))
+        return ''.join(SILABAS[i] for i in self.rng.integers(0, len(SILABAS), quantidade))
+
+    def _gerar_palavras(self, quantidade):
+        existentes = Word.objects.count()
+        if existentes >= quantidade:
+            return
+        vistas = set()
+        palavras = []
+        while len(palavras) < quantidade - existentes:
+            ingles = self._palavra()
+            if ingles in vistas:
+                continue
+            vistas.add(ingles)
+            portugues = self._palavra()
+            sinonimos = ', '.join(self._palavra() for _ in range(int(self.rng.integers(0, 3)))) or None
+            palavras.append(Word(
+                text_english=ingles, text_portuguese=portugues, synonyms_portuguese=sinonimos,
+                complexity=len(ingles), answer_keys=build_answer_keys(portugues, sinonimos),
+            ))
+        # ignore_conflicts: uma palavra sorteada pode já existir no catálogo real
+        Word.objects.bulk_create(palavras, batch_size=self.batch_size, ignore_conflicts=True)
+        CatalogVersion.bump()
+        invalidate_catalog()
+
+    def _gerar_usuarios(self, quantidade, prefixo, senha):
+        senha = make_password(senha)  # o hash é caro: calculado uma vez para todos
+        usernames = [f"{prefixo}_u{i:07d}" for i in range(quantidade)]
+        User.objects.bulk_create(
+            [User(username=username, password=senha) for username in usernames],
+            batch_size=self.batch_size, ignore_conflicts=True,
+        )
+        # O MySQL não devolve os ids do bulk_create: relê pelo username
+        user_ids = list(User.objects.filter(username__in=usernames).order_by('id').values_list('id', flat=True))
+        Profile.objects.bulk_create([Profile(user_id=user_id) for user_id in user_ids], batch_size=self.batch_size, ignore_conflicts=True)
+        return user_ids
+
+    def _gerar_progresso(self, user_ids, word_ids, por_usuario, dias):
+        agora = timezone.now()
+        hoje = agora.date()
+        with transaction.atomic():
+            # Um conjunto de treino aberto por usuário, para as palavras 'Em Revisao'
+            # (ignore_conflicts: usuários de uma execução anterior já podem ter o conjunto de hoje)
+            TrainingSet.objects.bulk_create(
+                [TrainingSet(user_id=user_id, creation_date=hoje, open_date=hoje) for user_id in user_ids], ignore_conflicts=True,
+            )
+            conjuntos = dict(TrainingSet.objects.filter(user_id__in=user_ids, open_date=hoje).values_list('user_id', 'id'))
+            status_novos, progresso = [], []
+            for user_id in user_ids:
+                escolhidas = self.rng.choice(word_ids, size=por_usuario, replace=False)
+                tipos = self.rng.choice(len(STATUS_GERADOS), size=por_usuario, p=PROBABILIDADES)
+                acertos = self.rng.integers(1, 8, size=por_usuario)
+                # Revisões espalhadas entre 30 dias atrás e 30 dias à frente (parte já vencida)
+                deslocamentos = self.rng.uniform(-30, 30, size=por_usuario)
+                for word_id, tipo, consecutivos, dias_ate_revisao in zip(escolhidas.tolist(), tipos.tolist(), acertos.tolist(), deslocamentos.tolist()):
+                    em_revisao = STATUS_GERADOS[tipo] == 'Em Revisao'
+                    status_novos.append(UserWordStatus(
+                        user_id=user_id, word_id=word_id, status=STATUS_GERADOS[tipo],
+                        consecutive_correct_answers=0 if em_revisao else consecutivos,
+                        next_review_date=agora + timedelta(days=min(dias_ate_revisao, 0) if em_revisao else dias_ate_revisao),
+                        training_set_id=conjuntos[user_id] if em_revisao else None,
+                    ))
+                # O histórico diário soma exatamente o vocabulário gerado, como no uso real
+                aprendidas = int(np.count_nonzero(tipos != STATUS_GERADOS.index('Em Revisao')))
+                if dias > 0:
+                    for dia, quantidade in enumerate(self.rng.multinomial(aprendidas, [1 / dias] * dias).tolist()):
+                        if quantidade:
+                            progresso.append(DailyProgress(
+                                user_id=user_id, date=hoje - timedelta(days=dias - 1 - dia),
+                                answers=quantidade * 2, correct_answers=quantidade, words_learned=quantidade,
+                            ))
+            UserWordStatus.objects.bulk_create(status_novos, batch_size=self.batch_size)
+            DailyProgress.objects.bulk_create(progresso, batch_size=self.batch_size)
+            recompute_user_stats(user_ids)
+            rebuild_seen_words(user_ids)
+        return len(status_novos)
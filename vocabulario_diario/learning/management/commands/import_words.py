@@ -1,47 +1,170 @@
-import pandas as pd
-from django.core.management.base import BaseCommand
-from learning.models import Word
+import csv
+import time
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from learning.answer_index import build_answer_keys
+from learning.catalog import invalidate_catalog
+from learning.jobs import enqueue
+from learning.models import CatalogVersion, Word, WordDistractors
+
+# Colunas da planilha (a de sinônimos é opcional)
+COLUNA_INGLES = 'Sig_Ingles'
+COLUNA_PORTUGUES = 'Sig_Portugues'
+COLUNA_COMPLEXIDADE = 'Complexidade_Comprimento'
+COLUNA_SINONIMOS = 'Sinonimos_Portugues'
+
+# Campos que são atualizados quando a palavra já existe e mudou na planilha
+CAMPOS_ATUALIZAVEIS = ['text_portuguese', 'synonyms_portuguese', 'complexity', 'answer_keys']
+# Campos usados no cálculo dos distratores (learning/distractors.py)
+CAMPOS_DOS_DISTRATORES = {'text_portuguese', 'synonyms_portuguese', 'complexity'}
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    return str(valor).strip()
+
+
+def ler_linhas(file_path):
+    """
+    Lê o arquivo linha a linha (CSV ou XLSX), sem carregar tudo na memória.
+    Devolve tuplas (número_da_linha, dicionário coluna -> valor).
+    """
+    if Path(file_path).suffix.lower() == '.csv':
+        with open(file_path, newline='', encoding='utf-8-sig') as arquivo:
+            for numero, row in enumerate(csv.DictReader(arquivo), start=2):
+                yield numero, row
+        return
+
+    from openpyxl import load_workbook
+    # read_only=True faz o openpyxl ler a planilha em streaming
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        linhas = workbook.active.iter_rows(values_only=True)
+        cabecalho = [_texto(coluna) for coluna in next(linhas, ())]
+        for numero, valores in enumerate(linhas, start=2):
+            yield numero, dict(zip(cabecalho, valores))
+    finally:
+        workbook.close()
+
 
 class Command(BaseCommand):
-    help = 'Importa palavras de um arquivo XLSX (Excel) para o banco de dados'
+    help = 'Importa palavras de um arquivo XLSX (Excel) ou CSV para o banco de dados, em lotes'
 
     def add_arguments(self, parser):
-        parser.add_argument('xlsx_file_path', type=str, help='O caminho para o arquivo XLSX')
+        parser.add_argument('xlsx_file_path', type=str, help='O caminho para o arquivo XLSX ou CSV')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Quantas linhas gravar por lote (padrão: 1000)')
+        parser.add_argument('--dry-run', action='store_true', help='Apenas mostra o que seria criado/alterado, sem gravar nada')
+        parser.add_argument('--background', action='store_true', help='Coloca a importação na fila de tarefas (run_workers) e sai')
 
     def handle(self, *args, **kwargs):
         file_path = kwargs['xlsx_file_path']
-        self.stdout.write(f"Iniciando a importação do arquivo Excel: {file_path}")
+        self.batch_size = kwargs['batch_size']
+        self.dry_run = kwargs['dry_run']
+        if kwargs['background']:
+            # O caminho precisa ser acessível pela máquina dos workers
+            job = enqueue('import_words', {'file_path': str(Path(file_path).resolve()), 'batch_size': self.batch_size})
+            self.stdout.write(self.style.SUCCESS(f"Importação colocada na fila como a tarefa #{job.id}."))
+            return
+        self.stdout.write(f"Iniciando a importação do arquivo: {file_path}")
+        if self.dry_run:
+            self.stdout.write(self.style.WARNING("Modo --dry-run: nenhuma alteração será gravada."))
 
-        try:
-            df = pd.read_excel(file_path)
+        self.palavras_criadas = 0
+        self.palavras_atualizadas = 0
+        self.palavras_existentes = 0
+        self.lotes_gravados = 0
+        linhas_lidas = 0
+        inicio = time.monotonic()
 
-            palavras_criadas = 0
-            palavras_existentes = 0
-
-            for index, row in df.iterrows():
-                if 'Sig_Ingles' not in row or 'Sig_Portugues' not in row or 'Complexidade_Comprimento' not in row:
-                    self.stdout.write(self.style.WARNING(f"Aviso: Linha {index+2} ignorada por não conter as colunas necessárias."))
+        try:
+            lote = {}
+            for numero, row in ler_linhas(file_path):
+                linhas_lidas += 1
+                ingles = _texto(row.get(COLUNA_INGLES))
+                portugues = _texto(row.get(COLUNA_PORTUGUES))
+                complexidade = _texto(row.get(COLUNA_COMPLEXIDADE))
+                if not ingles or not portugues or not complexidade:
+                    self.stdout.write(self.style.WARNING(f"Aviso: Linha {numero} ignorada por não conter as colunas necessárias."))
                     continue
-                
-                word, created = Word.objects.get_or_create(
-                    text_english=row['Sig_Ingles'],
-                    defaults={
-                        'text_portuguese': row['Sig_Portugues'],
-                        'complexity': int(row['Complexidade_Comprimento']),
-                    }
-                )
-
-                if created:
-                    palavras_criadas += 1
-                else:
-                    palavras_existentes += 1
-            
-            self.stdout.write(self.style.SUCCESS(f"\nImportação concluída!"))
-            # LINHA CORRIGIDA ABAIXO
-            self.stdout.write(f"{palavras_criadas} novas palavras foram adicionadas.")
-            self.stdout.write(f"{palavras_existentes} palavras já existiam no banco de dados.")
 
+                # Se a mesma palavra aparecer duas vezes no lote, vale a última linha
+                lote[ingles] = {
+                    'text_portuguese': portugues,
+                    'synonyms_portuguese': _texto(row.get(COLUNA_SINONIMOS)) or None,
+                    'complexity': int(float(complexidade)),
+                }
+                # O índice de respostas aceitas é calculado aqui, uma vez por palavra importada
+                lote[ingles]['answer_keys'] = build_answer_keys(portugues, lote[ingles]['synonyms_portuguese'])
+                if len(lote) >= self.batch_size:
+                    self._gravar_lote(lote)
+                    lote = {}
+                    self._mostrar_progresso(linhas_lidas, inicio)
+            if lote:
+                self._gravar_lote(lote)
+            self._mostrar_progresso(linhas_lidas, inicio)
         except FileNotFoundError:
-            self.stdout.write(self.style.ERROR("Erro: Arquivo não encontrado. Verifique o caminho."))
+            raise CommandError("Arquivo não encontrado. Verifique o caminho.")
         except Exception as e:
-            self.stdout.write(self.style.ERROR(f"Ocorreu um erro inesperado: {e}"))
\ No newline at end of file
+            # CommandError: quem chamou (terminal ou tarefa da fila) fica sabendo que a importação falhou
+            raise CommandError(f"Ocorreu um erro inesperado: {e}") from e
+        finally:
+            # bulk_create/bulk_update não disparam sinais: avisa os workers que o catálogo mudou.
+            # Também depois de uma falha no meio, para os lotes já gravados não ficarem invisíveis
+            if self.lotes_gravados:
+                CatalogVersion.bump()
+                invalidate_catalog()
+                # Distratores das palavras novas e das alteradas (linhas apagadas em _gravar_lote)
+                enqueue('build_distractors')
+
+        if self.dry_run:
+            self.stdout.write(self.style.SUCCESS(f"\nSimulação concluída! Os números abaixo não foram gravados."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"\nImportação concluída!"))
+        self.stdout.write(f"{self.palavras_criadas} novas palavras foram adicionadas.")
+        self.stdout.write(f"{self.palavras_atualizadas} palavras foram atualizadas.")
+        self.stdout.write(f"{self.palavras_existentes} palavras já existiam no banco de dados sem alterações.")
+
+    def _gravar_lote(self, lote):
+        # Um SELECT para o lote inteiro, um INSERT em massa para as novas e um UPDATE em massa para as alteradas
+        existentes = {
+            word.text_english: word
+            for word in Word.objects.filter(text_english__in=lote.keys()).only('id', 'text_english', *CAMPOS_ATUALIZAVEIS)
+        }
+        novas, alteradas, sem_distratores = [], [], []
+        for ingles, valores in lote.items():
+            word = existentes.get(ingles)
+            if word is None:
+                novas.append(Word(text_english=ingles, **valores))
+                if self.dry_run:
+                    self.stdout.write(f"+ {ingles}: {valores['text_portuguese']}")
+                continue
+            mudancas = {campo: valor for campo, valor in valores.items() if getattr(word, campo) != valor}
+            if not mudancas:
+                self.palavras_existentes += 1
+                continue
+            if self.dry_run:
+                diff = ', '.join(f"{campo}: {getattr(word, campo)!r} -> {valor!r}" for campo, valor in mudancas.items())
+                self.stdout.write(f"~ {ingles}: {diff}")
+            for campo, valor in mudancas.items():
+                setattr(word, campo, valor)
+            alteradas.append(word)
+            if CAMPOS_DOS_DISTRATORES & mudancas.keys():
+                sem_distratores.append(word.id)
+
+        self.palavras_criadas += len(novas)
+        self.palavras_atualizadas += len(alteradas)
+        if self.dry_run or not (novas or alteradas):
+            return
+        with transaction.atomic():
+            # ignore_conflicts protege contra uma importação concorrente inserindo a mesma palavra
+            Word.objects.bulk_create(novas, batch_size=self.batch_size, ignore_conflicts=True)
+            Word.objects.bulk_update(alteradas, CAMPOS_ATUALIZAVEIS, batch_size=self.batch_size)
+            if sem_distratores:
+                WordDistractors.objects.filter(word_id__in=sem_distratores).delete()
+        self.lotes_gravados += 1
+
+    def _mostrar_progresso(self, linhas_lidas, inicio):
+        decorrido = max(time.monotonic() - inicio, 1e-6)
+        self.stdout.write(f"{linhas_lidas} linhas processadas ({linhas_lidas / decorrido:.0f} linhas/s)")
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from learning.answer_index import build_answer_keys
+from learning.models import CatalogVersion, Word
+
+
+class Command(BaseCommand):
+    help = 'Recalcula o índice de respostas aceitas (Word.answer_keys) de todo o catálogo, em lotes'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Quantas palavras processar por lote (padrão: 2000)')
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        palavras_atualizadas = 0
+        ultimo_id = 0
+
+        # Paginação por chave (id > último id) para não usar OFFSET em catálogos grandes
+        while True:
+            lote = list(
+                Word.objects.filter(id__gt=ultimo_id).order_by('id')
+                .only('id', 'text_portuguese', 'synonyms_portuguese', 'answer_keys')[:batch_size]
+            )
+            if not lote:
+                break
+            ultimo_id = lote[-1].id
+
+            alteradas = []
+            for word in lote:
+                answer_keys = build_answer_keys(word.text_portuguese, word.synonyms_portuguese)
+                if word.answer_keys != answer_keys:
+                    word.answer_keys = answer_keys
+                    alteradas.append(word)
+            Word.objects.bulk_update(alteradas, ['answer_keys'], batch_size=batch_size)
+            palavras_atualizadas += len(alteradas)
+
+        if palavras_atualizadas:
+            # Os workers guardam as respostas aceitas no cache do catálogo
+            CatalogVersion.bump()
+        self.stdout.write(self.style.SUCCESS(f"Índice de respostas recalculado: {palavras_atualizadas} palavras atualizadas."))
@@ -0,0 +1,44 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from learning.jobs import enqueue
+from learning.progress_cache import bump_progress_versions
+from learning.seen import rebuild_seen_words
+from learning.stats import recompute_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Recalcula as estatísticas do painel (UserStats) e os mapas de palavras vistas (SeenWords) a partir de UserWordStatus, corrigindo divergências'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500, help='Quantos usuários recalcular por lote (padrão: 500)')
+        parser.add_argument('--user', type=str, help='Recalcula apenas o usuário com este username')
+        parser.add_argument('--background', action='store_true', help='Coloca cada lote na fila de tarefas, para os workers (run_workers) recalcularem em paralelo')
+
+    def handle(self, *args, **kwargs):
+        batch_size = kwargs['batch_size']
+        usuarios = User.objects.order_by('id')
+        if kwargs['user']:
+            usuarios = usuarios.filter(username=kwargs['user'])
+
+        usuarios_recalculados = 0
+        ultimo_id = 0
+        while True:
+            user_ids = list(usuarios.filter(id__gt=ultimo_id).values_list('id', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            ultimo_id = user_ids[-1]
+            usuarios_recalculados += len(user_ids)
+            if kwargs['background']:
+                enqueue('recompute_user_stats', {'user_ids': user_ids})
+                self.stdout.write(f"{usuarios_recalculados} usuários colocados na fila...")
+                continue
+            # Uma agregação condicional e um upsert em massa por lote de usuários
+            recompute_user_stats(user_ids)
+            rebuild_seen_words(user_ids)
+            bump_progress_versions(user_ids)
+            self.stdout.write(f"{usuarios_recalculados} usuários recalculados...")
+
+        if kwargs['background']:
+            self.stdout.write(self.style.SUCCESS(f"{usuarios_recalculados} usuários na fila; acompanhe com run_workers."))
+            return
+        self.stdout.write(self.style.SUCCESS(f"Estatísticas recalculadas para {usuarios_recalculados} usuários."))
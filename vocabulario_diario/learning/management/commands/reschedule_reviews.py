@@ -0,0 +1,71 @@
+import json
+import time
+from datetime import timedelta
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Case, F, Max, Min, When
+from django.utils import timezone
+from learning.models import UserWordStatus
+from learning.scheduling import build_scheduler, get_scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        'Reagenda a próxima revisão de todas as palavras quando o algoritmo de repetição espaçada '
+        '(ou os seus parâmetros) muda. Processa em lotes, com cálculo vetorizado em NumPy.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--from-algorithm', type=str, default='linear', help='Algoritmo usado para calcular as datas atuais (padrão: linear)')
+        parser.add_argument('--from-options', type=str, default='{}', help='Parâmetros do algoritmo antigo, em JSON')
+        parser.add_argument('--batch-size', type=int, default=50000, help='Tamanho de cada faixa de ids atualizada por comando (padrão: 50000)')
+
+    def handle(self, *args, **kwargs):
+        try:
+            antigo = build_scheduler(kwargs['from_algorithm'], json.loads(kwargs['from_options']))
+        except ValueError as e:
+            raise CommandError(f"--from-options inválido: {e}")
+        novo = get_scheduler()
+        batch_size = kwargs['batch_size']
+        self.stdout.write(f"Reagendando de '{antigo.name}' para '{novo.name}'...")
+
+        # Só as palavras agendadas por acerto. As erradas (revisão em minutos) ficam como estão,
+        # inclusive as de um conjunto de treino: o acerto no treino soma consecutive_correct_answers
+        # mas mantém a data de reaprendizado (answers.apply_answer)
+        agendadas = UserWordStatus.objects.filter(
+            status__in=['Acertou de Primeira', 'Dominado'], training_set__isnull=True,
+            consecutive_correct_answers__gte=1, next_review_date__isnull=False,
+        )
+
+        # A data da última revisão é (próxima revisão - intervalo antigo), e a nova data é essa
+        # âncora + intervalo novo. Como os dois intervalos dependem só do número de acertos,
+        # o deslocamento é calculado de uma vez (NumPy) para cada valor distinto de acertos.
+        acertos = np.array(sorted(agendadas.values_list('consecutive_correct_answers', flat=True).distinct()), dtype=np.int64)
+        if not len(acertos):
+            self.stdout.write(self.style.SUCCESS("Nenhuma palavra agendada para reagendar."))
+            return
+        deslocamentos = novo.interval_days_batch(acertos) - antigo.interval_days_batch(acertos)
+        alterados = {int(n): float(dias) for n, dias in zip(acertos, deslocamentos) if dias}
+        if not alterados:
+            self.stdout.write(self.style.SUCCESS("Os dois algoritmos dão as mesmas datas; nada a fazer."))
+            return
+        casos = [
+            When(consecutive_correct_answers=n, then=F('next_review_date') + timedelta(days=dias))
+            for n, dias in alterados.items()
+        ]
+        agendadas = agendadas.filter(consecutive_correct_answers__in=list(alterados))
+
+        # Um único UPDATE ... CASE por faixa de ids, para não travar a tabela inteira de uma vez
+        limites = agendadas.aggregate(menor=Min('id'), maior=Max('id'))
+        linhas_reagendadas = 0
+        inicio = time.monotonic()
+        for inicio_da_faixa in range(limites['menor'] or 0, (limites['maior'] or -1) + 1, batch_size):
+            with transaction.atomic():
+                linhas_reagendadas += agendadas.filter(
+                    id__gte=inicio_da_faixa, id__lt=inicio_da_faixa + batch_size
+                ).update(next_review_date=Case(*casos, default=F('next_review_date')), updated_at=timezone.now())
+            decorrido = max(time.monotonic() - inicio, 1e-6)
+            self.stdout.write(f"{linhas_reagendadas} linhas reagendadas ({linhas_reagendadas / decorrido:.0f} linhas/s)")
+
+        self.stdout.write(self.style.SUCCESS(f"Reagendamento concluído: {linhas_reagendadas} linhas."))
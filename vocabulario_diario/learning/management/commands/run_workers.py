@@ -0,0 +1,54 @@
+import multiprocessing
+import os
+import signal
+from django.core.management.base import BaseCommand
+from django.db import connections
+from learning.jobs import TASKS, jobs_config, worker_loop
+
+
+class Command(BaseCommand):
+    help = (
+        'Executa as tarefas em segundo plano (tabela learning.Job) em vários processos, '
+        'por padrão um por núcleo. Cada processo pega a próxima tarefa da fila no banco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processes', type=int, default=os.cpu_count() or 1, help='Quantos processos de worker (padrão: número de núcleos)')
+        parser.add_argument('--poll-interval', type=float, help='Segundos de espera quando a fila está vazia (padrão: LEARNING_JOBS["POLL_INTERVAL"])')
+        parser.add_argument('--burst', action='store_true', help='Sai quando a fila esvaziar, em vez de esperar novas tarefas')
+
+    def handle(self, *args, **kwargs):
+        processos = max(kwargs['processes'], 1)
+        poll_interval = kwargs['poll_interval'] or jobs_config()['POLL_INTERVAL']
+        burst = kwargs['burst']
+        self.stdout.write(f"Iniciando {processos} worker(s); tarefas registradas: {', '.join(sorted(TASKS))}")
+
+        if processos == 1:
+            # Sem processos filhos: mais fácil de depurar e o único modo seguro com SQLite em memória
+            parada = multiprocessing.Event()
+            try:
+                executadas = worker_loop(parada, poll_interval, burst)
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(self.style.SUCCESS(f"{executadas} tarefa(s) executada(s)."))
+            return
+
+        # As conexões não podem ser herdadas pelos filhos (fork): cada processo abre a sua
+        connections.close_all()
+        parada = multiprocessing.Event()
+        workers = [
+            multiprocessing.Process(target=worker_loop, args=(parada, poll_interval, burst, True), daemon=True)
+            for _ in range(processos)
+        ]
+        signal.signal(signal.SIGTERM, lambda *args: parada.set())
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            self.stdout.write("Encerrando: os workers terminam a tarefa atual e saem...")
+            parada.set()
+            for worker in workers:
+                worker.join()
+        self.stdout.write(self.style.SUCCESS("Workers encerrados."))
@@ -0,0 +1,263 @@
+# learning/metrics.py
+
+# Instrumentação por requisição: tempo total, tempo no banco, número de consultas e
+# consultas repetidas, agregados em histogramas por nome de URL (study_session,
+# check_answer, ...). Os dados ficam na memória de cada processo e são expostos em
+# /api/metrics/ (formato Prometheus ou ?format=json) para a equipe.
+#
+#     LEARNING_METRICS = {'ENABLED': True, 'SAMPLE_RATE': 0.05, 'TOKEN': '...'}
+#
+# Só uma fração SAMPLE_RATE das requisições é medida; nas outras o custo é um random().
+#
+# As conexões do Django são por thread e as views assíncronas consultam o banco em
+# outra thread (sync_to_async), então o wrapper de execute_wrapper fica instalado em
+# cada conexão e procura o gravador da requisição num ContextVar, que o asgiref
+# propaga para essas threads.
+
+import hmac
+import random
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+CONFIG_PADRAO = {'ENABLED': False, 'SAMPLE_RATE': 0.1, 'TOKEN': None}
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BUCKETS_CONSULTAS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+# Quantos textos de SQL repetido guardar por view (os mais frequentes aparecem no JSON)
+MAXIMO_SQL_REPETIDO = 50
+
+
+def metrics_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_METRICS', {})}
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, valor):
+        self.sum += valor
+        self.count += 1
+        for i, limite in enumerate(self.buckets):
+            if valor <= limite:
+                self.counts[i] += 1
+                break
+
+    def cumulative(self):
+        # Contagens acumuladas por limite, como o Prometheus espera em *_bucket
+        total, acumulado = 0, []
+        for quantidade in self.counts:
+            total += quantidade
+            acumulado.append(total)
+        return acumulado
+
+
+class ViewMetrics:
+    def __init__(self):
+        self.duration = Histogram(BUCKETS_SEGUNDOS)
+        self.db_duration = Histogram(BUCKETS_SEGUNDOS)
+        self.queries = Histogram(BUCKETS_CONSULTAS)
+        self.duplicate_queries = 0
+        self.requests_with_duplicates = 0
+        self.duplicate_sql = Counter()
+
+
+class QueryRecorder:
+    # Gravador de uma requisição medida (ver _instrumented_execute)
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.duplicates = 0
+        self.duplicate_sql = Counter()
+        self._vistas = set()
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - inicio
+            self.count += 1
+            # Mesma SQL com os mesmos parâmetros na mesma requisição: consulta repetida
+            chave = (sql, None if many else repr(params))
+            if chave in self._vistas:
+                self.duplicates += 1
+                self.duplicate_sql[sql] += 1
+            else:
+                self._vistas.add(chave)
+
+
+
+_gravador_atual = ContextVar('learning_query_recorder', default=None)
+
+
+def _instrumented_execute(execute, sql, params, many, context):
+    recorder = _gravador_atual.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def _install_wrapper(connection, **kwargs):
+    # Mesmo efeito de um connection.execute_wrapper(...) que dura a vida da conexão
+    if _instrumented_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_instrumented_execute)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def record(self, view_name, duration, recorder):
+        with self._lock:
+            metricas = self._views.get(view_name)
+            if metricas is None:
+                metricas = self._views[view_name] = ViewMetrics()
+            metricas.duration.observe(duration)
+            metricas.db_duration.observe(recorder.duration)
+            metricas.queries.observe(recorder.count)
+            if recorder.duplicates:
+                metricas.duplicate_queries += recorder.duplicates
+                metricas.requests_with_duplicates += 1
+                for sql, quantidade in recorder.duplicate_sql.items():
+                    if sql in metricas.duplicate_sql or len(metricas.duplicate_sql) < MAXIMO_SQL_REPETIDO:
+                        metricas.duplicate_sql[sql] += quantidade
+
+    def reset(self):
+        with self._lock:
+            self._views = {}
+
+    def as_dict(self):
+        with self._lock:
+            views = {}
+            for nome, metricas in sorted(self._views.items()):
+                views[nome] = {
+                    'requests': metricas.duration.count,
+                    'duration_seconds': _histogram_dict(metricas.duration),
+                    'db_duration_seconds': _histogram_dict(metricas.db_duration),
+                    'queries': _histogram_dict(metricas.queries),
+                    'duplicate_queries': metricas.duplicate_queries,
+                    'requests_with_duplicates': metricas.requests_with_duplicates,
+                    'top_duplicate_sql': [
+                        {'sql': sql, 'count': quantidade} for sql, quantidade in metricas.duplicate_sql.most_common(5)
+                    ],
+                }
+        return {'sample_rate': metrics_config()['SAMPLE_RATE'], 'views': views}
+
+    def as_prometheus(self):
+        linhas = []
+        with self._lock:
+            itens = sorted(self._views.items())
+            for nome_metrica, atributo, ajuda in (
+                ('learning_request_duration_seconds', 'duration', 'Tempo total da requisição por view'),
+                ('learning_request_db_duration_seconds', 'db_duration', 'Tempo gasto no banco por requisição'),
+                ('learning_request_queries', 'queries', 'Consultas SQL por requisição'),
+            ):
+                linhas += [f'# HELP {nome_metrica} {ajuda} (amostrado).', f'# TYPE {nome_metrica} histogram']
+                for view, metricas in itens:
+                    histograma = getattr(metricas, atributo)
+                    for limite, acumulado in zip(histograma.buckets, histograma.cumulative()):
+                        linhas.append(f'{nome_metrica}_bucket{{view="{view}",le="{limite}"}} {acumulado}')
+                    linhas.append(f'{nome_metrica}_bucket{{view="{view}",le="+Inf"}} {histograma.count}')
+                    linhas.append(f'{nome_metrica}_sum{{view="{view}"}} {histograma.sum}')
+                    linhas.append(f'{nome_metrica}_count{{view="{view}"}} {histograma.count}')
+            for nome_metrica, atributo, ajuda in (
+                ('learning_duplicate_queries_total', 'duplicate_queries', 'Consultas repetidas (mesma SQL e parâmetros) na mesma requisição'),
+                ('learning_requests_with_duplicates_total', 'requests_with_duplicates', 'Requisições com ao menos uma consulta repetida'),
+            ):
+                linhas += [f'# HELP {nome_metrica} {ajuda} (amostrado).', f'# TYPE {nome_metrica} counter']
+                for view, metricas in itens:
+                    linhas.append(f'{nome_metrica}{{view="{view}"}} {getattr(metricas, atributo)}')
+        linhas += [
+            '# HELP learning_metrics_sample_rate Fração das requisições medidas.',
+            '# TYPE learning_metrics_sample_rate gauge',
+            f'learning_metrics_sample_rate {metrics_config()["SAMPLE_RATE"]}',
+        ]
+        return '\n'.join(linhas) + '\n'
+
+
+def _histogram_dict(histograma):
+    return {
+        'count': histograma.count,
+        'sum': histograma.sum,
+        'buckets': {str(limite): acumulado for limite, acumulado in zip(histograma.buckets, histograma.cumulative())},
+    }
+
+
+registry = MetricsRegistry()
+
+
+def _view_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return '<sem rota>'
+    return match.view_name
+
+
+def metrics_authorized(request):
+    # Equipe logada ou o coletor do Prometheus com "Authorization: Bearer <TOKEN>"
+    token = metrics_config()['TOKEN']
+    if token:
+        cabecalho = request.headers.get('Authorization', '')
+        if hmac.compare_digest(cabecalho.encode(), f'Bearer {token}'.encode()):
+            return True
+    return request.user.is_authenticated and request.user.is_staff
+
+
+class QueryMetricsMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = metrics_config()
+        if not config['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = config['SAMPLE_RATE']
+        # Conexões abertas daqui em diante recebem o wrapper pelo sinal; as já abertas, agora
+        connection_created.connect(_install_wrapper, dispatch_uid='learning_metrics_wrapper')
+        for connection in connections.all(initialized_only=True):
+            _install_wrapper(connection)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        token = _gravador_atual.set(recorder)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _gravador_atual.reset(token)
+        registry.record(_view_name(request), time.perf_counter() - inicio, recorder)
+        return response
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        token = _gravador_atual.set(recorder)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _gravador_atual.reset(token)
+        registry.record(_view_name(request), time.perf_counter() - inicio, recorder)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:16
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0003_dailymasterylog'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userwordstatus',
+            index=models.Index(fields=['user', 'status', 'next_review_date'], name='uws_due_queue_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0004_userwordstatus_due_queue_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word',
+            name='answer_keys',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Respostas Aceitas (normalizadas)'),
+        ),
+    ]
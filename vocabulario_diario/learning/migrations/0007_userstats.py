@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0006_catalogversion'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('known_first_try', models.IntegerField(default=0, verbose_name='Acertou de Primeira')),
+                ('mastered', models.IntegerField(default=0, verbose_name='Dominadas')),
+                ('in_review', models.IntegerField(default=0, verbose_name='Em Revisão (Conjuntos)')),
+                ('total', models.IntegerField(default=0, verbose_name='Palavras Vistas')),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='learning_stats', to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:24
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0007_userstats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyProgress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('answers', models.IntegerField(default=0, verbose_name='Respostas')),
+                ('correct_answers', models.IntegerField(default=0, verbose_name='Acertos')),
+                ('words_learned', models.IntegerField(default=0, verbose_name='Variação do Vocabulário')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='ReviewEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('outcome', models.CharField(choices=[('correct', 'Acertou'), ('incorrect', 'Errou'), ('marked_correct', 'Marcada como Correta')], max_length=20, verbose_name='Resultado')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Respondida em')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='learning.word', verbose_name='Palavra')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'created_at'], name='reviewevent_user_time_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:26
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0008_reviewevent_dailyprogress'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userwordstatus',
+            name='training_answered',
+            field=models.BooleanField(default=False, verbose_name='Respondida no Treino'),
+        ),
+        migrations.AddIndex(
+            model_name='userwordstatus',
+            index=models.Index(fields=['training_set', 'training_answered', 'word'], name='uws_training_progress_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:27
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0009_userwordstatus_training_answered'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='trainingset',
+            index=models.Index(fields=['user', 'is_mastered', 'creation_date'], name='trainingset_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0011_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyDeck',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(verbose_name='Data')),
+                ('size', models.PositiveIntegerField(default=0, verbose_name='Cartões')),
+                ('cursor', models.PositiveIntegerField(default=0, verbose_name='Próxima Posição')),
+                ('answered', models.PositiveIntegerField(default=0, verbose_name='Respondidos')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+            ],
+            options={
+                'unique_together': {('user', 'date')},
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyDeckCard',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField(verbose_name='Posição')),
+                ('is_new', models.BooleanField(default=False, verbose_name='Palavra Nova?')),
+                ('answered', models.BooleanField(default=False, verbose_name='Respondido?')),
+                ('deck', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cards', to='learning.dailydeck', verbose_name='Baralho')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='learning.word', verbose_name='Palavra')),
+            ],
+            options={
+                'unique_together': {('deck', 'position'), ('deck', 'word')},
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:43
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('learning', '0012_dailydeck'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SeenWords',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='seen_words', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Usuário')),
+                ('bits', models.BinaryField(default=b'', verbose_name='Mapa de Bits')),
+            ],
+        ),
+    ]
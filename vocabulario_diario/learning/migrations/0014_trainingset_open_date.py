@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def preencher_open_date(apps, schema_editor):
+    TrainingSet = apps.get_model('learning', 'TrainingSet')
+    UserWordStatus = apps.get_model('learning', 'UserWordStatus')
+    # Conjuntos abertos duplicados no mesmo dia (corrida do get-or-create antigo): as
+    # palavras vão para o mais antigo e os demais são apagados, antes da restrição única
+    mantidos = {}
+    abertos = TrainingSet.objects.filter(is_mastered=False).order_by('id').values_list('id', 'user_id', 'creation_date')
+    for set_id, user_id, creation_date in abertos:
+        mantido = mantidos.setdefault((user_id, creation_date), set_id)
+        if mantido != set_id:
+            UserWordStatus.objects.filter(training_set_id=set_id).update(training_set_id=mantido)
+            TrainingSet.objects.filter(id=set_id).delete()
+    TrainingSet.objects.filter(is_mastered=False).update(open_date=models.F('creation_date'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0013_seenwords'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trainingset',
+            name='open_date',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Aberto em'),
+        ),
+        migrations.RunPython(preencher_open_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='trainingset',
+            constraint=models.UniqueConstraint(fields=('user', 'open_date'), name='trainingset_one_open_per_day'),
+        ),
+    ]
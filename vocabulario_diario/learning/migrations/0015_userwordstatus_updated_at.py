@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-18 12:10
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0014_trainingset_open_date'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Linhas existentes ficam com a data da migração: a primeira exportação incremental as inclui
+        migrations.AddField(
+            model_name='userwordstatus',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now, verbose_name='Atualizado em'),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='userwordstatus',
+            index=models.Index(fields=['user', 'updated_at'], name='uws_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('learning', '0015_userwordstatus_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WordDistractors',
+            fields=[
+                ('word', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='distractors', serialize=False, to='learning.word', verbose_name='Palavra')),
+                ('distractor_ids', models.BinaryField(default=b'', verbose_name='Distratores')),
+            ],
+        ),
+    ]
@@ -1,6 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import User # Vamos precisar do modelo de usuário padrão do Django
 from django.utils import timezone
+from .answer_index import build_answer_keys
+
+# Status que colocam uma palavra na fila de revisão do SRS
+REVIEW_STATUSES = ['Em Revisao', 'Dominado']
 
 # Modelo para guardar cada palavra do vocabulário
 class Word(models.Model):
@@ -8,6 +12,15 @@ class Word(models.Model):
     text_portuguese = models.CharField(max_length=100, verbose_name="Tradução Principal")
     synonyms_portuguese = models.TextField(blank=True, null=True, verbose_name="Sinônimos em Português")
     complexity = models.IntegerField(default=0, verbose_name="Complexidade (Comprimento)")
+    # Respostas aceitas já normalizadas (tradução + sinônimos), uma por linha. Ver learning/answer_index.py
+    answer_keys = models.TextField(blank=True, default='', editable=False, verbose_name="Respostas Aceitas (normalizadas)")
+
+    def save(self, *args, **kwargs):
+        self.answer_keys = build_answer_keys(self.text_portuguese, self.synonyms_portuguese)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'answer_keys' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'answer_keys']
+        super().save(*args, **kwargs)
 
     def __str__(self):
         return self.text_english
@@ -19,10 +32,36 @@ class TrainingSet(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
     creation_date = models.DateField(default=timezone.now, verbose_name="Data de Criação")
     is_mastered = models.BooleanField(default=False, verbose_name="Conjunto Dominado?")
+    # Dia do conjunto enquanto ele está aberto; NULL depois de dominado. O MySQL não tem
+    # índice único parcial ("um conjunto aberto por usuário e dia"), mas NULLs não se
+    # repetem num índice único: a restrição abaixo só vale para os conjuntos abertos.
+    open_date = models.DateField(null=True, blank=True, editable=False, verbose_name="Aberto em")
+
+    class Meta:
+        indexes = [
+            # Lista de treinos pendentes do usuário, já na ordem de exibição
+            models.Index(fields=['user', 'is_mastered', 'creation_date'], name='trainingset_pending_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'open_date'], name='trainingset_one_open_per_day'),
+        ]
 
     def __str__(self):
         return f"Conjunto de Treino de {self.user.username} - {self.creation_date.strftime('%d/%m/%Y')}"
 
+# Consultas reutilizáveis sobre o status das palavras
+class UserWordStatusQuerySet(models.QuerySet):
+    def due_for_review(self, user, now=None):
+        # Fila de revisão: palavras do usuário em status revisável cuja data já venceu,
+        # da mais atrasada para a mais recente. Já traz a Word junto (um único SELECT),
+        # e é atendida pelo índice 'uws_due_queue_idx' (user, status, next_review_date).
+        if now is None:
+            now = timezone.now()
+        return self.filter(
+            user=user, status__in=REVIEW_STATUSES, next_review_date__lte=now
+        ).select_related('word').order_by('next_review_date')
+
+
 # --- ALTERAÇÃO ---
 # O modelo UserWordStatus agora se conecta ao TrainingSet.
 class UserWordStatus(models.Model):
@@ -75,13 +114,34 @@ class UserWordStatus(models.Model):
         related_name='words'
     )
 
+    # Progresso da rodada atual de treino: True quando o usuário já acertou esta
+    # palavra no conjunto. Substitui a lista de ids que ficava na sessão.
+    training_answered = models.BooleanField(default=False, verbose_name="Respondida no Treino")
+
+    # Última gravação da linha, para exportações incrementais (learning/export.py). O auto_now
+    # só vale para save() e INSERTs: bulk_update e .update() precisam passar o campo
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Atualizado em")
+
     # ------------------------------
     # Regras de unicidade
     # ------------------------------
 
+    objects = UserWordStatusQuerySet.as_manager()
+
     # Garante que cada par (usuário, palavra) seja único no banco
     class Meta:
         unique_together = ('user', 'word')
+        indexes = [
+            # Índice da fila de revisão. O MySQL não suporta índices parciais
+            # (o Django ignora 'condition' nele), por isso o status entra como
+            # coluna do índice em vez de filtro: o range (user, status IN, data <= agora)
+            # lê só as linhas vencidas.
+            models.Index(fields=['user', 'status', 'next_review_date'], name='uws_due_queue_idx'),
+            # Progresso do treino lido só pelo índice: (conjunto, respondida, palavra)
+            models.Index(fields=['training_set', 'training_answered', 'word'], name='uws_training_progress_idx'),
+            # Exportação incremental de um usuário (updated_since)
+            models.Index(fields=['user', 'updated_at'], name='uws_user_updated_idx'),
+        ]
 
     # Representação legível para admin, debug ou logs
     def __str__(self):
@@ -98,4 +158,167 @@ class DailyMasteryLog(models.Model):
         unique_together = ('user', 'date') # Garante um registo por utilizador por dia
 
     def __str__(self):
-        return f"Registo de {self.user.username} em {self.date}: {self.mastered_words_count} palavras"
\ No newline at end of file
+        return f"Registo de {self.user.username} em {self.date}: {self.mastered_words_count} palavras"
+
+
+# Contador de versão do catálogo de palavras (uma única linha).
+# Cada processo (worker WSGI/ASGI) compara a sua cópia do catálogo em memória
+# com este número para saber quando precisa recarregar. Ver learning/catalog.py
+class CatalogVersion(models.Model):
+    version = models.PositiveBigIntegerField(default=0)
+
+    @classmethod
+    def current(cls):
+        return cls.objects.filter(pk=1).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls):
+        if not cls.objects.filter(pk=1).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(pk=1, defaults={'version': 1})
+
+    def __str__(self):
+        return f"Catálogo na versão {self.version}"
+
+
+# Contadores por usuário usados no painel, mantidos pelas views que alteram os status
+# (responder, marcar como correta, dominar conjunto, reiniciar progresso).
+# O comando recompute_user_stats recalcula tudo a partir de UserWordStatus se houver divergência.
+class UserStats(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='learning_stats', verbose_name="Usuário")
+    known_first_try = models.IntegerField(default=0, verbose_name="Acertou de Primeira")
+    mastered = models.IntegerField(default=0, verbose_name="Dominadas")
+    in_review = models.IntegerField(default=0, verbose_name="Em Revisão (Conjuntos)")
+    total = models.IntegerField(default=0, verbose_name="Palavras Vistas")
+
+    def __str__(self):
+        return f"Estatísticas de {self.user.username}"
+
+
+# Registro só de inserção (append-only) de cada resposta dada pelo usuário
+class ReviewEvent(models.Model):
+    OUTCOME_CHOICES = [
+        ('correct', 'Acertou'),
+        ('incorrect', 'Errou'),
+        ('marked_correct', 'Marcada como Correta'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, verbose_name="Palavra")
+    outcome = models.CharField(max_length=20, choices=OUTCOME_CHOICES, verbose_name="Resultado")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Respondida em")
+
+    class Meta:
+        indexes = [models.Index(fields=['user', 'created_at'], name='reviewevent_user_time_idx')]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.word.text_english}: {self.outcome}"
+
+
+# Resumo diário por usuário, atualizado a cada resposta; alimenta o gráfico do painel.
+# words_learned é a variação do vocabulário (Acertou de Primeira + Dominado) no dia,
+# por isso a soma acumulada dá o tamanho do vocabulário ao fim de cada dia.
+class DailyProgress(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
+    date = models.DateField(verbose_name="Data")
+    answers = models.IntegerField(default=0, verbose_name="Respostas")
+    correct_answers = models.IntegerField(default=0, verbose_name="Acertos")
+    words_learned = models.IntegerField(default=0, verbose_name="Variação do Vocabulário")
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"Progresso de {self.user.username} em {self.date}"
+
+
+# Fila de tarefas em segundo plano guardada no próprio banco (sem broker externo).
+# As tarefas são registradas em learning/tasks.py e executadas pelo comando run_workers;
+# ver learning/jobs.py.
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Na Fila'),
+        ('running', 'Executando'),
+        ('done', 'Concluída'),
+        ('failed', 'Falhou'),
+    ]
+
+    name = models.CharField(max_length=50, verbose_name="Tarefa")
+    payload = models.JSONField(default=dict, verbose_name="Parâmetros")
+    # Dono da tarefa: só ele (ou a equipe) pode consultar o andamento
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, verbose_name="Usuário")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued', verbose_name="Situação")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Tentativas")
+    max_attempts = models.PositiveIntegerField(default=3, verbose_name="Máximo de Tentativas")
+    run_after = models.DateTimeField(default=timezone.now, verbose_name="Executar a Partir de")
+    result = models.JSONField(null=True, blank=True, verbose_name="Resultado")
+    error = models.TextField(blank=True, default='', verbose_name="Erro")
+    worker = models.CharField(max_length=100, blank=True, default='', verbose_name="Worker")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Criada em")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Iniciada em")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Terminada em")
+
+    class Meta:
+        indexes = [
+            # Os workers buscam as próximas tarefas por (status='queued', run_after <= agora)
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+# Baralho do dia de cada usuário, montado fora do horário de pico pelo comando
+# build_daily_decks (ver learning/decks.py): revisões vencidas em ordem de
+# next_review_date seguidas de palavras novas até a meta diária (Profile.daily_goal).
+# `cursor` é a posição do primeiro cartão ainda não respondido e `answered` quantos já
+# foram (em qualquer ordem); size - answered = cartões restantes hoje.
+class DailyDeck(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, verbose_name="Usuário")
+    date = models.DateField(verbose_name="Data")
+    size = models.PositiveIntegerField(default=0, verbose_name="Cartões")
+    cursor = models.PositiveIntegerField(default=0, verbose_name="Próxima Posição")
+    answered = models.PositiveIntegerField(default=0, verbose_name="Respondidos")
+
+    class Meta:
+        unique_together = ('user', 'date')
+
+    def __str__(self):
+        return f"Baralho de {self.user.username} em {self.date}: {self.answered}/{self.size}"
+
+
+class DailyDeckCard(models.Model):
+    deck = models.ForeignKey(DailyDeck, on_delete=models.CASCADE, related_name='cards', verbose_name="Baralho")
+    position = models.PositiveIntegerField(verbose_name="Posição")
+    word = models.ForeignKey(Word, on_delete=models.CASCADE, verbose_name="Palavra")
+    is_new = models.BooleanField(default=False, verbose_name="Palavra Nova?")
+    # Uma palavra do baralho pode ser respondida fora de ordem (num treino, por exemplo)
+    answered = models.BooleanField(default=False, verbose_name="Respondido?")
+
+    class Meta:
+        # (deck, position) é o índice da leitura do próximo cartão; (deck, word) o da marcação das respostas
+        unique_together = [('deck', 'position'), ('deck', 'word')]
+
+    def __str__(self):
+        return f"{self.deck} #{self.position}: {self.word_id}"
+
+
+# Palavras já vistas pelo usuário como um mapa de bits indexado pelo id da Word
+# (bit i ligado = existe UserWordStatus para a palavra i), com 1 byte para cada 8 ids.
+# Mantido ao criar status e apagado no reset; ver learning/seen.py.
+class SeenWords(models.Model):
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='seen_words', verbose_name="Usuário")
+    bits = models.BinaryField(default=b'', verbose_name="Mapa de Bits")
+
+    def __str__(self):
+        return f"Palavras vistas por {self.user.username}"
+
+
+# Distratores da palavra no modo de múltipla escolha, pré-calculados em lote pelo
+# build_distractors (ver learning/distractors.py): ids de outras palavras cujas traduções
+# se parecem com a desta, do mais para o menos parecido, como int32 little-endian.
+class WordDistractors(models.Model):
+    word = models.OneToOneField(Word, on_delete=models.CASCADE, primary_key=True, related_name='distractors', verbose_name="Palavra")
+    distractor_ids = models.BinaryField(default=b'', verbose_name="Distratores")
+
+    def __str__(self):
+        return f"Distratores de {self.word_id}"
@@ -0,0 +1,72 @@
+# learning/progress.py
+
+# Registro das respostas (ReviewEvent) e atualização incremental do resumo diário
+# (DailyProgress). Cada requisição grava os seus eventos com um único INSERT em massa
+# e soma os contadores do dia com F(), sem varrer o histórico do usuário.
+
+from collections import defaultdict
+from django.db.models import F
+from django.utils import timezone
+from .models import DailyProgress, ReviewEvent
+
+
+class Answer:
+    __slots__ = ('word_id', 'outcome', 'answered_at', 'learned')
+
+    def __init__(self, word_id, outcome, answered_at, learned=0):
+        self.word_id = word_id
+        self.outcome = outcome
+        self.answered_at = answered_at
+        # Variação do vocabulário causada pela resposta (-1, 0 ou 1), tirada do delta das estatísticas
+        self.learned = learned
+
+
+def learned_from_delta(delta):
+    return delta['known_first_try'] + delta['mastered']
+
+
+def record_answers(user_id, answers):
+    if not answers:
+        return
+    ReviewEvent.objects.bulk_create([
+        ReviewEvent(user_id=user_id, word_id=answer.word_id, outcome=answer.outcome, created_at=answer.answered_at)
+        for answer in answers
+    ])
+    por_dia = defaultdict(lambda: {'answers': 0, 'correct_answers': 0, 'words_learned': 0})
+    for answer in answers:
+        contadores = por_dia[timezone.localdate(answer.answered_at)]
+        contadores['answers'] += 1
+        contadores['correct_answers'] += answer.outcome != 'incorrect'
+        contadores['words_learned'] += answer.learned
+    for date, contadores in por_dia.items():
+        add_daily_progress(user_id, date, **contadores)
+
+
+def add_daily_progress(user_id, date, **incrementos):
+    mudancas = {campo: F(campo) + valor for campo, valor in incrementos.items() if valor}
+    if not mudancas:
+        return
+    if not DailyProgress.objects.filter(user_id=user_id, date=date).update(**mudancas):
+        DailyProgress.objects.get_or_create(user_id=user_id, date=date)
+        DailyProgress.objects.filter(user_id=user_id, date=date).update(**mudancas)
+
+
+def cumulative_chart_data(linhas, vocabulario_total, hoje=None):
+    """
+    Converte as linhas (data, words_learned) do resumo diário na série acumulada do gráfico.
+
+    As linhas só guardam variações, e o progresso anterior ao resumo diário não tem linha:
+    a série é ancorada no vocabulário atual (UserStats), então o ponto de partida é o que
+    o usuário já sabia antes do primeiro dia registrado e o último ponto é o total de hoje.
+    """
+    linhas = list(linhas)
+    total_learned = vocabulario_total - sum(words_learned for _, words_learned in linhas)
+    if not linhas and vocabulario_total:
+        # Só progresso antigo, sem nenhum dia registrado: um ponto com o total atual
+        linhas = [(hoje or timezone.localdate(), 0)]
+    labels, cumulative_data = [], []
+    for date, words_learned in linhas:
+        total_learned += words_learned
+        labels.append(date.strftime('%d/%m/%Y'))
+        cumulative_data.append(total_learned)
+    return {'labels': labels, 'data': cumulative_data}
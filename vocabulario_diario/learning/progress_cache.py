@@ -0,0 +1,166 @@
+# learning/progress_cache.py
+
+# Cache por usuário do painel, da lista de treinos e do gráfico, no cache do Django.
+#
+# Cada usuário tem uma "versão do progresso" guardada no cache, trocada (depois do
+# COMMIT) por todo caminho que grava progresso: respostas, marcar como correta, dominar
+# conjunto, reiniciar progresso e alterar a meta diária. Os dados das telas ficam numa
+# chave que inclui essa versão e o dia, e a mesma chave serve de ETag: uma tela sem
+# mudanças custa uma leitura do cache (304 com If-None-Match) e nenhuma consulta SQL.
+#
+# A versão precisa ser vista por todos os processos (web e run_workers), então CACHES
+# deve ser compartilhado entre eles (arquivos, Redis, Memcached; não o LocMemCache).
+#
+#     LEARNING_PROGRESS_CACHE = {'ENABLED': True, 'TIMEOUT': 3600}
+
+import hashlib
+import uuid
+from functools import wraps
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from .catalog import get_catalog
+
+CONFIG_PADRAO = {'ENABLED': True, 'TIMEOUT': 3600}
+PREFIXO = 'learning:progress'
+
+
+def progress_cache_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_PROGRESS_CACHE', {})}
+
+
+def _chave_da_versao(user_id):
+    return f'{PREFIXO}:version:{user_id}'
+
+
+def _nova_versao():
+    # Um valor novo a cada troca (e não um incr): duas trocas simultâneas nunca voltam a
+    # uma versão com dados já guardados, e a versão não se repete se o cache for limpo
+    return uuid.uuid4().hex
+
+
+def bump_progress_versions(user_ids):
+    # Só depois do COMMIT: antes disso, quem lesse a versão nova ainda veria os dados antigos
+    def trocar():
+        cache.set_many({_chave_da_versao(user_id): _nova_versao() for user_id in user_ids}, timeout=None)
+    transaction.on_commit(trocar)
+
+
+def bump_progress_version(user_id):
+    bump_progress_versions([user_id])
+
+
+def progress_version(user_id):
+    chave = _chave_da_versao(user_id)
+    versao = cache.get(chave)
+    if versao is None:
+        cache.add(chave, _nova_versao(), timeout=None)
+        versao = cache.get(chave)
+    return versao
+
+
+async def aprogress_version(user_id):
+    chave = _chave_da_versao(user_id)
+    versao = await cache.aget(chave)
+    if versao is None:
+        await cache.aadd(chave, _nova_versao(), timeout=None)
+        versao = await cache.aget(chave)
+    return versao
+
+
+class ProgressCache:
+    """
+    Cache e GET condicional de uma tela do progresso do usuário.
+
+    Decore o `get` da view com `conditional` e monte os dados com `get_or_build`
+    (ou `aget_or_build` nas views assíncronas). `extra(request)` acrescenta outras
+    dependências à chave (ex.: a versão do catálogo); `per_session` a separa por sessão,
+    para páginas com {% csrf_token %}, que muda a cada login.
+    """
+
+    def __init__(self, name, extra=None, per_session=False):
+        self.name = name
+        self.extra = extra
+        self.per_session = per_session
+
+    def _tag(self, request, versao):
+        # date_joined separa usuários que reaproveitam um id (banco recriado, testes)
+        partes = [self.name, request.user.id, request.user.date_joined.timestamp(), versao, timezone.localdate().isoformat()]
+        if self.extra:
+            partes.append(self.extra(request))
+        if self.per_session:
+            partes.append(request.session.session_key)
+        return hashlib.sha1(':'.join(map(str, partes)).encode()).hexdigest()[:24]
+
+    def tag(self, request):
+        # A versão é lida uma vez por requisição, mesmo com o ETag e os dados usando a chave
+        if not hasattr(request, '_learning_progress_version'):
+            request._learning_progress_version = progress_version(request.user.id)
+        return self._tag(request, request._learning_progress_version)
+
+    async def atag(self, request):
+        if not hasattr(request, '_learning_progress_version'):
+            request._learning_progress_version = await aprogress_version(request.user.id)
+        return self._tag(request, request._learning_progress_version)
+
+    def get_or_build(self, request, build):
+        if not progress_cache_config()['ENABLED']:
+            return build()
+        chave = f'{PREFIXO}:{self.tag(request)}'
+        dados = cache.get(chave)
+        if dados is None:
+            dados = build()
+            cache.set(chave, dados, progress_cache_config()['TIMEOUT'])
+        return dados
+
+    async def aget_or_build(self, request, build):
+        # `build` é uma corrotina
+        if not progress_cache_config()['ENABLED']:
+            return await build()
+        chave = f'{PREFIXO}:{await self.atag(request)}'
+        dados = await cache.aget(chave)
+        if dados is None:
+            dados = await build()
+            await cache.aset(chave, dados, progress_cache_config()['TIMEOUT'])
+        return dados
+
+    @staticmethod
+    def _cabecalhos(response, etag):
+        response.headers.setdefault('ETag', etag)
+        # O navegador guarda a página, mas sempre revalida (If-None-Match) antes de usar
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def conditional(self, get):
+        if iscoroutinefunction(get):
+            @wraps(get)
+            async def inner(view, request, *args, **kwargs):
+                if not progress_cache_config()['ENABLED']:
+                    return await get(view, request, *args, **kwargs)
+                etag = quote_etag(await self.atag(request))
+                response = get_conditional_response(request, etag=etag)
+                if response is None:
+                    response = await get(view, request, *args, **kwargs)
+                return self._cabecalhos(response, etag)
+            return inner
+
+        @wraps(get)
+        def inner(view, request, *args, **kwargs):
+            if not progress_cache_config()['ENABLED']:
+                return get(view, request, *args, **kwargs)
+            etag = quote_etag(self.tag(request))
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = get(view, request, *args, **kwargs)
+            return self._cabecalhos(response, etag)
+        return inner
+
+
+# O painel mostra a cobertura do catálogo e tem {% csrf_token %} (formulário de saída)
+CACHE_DO_PAINEL = ProgressCache('dashboard', extra=lambda request: get_catalog().version, per_session=True)
+CACHE_DOS_TREINOS = ProgressCache('training_set_list')
+CACHE_DO_GRAFICO = ProgressCache('chart_data')
@@ -0,0 +1,63 @@
+# learning/reset.py
+
+# Apaga todo o progresso de estudo de um usuário (usado pelo "Reiniciar progresso"
+# da página de configurações, nas views síncrona e assíncrona de users/).
+#
+# Os DELETEs são feitos em lotes de ids, numa única transação, com o QuerySet.delete(). Os
+# modelos do progresso sem chave estrangeira apontando para eles vão pelo caminho rápido do
+# Django: um DELETE ... WHERE id IN (...) por lote, sem carregar as linhas. Só dois passam pelo
+# coletor de deleção: TrainingSet (SET_NULL de UserWordStatus) e DailyDeck (CASCADE para
+# DailyDeckCard). Para eles os dependentes do usuário são apagados antes, pelo caminho rápido,
+# e o coletor só lê os ids do lote e faz o UPDATE/DELETE dos dependentes, que não acham linha.
+# A memória usada é a de um lote de ids.
+
+from django.db import transaction
+from .jobs import enqueue
+from .models import DailyDeck, DailyDeckCard, DailyMasteryLog, DailyProgress, ReviewEvent, SeenWords, TrainingSet, UserStats, UserWordStatus
+from .progress_cache import bump_progress_version
+
+TAMANHO_DO_LOTE = 5000
+# Os dependentes vêm antes de quem passa pelo coletor (UserWordStatus antes de TrainingSet,
+# DailyDeckCard antes de DailyDeck); a ordem só afeta o custo, não o resultado
+MODELOS_DO_PROGRESSO = [
+    (UserWordStatus, 'user_id'),
+    (TrainingSet, 'user_id'),
+    (DailyDeckCard, 'deck__user_id'),
+    (DailyDeck, 'user_id'),
+    (ReviewEvent, 'user_id'),
+    (DailyProgress, 'user_id'),
+    (DailyMasteryLog, 'user_id'),
+    (UserStats, 'user_id'),
+    (SeenWords, 'user_id'),
+]
+# Modelos com dependentes: o coletor carrega as linhas do lote, então só a chave primária
+COM_DEPENDENTES = {TrainingSet, DailyDeck}
+
+
+def _delete_in_chunks(queryset, chunk_size):
+    model = queryset.model
+    apagadas = 0
+    while True:
+        ids = list(queryset.values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            return apagadas
+        lote = model.objects.filter(pk__in=ids)
+        if model in COM_DEPENDENTES:
+            lote = lote.only('pk')
+        lote.delete()
+        apagadas += len(ids)
+
+
+def delete_user_progress(user_id, chunk_size=TAMANHO_DO_LOTE):
+    # Devolve quantas linhas foram apagadas por tabela
+    apagadas = {}
+    with transaction.atomic():
+        for model, campo_do_usuario in MODELOS_DO_PROGRESSO:
+            apagadas[model._meta.model_name] = _delete_in_chunks(model.objects.filter(**{campo_do_usuario: user_id}), chunk_size)
+        bump_progress_version(user_id)
+    return apagadas
+
+
+def start_background_reset(user):
+    # Responde na hora: o reset vira uma tarefa da fila (learning/tasks.py), acompanhada pelo job_status
+    return enqueue('reset_progress', {'user_id': user.id}, user=user)
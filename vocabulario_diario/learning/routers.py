@@ -0,0 +1,149 @@
+# learning/routers.py
+
+# Leituras em réplicas do banco para as telas que só consultam (painel, gráfico,
+# lista de treinos, carga do catálogo), com as escritas sempre no primário.
+#
+#     DATABASES = {'default': {...primário...}, 'replica': {...}}
+#     LEARNING_DB_REPLICAS = {'ALIASES': ['replica'], 'PIN_SECONDS': 5}
+#
+# Uma leitura só vai para a réplica dentro de read_from_replica() (ou de uma view com
+# ReplicaReadMixin) e numa requisição atendida pelo ReplicaRoutingMiddleware; comandos e
+# workers da fila usam sempre o primário. A primeira escrita da requisição a fixa no
+# primário até o fim, e um cookie mantém o mesmo usuário no primário por PIN_SECONDS
+# (atraso de replicação tolerado), para que ele leia o que acabou de gravar. Leituras que
+# alimentam uma escrita fora de transação (os recálculos de UserStats e SeenWords) usam
+# .using(DEFAULT_DB_ALIAS), para não gravar no primário um resultado tirado da réplica.
+#
+# Para testar localmente, aponte 'default' e 'replica' para dois arquivos SQLite e
+# "replique" copiando o primeiro sobre o segundo depois do migrate.
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+
+CONFIG_PADRAO = {'ALIASES': [], 'PIN_SECONDS': 5}
+COOKIE_DO_PRIMARIO = 'vd_primary'
+
+
+def replicas_config():
+    return {**CONFIG_PADRAO, **getattr(settings, 'LEARNING_DB_REPLICAS', {})}
+
+
+class _EstadoDaRequisicao:
+    __slots__ = ('replica', 'escopos', 'fixado', 'escreveu')
+
+    def __init__(self, replica, fixado):
+        self.replica = replica
+        self.escopos = 0
+        self.fixado = fixado
+        self.escreveu = False
+
+
+# Objeto mutável: as threads do sync_to_async recebem uma cópia do contexto, mas
+# enxergam (e alteram) o mesmo estado da requisição
+_estado_atual = ContextVar('learning_db_routing', default=None)
+
+
+@contextmanager
+def read_from_replica():
+    estado = _estado_atual.get()
+    if estado is None:
+        yield
+        return
+    estado.escopos += 1
+    try:
+        yield
+    finally:
+        estado.escopos -= 1
+
+
+class ReplicaReadMixin:
+    # Leituras da view podem ir para a réplica. Vem depois do LoginRequiredMixin na herança:
+    # a sessão e o usuário logado são lidos no primário (um login recente pode não ter replicado)
+    def dispatch(self, request, *args, **kwargs):
+        if self.view_is_async:
+            return self._adispatch(request, *args, **kwargs)
+        with read_from_replica():
+            return super().dispatch(request, *args, **kwargs)
+
+    async def _adispatch(self, request, *args, **kwargs):
+        with read_from_replica():
+            return await super().dispatch(request, *args, **kwargs)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        estado = _estado_atual.get()
+        if (
+            estado is None or estado.replica is None or not estado.escopos or estado.fixado
+            # Dentro de uma transação a leitura tem de ver o que a própria transação gravou
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return estado.replica
+
+    def db_for_write(self, model, **hints):
+        estado = _estado_atual.get()
+        if estado is not None:
+            estado.fixado = estado.escreveu = True
+        # Explícito: sem isso o Django gravaria no banco de onde a instância foi lida
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        bancos = {DEFAULT_DB_ALIAS, *replicas_config()['ALIASES']}
+        if obj1._state.db in bancos and obj2._state.db in bancos:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # As réplicas recebem o esquema pela replicação
+        if db in replicas_config()['ALIASES']:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        config = replicas_config()
+        if not config['ALIASES']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.aliases = list(config['ALIASES'])
+        self.pin_seconds = config['PIN_SECONDS']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _inicio(self, request):
+        # Uma réplica por requisição; o cookie de uma escrita recente fixa no primário
+        estado = _EstadoDaRequisicao(random.choice(self.aliases), COOKIE_DO_PRIMARIO in request.COOKIES)
+        return estado, _estado_atual.set(estado)
+
+    def _fixar(self, estado, response):
+        if estado.escreveu and self.pin_seconds:
+            response.set_cookie(COOKIE_DO_PRIMARIO, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        estado, token = self._inicio(request)
+        try:
+            response = self.get_response(request)
+        finally:
+            _estado_atual.reset(token)
+        return self._fixar(estado, response)
+
+    async def __acall__(self, request):
+        estado, token = self._inicio(request)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _estado_atual.reset(token)
+        return self._fixar(estado, response)
@@ -0,0 +1,12 @@
+# learning/sampling.py
+
+from .catalog import get_catalog
+from .seen import get_seen_bits, sample_unseen
+
+
+def sample_new_words(user, quantidade=1, excluir_ids=()):
+    # Palavras que o usuário nunca viu, sorteadas pelo mapa de bits (learning/seen.py) sobre
+    # os ids do catálogo em memória: uma leitura por chave primária, nada de UserWordStatus
+    catalogo = get_catalog()
+    word_ids = sample_unseen(get_seen_bits(user.id), catalogo.id_array(), quantidade, excluir_ids=excluir_ids)
+    return [catalogo.get(word_id) for word_id in word_ids]
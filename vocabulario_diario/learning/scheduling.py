@@ -0,0 +1,128 @@
+# learning/scheduling.py
+
+# Algoritmos de repetição espaçada (SRS).
+#
+# Todos seguem a mesma interface: dado o número de acertos consecutivos, devolvem o
+# intervalo (em dias) até a próxima revisão. Um erro sempre reagenda para daqui a
+# `relearn_minutes` minutos. O algoritmo é escolhido por instalação em settings.py:
+#
+#     LEARNING_SCHEDULER = {'ALGORITHM': 'sm2', 'OPTIONS': {'ease_factor': 2.3}}
+#
+# Os métodos *_batch usam NumPy para reagendar milhões de linhas de uma vez
+# (ver o comando reschedule_reviews).
+
+import math
+from abc import ABC, abstractmethod
+from datetime import timedelta
+import numpy as np
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+
+class Scheduler(ABC):
+    name = None
+
+    def __init__(self, relearn_minutes=10, maximum_interval_days=3650):
+        self.relearn_minutes = relearn_minutes
+        self.maximum_interval_days = maximum_interval_days
+
+    @abstractmethod
+    def _interval_days(self, consecutive):
+        ...
+
+    @abstractmethod
+    def _interval_days_batch(self, consecutive):
+        ...
+
+    def _max_exponent(self, coefficient, base):
+        # Expoente a partir do qual coefficient × base ** expoente já passa do intervalo máximo.
+        # Os algoritmos geométricos limitam o expoente a ele antes da potência: com muitos
+        # acertos seguidos base ** expoente estouraria o float (OverflowError)
+        if base <= 1 or coefficient <= 0:
+            return math.inf
+        return math.log(self.maximum_interval_days / coefficient, base) + 1
+
+    def interval_days(self, consecutive):
+        return min(self._interval_days(max(consecutive, 1)), self.maximum_interval_days)
+
+    def interval_days_batch(self, consecutive):
+        consecutive = np.maximum(np.asarray(consecutive, dtype=np.float64), 1)
+        return np.minimum(self._interval_days_batch(consecutive), self.maximum_interval_days)
+
+    def next_review(self, consecutive, correct, now):
+        if not correct:
+            return now + timedelta(minutes=self.relearn_minutes)
+        return now + timedelta(days=self.interval_days(consecutive))
+
+
+class LinearScheduler(Scheduler):
+    # Regra original do projeto: N acertos seguidos = revisar daqui a N dias
+    name = 'linear'
+
+    def __init__(self, step_days=1, **kwargs):
+        super().__init__(**kwargs)
+        self.step_days = step_days
+
+    def _interval_days(self, consecutive):
+        return self.step_days * consecutive
+
+    def _interval_days_batch(self, consecutive):
+        return self.step_days * consecutive
+
+
+class SM2Scheduler(Scheduler):
+    # SuperMemo 2 com fator de facilidade fixo (não guardamos a nota de cada resposta):
+    # 1 dia, 6 dias e depois o intervalo anterior multiplicado pelo fator
+    name = 'sm2'
+
+    def __init__(self, ease_factor=2.5, first_interval_days=1, second_interval_days=6, **kwargs):
+        super().__init__(**kwargs)
+        self.ease_factor = ease_factor
+        self.first_interval_days = first_interval_days
+        self.second_interval_days = second_interval_days
+
+    def _interval_days(self, consecutive):
+        if consecutive == 1:
+            return self.first_interval_days
+        expoente = min(consecutive - 2, self._max_exponent(self.second_interval_days, self.ease_factor))
+        return self.second_interval_days * self.ease_factor ** expoente
+
+    def _interval_days_batch(self, consecutive):
+        expoente = np.clip(consecutive - 2, 0, self._max_exponent(self.second_interval_days, self.ease_factor))
+        return np.where(consecutive == 1, self.first_interval_days, self.second_interval_days * self.ease_factor ** expoente)
+
+
+class ExponentialScheduler(Scheduler):
+    # Estilo FSRS: a estabilidade da memória cresce geometricamente a cada acerto e a
+    # revisão é marcada para quando a chance de lembrar cair até `desired_retention`
+    # (curva de esquecimento exponencial, em que a estabilidade é o tempo até 90%).
+    name = 'exponential'
+
+    def __init__(self, initial_stability_days=1, growth=2.5, desired_retention=0.9, **kwargs):
+        super().__init__(**kwargs)
+        self.initial_stability_days = initial_stability_days
+        self.growth = growth
+        self.retention_factor = math.log(desired_retention) / math.log(0.9)
+
+    def _interval_days(self, consecutive):
+        expoente = min(consecutive - 1, self._max_exponent(self.initial_stability_days * self.retention_factor, self.growth))
+        return self.initial_stability_days * self.growth ** expoente * self.retention_factor
+
+    def _interval_days_batch(self, consecutive):
+        expoente = np.minimum(consecutive - 1, self._max_exponent(self.initial_stability_days * self.retention_factor, self.growth))
+        return self.initial_stability_days * self.growth ** expoente * self.retention_factor
+
+
+SCHEDULERS = {scheduler.name: scheduler for scheduler in (LinearScheduler, SM2Scheduler, ExponentialScheduler)}
+
+
+def build_scheduler(algorithm, options=None):
+    try:
+        return SCHEDULERS[algorithm](**(options or {}))
+    except KeyError:
+        raise ImproperlyConfigured(f"Algoritmo de repetição espaçada desconhecido: {algorithm!r}. Opções: {', '.join(SCHEDULERS)}")
+
+
+def get_scheduler():
+    config = getattr(settings, 'LEARNING_SCHEDULER', {})
+    return build_scheduler(config.get('ALGORITHM', 'linear'), config.get('OPTIONS'))
@@ -0,0 +1,121 @@
+# learning/seen.py
+
+# Palavras já vistas por usuário como mapa de bits (SeenWords.bits): o bit `word_id`
+# fica ligado quando o usuário ganha um UserWordStatus para a palavra. Com 100 mil
+# palavras o mapa tem ~12 KB e é lido numa consulta pela chave primária; "já viu?",
+# "quantas faltam?" e "sorteie k não vistas" viram operações do NumPy sobre os ids do
+# catálogo em memória, sem IN-lists nem varreduras de UserWordStatus.
+#
+# Quem cria status chama mark_seen() na mesma transação e o reset apaga a linha.
+# Usuários sem linha (anteriores a este recurso ou recém-reiniciados) têm o mapa
+# calculado a partir de UserWordStatus na leitura, sem gravar (as leituras vêm de GETs);
+# a linha é gravada na próxima resposta (mark_seen) ou pelo recompute_user_stats.
+
+import random
+import numpy as np
+from django.db import DEFAULT_DB_ALIAS, transaction
+from .bulk import upsert_options
+from .models import SeenWords, UserWordStatus
+
+
+def _como_array(bits):
+    # O BinaryField chega como bytes ou memoryview, conforme o banco
+    return np.frombuffer(bytes(bits), dtype=np.uint8)
+
+
+def bits_from_word_ids(word_ids):
+    ids = np.asarray(list(word_ids), dtype=np.int64)
+    if ids.size == 0:
+        return b''
+    ligados = np.zeros(int(ids.max()) + 1, dtype=bool)
+    ligados[ids] = True
+    return np.packbits(ligados, bitorder='little').tobytes()
+
+
+def add_word_ids(bits, word_ids):
+    # Mapa `bits` com os bits de `word_ids` ligados (cresce se algum id passar do fim)
+    ids = np.asarray(list(word_ids), dtype=np.int64)
+    mapa = _como_array(bits)
+    if ids.size == 0:
+        return mapa.tobytes()
+    tamanho = max(mapa.size, int(ids.max()) // 8 + 1)
+    novo = np.zeros(tamanho, dtype=np.uint8)
+    novo[:mapa.size] = mapa
+    np.bitwise_or.at(novo, ids >> 3, np.left_shift(1, ids & 7).astype(np.uint8))
+    return novo.tobytes()
+
+
+def is_seen(bits, word_ids):
+    # Vetor booleano, um item por id de `word_ids`
+    mapa = _como_array(bits)
+    ids = np.asarray(word_ids, dtype=np.int64)
+    byte = ids >> 3
+    dentro = byte < mapa.size
+    vistos = np.zeros(ids.shape, dtype=bool)
+    vistos[dentro] = (mapa[byte[dentro]] >> (ids[dentro] & 7)) & 1
+    return vistos
+
+
+def count_seen(bits, word_ids):
+    return int(np.count_nonzero(is_seen(bits, word_ids)))
+
+
+def sample_unseen(bits, word_ids, quantidade, rng=None, excluir_ids=()):
+    # Até `quantidade` ids distintos de `word_ids` com o bit desligado, com chance igual para cada um
+    ids = np.asarray(word_ids, dtype=np.int64)
+    livres = ids[~is_seen(bits, ids)]
+    if excluir_ids:
+        livres = livres[~np.isin(livres, list(excluir_ids))]
+    quantidade = min(quantidade, livres.size)
+    if quantidade <= 0:
+        return []
+    posicoes = (rng or random).sample(range(livres.size), quantidade)
+    return livres[posicoes].tolist()
+
+
+def _mapas(statuses, user_ids):
+    ids_por_usuario = {user_id: [] for user_id in user_ids}
+    vistas = statuses.filter(user_id__in=user_ids).values_list('user_id', 'word_id')
+    for user_id, word_id in vistas.iterator(chunk_size=10000):
+        ids_por_usuario[user_id].append(word_id)
+    return {user_id: bits_from_word_ids(ids) for user_id, ids in ids_por_usuario.items()}
+
+
+def rebuild_seen_words(user_ids):
+    # Recalcula os mapas a partir de UserWordStatus (uma leitura e um upsert em massa). A leitura
+    # é no primário: um mapa feito com a réplica atrasada seria gravado sem as palavras mais recentes
+    mapas = _mapas(UserWordStatus.objects.using(DEFAULT_DB_ALIAS), user_ids)
+    SeenWords.objects.bulk_create(
+        [SeenWords(user_id=user_id, bits=bits) for user_id, bits in mapas.items()],
+        **upsert_options(['user'], ['bits']),
+    )
+    return mapas
+
+
+def get_seen_bits_bulk(user_ids):
+    # Só leitura: os mapas que faltam são calculados a partir dos status, sem gravar
+    mapas = {
+        user_id: bytes(bits)
+        for user_id, bits in SeenWords.objects.filter(user_id__in=user_ids).values_list('user_id', 'bits')
+    }
+    faltando = [user_id for user_id in user_ids if user_id not in mapas]
+    if faltando:
+        mapas.update(_mapas(UserWordStatus.objects.all(), faltando))
+    return mapas
+
+
+def get_seen_bits(user_id):
+    return get_seen_bits_bulk([user_id])[user_id]
+
+
+def mark_seen(user_id, word_ids):
+    # Chamado na transação que cria os status; o FOR UPDATE serializa respostas simultâneas do usuário
+    with transaction.atomic(savepoint=False):
+        bits = SeenWords.objects.select_for_update().filter(user_id=user_id).values_list('bits', flat=True).first()
+        if bits is None:
+            # Ainda sem mapa: a reconstrução já enxerga os status criados nesta transação
+            rebuild_seen_words([user_id])
+            return
+        novo = add_word_ids(bits, word_ids)
+        if novo != bytes(bits):
+            SeenWords.objects.filter(user_id=user_id).update(bits=novo)
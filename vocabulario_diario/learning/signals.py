@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from users.models import Profile
+from .catalog import invalidate_catalog
+from .models import CatalogVersion, Word
+from .progress_cache import bump_progress_version
+
+# Qualquer alteração individual de uma palavra (admin, shell...) muda a versão do catálogo,
+# para que todos os processos recarreguem o cache. As importações em massa fazem o mesmo
+# explicitamente, já que bulk_create/bulk_update não disparam sinais.
+@receiver([post_save, post_delete], sender=Word)
+def bump_catalog_version(sender, **kwargs):
+    CatalogVersion.bump()
+    invalidate_catalog()
+
+
+# A meta diária aparece na lista de treinos (progresso do dia)
+@receiver(post_save, sender=Profile)
+def bump_progress_on_profile_change(sender, instance, **kwargs):
+    bump_progress_version(instance.user_id)
@@ -0,0 +1,77 @@
+# learning/stats.py
+
+# Manutenção incremental de UserStats: cada alteração de status gera um "delta"
+# (diferença entre o antes e o depois) que é aplicado com F() num único UPDATE.
+
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Count, F, Q
+from .bulk import upsert_options
+from .models import UserStats, UserWordStatus
+
+CAMPOS_DE_ESTATISTICA = ['known_first_try', 'mastered', 'in_review', 'total']
+
+
+def stats_snapshot(status):
+    # Parte do status que interessa às estatísticas (None = status ainda não existia)
+    return (status.status, status.training_set_id is not None)
+
+
+def stats_delta(antes, depois, delta=None):
+    # Acumula em `delta` a mudança de um status de `antes` para `depois` (snapshots)
+    delta = delta if delta is not None else dict.fromkeys(CAMPOS_DE_ESTATISTICA, 0)
+    for snapshot, sinal in ((antes, -1), (depois, 1)):
+        if snapshot is None:
+            continue
+        status, em_conjunto = snapshot
+        delta['total'] += sinal
+        delta['known_first_try'] += sinal * (status == 'Acertou de Primeira')
+        delta['mastered'] += sinal * (status == 'Dominado')
+        delta['in_review'] += sinal * em_conjunto
+    return delta
+
+
+def apply_stats_delta(user_id, delta):
+    mudancas = {campo: F(campo) + valor for campo, valor in delta.items() if valor}
+    if not mudancas:
+        return
+    if not UserStats.objects.filter(user_id=user_id).update(**mudancas):
+        # Usuário ainda sem linha de estatísticas (ex.: anterior a este recurso):
+        # calcula a partir da tabela, que já contém a alteração atual
+        recompute_user_stats([user_id])
+
+
+def _contagens(statuses):
+    # {user_id: contagens} por agregação condicional sobre um queryset de UserWordStatus
+    contagens = statuses.values('user_id').annotate(
+        known_first_try=Count('id', filter=Q(status='Acertou de Primeira')),
+        mastered=Count('id', filter=Q(status='Dominado')),
+        in_review=Count('id', filter=Q(training_set__isnull=False)),
+        total=Count('id'),
+    ).order_by()
+    return {linha.pop('user_id'): linha for linha in contagens}
+
+
+def recompute_user_stats(user_ids):
+    # Recalcula as estatísticas de vários usuários com uma agregação condicional e um upsert em massa.
+    # Lido no primário mesmo numa view com ReplicaReadMixin: o resultado é gravado, e uma
+    # réplica atrasada deixaria contagens velhas no primário, sem nada que as corrigisse
+    por_usuario = _contagens(UserWordStatus.objects.using(DEFAULT_DB_ALIAS).filter(user_id__in=user_ids))
+    linhas = [UserStats(user_id=user_id, **por_usuario.get(user_id, {})) for user_id in user_ids]
+    UserStats.objects.bulk_create(linhas, **upsert_options(['user'], CAMPOS_DE_ESTATISTICA))
+
+
+def get_user_stats(user):
+    # Só leitura: as telas que usam isto são GETs (talvez na réplica e atrás do cache por ETag).
+    # Sem a linha (usuário anterior a este recurso), as contagens saem da tabela de status sem
+    # gravar nada; a linha é criada na próxima resposta (apply_stats_delta) ou pelo recompute_user_stats
+    stats = UserStats.objects.filter(user=user).first()
+    if stats is None:
+        # user_id e não user: atribuir a instância consulta o db_for_write, que fixaria a requisição no primário
+        stats = UserStats(user_id=user.id, **_contagens(UserWordStatus.objects.filter(user=user)).get(user.id, {}))
+    return stats
+
+
+def vocabulary_total(user):
+    # "Vocabulário total" do painel; também é o ponto de chegada do gráfico (progress.py)
+    stats = get_user_stats(user)
+    return stats.known_first_try + stats.mastered
@@ -0,0 +1,74 @@
+# learning/tasks.py
+
+# Tarefas que podem rodar em segundo plano pela fila de learning/jobs.py (comando run_workers).
+# Cada uma recebe o payload gravado no Job e devolve um resultado serializável em JSON.
+
+import io
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.utils import timezone
+from .catalog import get_catalog
+from .decks import active_user_batches, build_daily_decks, decks_config, schedule_nightly_decks
+from .distractors import rebuild_distractors, stale_word_ids
+from .jobs import enqueue, register
+from .progress_cache import bump_progress_versions
+from .reset import delete_user_progress
+from .seen import rebuild_seen_words
+from .stats import recompute_user_stats
+from .training import master_training_set
+
+
+@register('master_set')
+def master_set_task(payload):
+    user = User.objects.get(id=payload['user_id'])
+    return {'words_mastered': master_training_set(user, payload['set_id'], timezone.now())}
+
+
+@register('reset_progress')
+def reset_progress_task(payload):
+    return {'deleted': delete_user_progress(payload['user_id'])}
+
+
+@register('recompute_user_stats')
+def recompute_user_stats_task(payload):
+    recompute_user_stats(payload['user_ids'])
+    rebuild_seen_words(payload['user_ids'])
+    bump_progress_versions(payload['user_ids'])
+    return {'users': len(payload['user_ids'])}
+
+
+@register('import_words')
+def import_words_task(payload):
+    saida = io.StringIO()
+    call_command('import_words', payload['file_path'], batch_size=payload.get('batch_size', 1000), stdout=saida)
+    # As últimas linhas trazem o resumo (criadas, atualizadas, sem alteração)
+    return {'output': saida.getvalue().strip().splitlines()[-4:]}
+
+
+@register('build_daily_decks')
+def build_daily_decks_task(payload):
+    cartoes = build_daily_decks(payload['user_ids'], date.fromisoformat(payload['date']), get_catalog().id_array(), payload.get('max_reviews'))
+    return {'users': len(payload['user_ids']), 'cards': cartoes}
+
+
+@register('nightly_daily_decks')
+def nightly_daily_decks_task(payload):
+    # Divide os usuários em lotes (uma tarefa por lote, para os workers montarem em paralelo)
+    # e deixa a montagem da próxima noite agendada
+    hoje = timezone.localdate().isoformat()
+    lotes = 0
+    for user_ids in active_user_batches(decks_config()['BATCH_SIZE']):
+        enqueue('build_daily_decks', {'user_ids': user_ids, 'date': hoje})
+        lotes += 1
+    proxima = schedule_nightly_decks()
+    return {'batches': lotes, 'next_run': proxima.run_after.isoformat()}
+
+
+@register('build_distractors')
+def build_distractors_task(payload):
+    # Incremental por padrão (depois do import_words); {'full': true} recalcula todas
+    word_ids = None if payload.get('full') else stale_word_ids()
+    if word_ids is not None and not word_ids:
+        return {'words': 0}
+    return {'words': rebuild_distractors(word_ids)}
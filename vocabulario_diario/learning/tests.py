@@ -1,3 +1,1061 @@
-from django.test import TestCase
+import csv
+import gzip
+import io
+import json
+import os
+import random
+import tempfile
+from datetime import timedelta
+from unittest import mock, skipUnless
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections, transaction
+from django.http import Http404
+from django.test.utils import CaptureQueriesContext
+from django.test import AsyncRequestFactory, Client, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from . import async_views
+from .answer_index import build_answer_keys, normalize_answer
+from .answers import get_or_create_today_set, lock_or_create_statuses
+from .catalog import get_catalog, get_word_or_404, invalidate_catalog
+from .models import CatalogVersion, DailyDeck, DailyMasteryLog, DailyDeckCard, DailyProgress, Job, ReviewEvent, SeenWords, TrainingSet, UserStats, UserWordStatus, Word
+from .decks import build_daily_decks, cards_remaining, next_deck_word_ids
+from .distractors import choices_for, compute_distractors, rebuild_distractors
+from .export import export_chunks, progress_queryset
+from .jobs import TASKS, enqueue, run_next_job
+from .metrics import QueryRecorder, registry
+from .reset import MODELOS_DO_PROGRESSO, delete_user_progress
+from .routers import COOKIE_DO_PRIMARIO, PrimaryReplicaRouter, _EstadoDaRequisicao, _estado_atual, read_from_replica
+from .sampling import sample_new_words
+from .scheduling import ExponentialScheduler, LinearScheduler, Scheduler, SM2Scheduler, build_scheduler
+from .seen import add_word_ids, bits_from_word_ids, count_seen, get_seen_bits, is_seen, rebuild_seen_words, sample_unseen
+from .stats import recompute_user_stats, stats_delta
+from .training import training_progress
+from .views import TrainingSetListView
 
-# Create your tests here.
+
+class ConcurrentAnswersTest(TransactionTestCase):
+    # Respostas simultâneas do mesmo usuário (várias abas, retentativas do app) não podem
+    # duplicar status nem o conjunto aberto do dia, nem perder contagens
+    THREADS = 8
+
+    def setUp(self):
+        # Cada thread abre a própria conexão: no SQLite o banco de testes precisa estar em
+        # arquivo (TEST NAME) e com transaction_mode IMMEDIATE, senão as escritas falham
+        # com "database is locked" em vez de esperar a vez
+        if connection.vendor == 'sqlite' and (
+            connection.is_in_memory_db() or connection.settings_dict['OPTIONS'].get('transaction_mode') != 'IMMEDIATE'
+        ):
+            self.skipTest('Rode com MySQL ou com SQLite em arquivo e transaction_mode IMMEDIATE.')
+        self.user = User.objects.create_user('concorrente', password='senha-de-teste')
+        Word.objects.bulk_create([
+            Word(text_english=f'word{i}', text_portuguese=f'palavra{i}') for i in range(self.THREADS)
+        ])
+        # O catálogo em memória é do processo: cada teste recria as palavras (e os ids)
+        invalidate_catalog()
+        self.words = list(Word.objects.order_by('id'))
+
+    def tearDown(self):
+        invalidate_catalog()
+
+    def _responder(self, word_id):
+        client = Client()
+        client.force_login(self.user)
+        try:
+            return client.post(
+                reverse('check_answer'),
+                data=json.dumps({'word_id': word_id, 'user_answer': 'errada'}),
+                content_type='application/json',
+            ).status_code
+        finally:
+            connections.close_all()
+
+    def _em_paralelo(self, word_ids):
+        with ThreadPoolExecutor(max_workers=self.THREADS) as executor:
+            return list(executor.map(self._responder, word_ids))
+
+    def test_same_word_answered_in_parallel(self):
+        word = self.words[0]
+        codigos = self._em_paralelo([word.id] * self.THREADS)
+
+        self.assertEqual(codigos, [200] * self.THREADS)
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user, word=word).count(), 1)
+        self.assertEqual(UserWordStatus.objects.get(user=self.user, word=word).status, 'Em Revisao')
+        self.assertEqual(TrainingSet.objects.filter(user=self.user, open_date=timezone.now().date()).count(), 1)
+        self.assertEqual(ReviewEvent.objects.filter(user=self.user).count(), self.THREADS)
+        self.assertEqual(UserStats.objects.get(user=self.user).total, 1)
+
+    def test_new_words_answered_in_parallel(self):
+        codigos = self._em_paralelo([word.id for word in self.words])
+
+        self.assertEqual(codigos, [200] * self.THREADS)
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user).count(), self.THREADS)
+        self.assertEqual(TrainingSet.objects.filter(user=self.user, is_mastered=False).count(), 1)
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user).values('training_set').distinct().count(), 1)
+        self.assertEqual(ReviewEvent.objects.filter(user=self.user).count(), self.THREADS)
+        self.assertEqual(UserStats.objects.get(user=self.user).total, self.THREADS)
+
+
+class ImportWordsTest(TestCase):
+    def setUp(self):
+        invalidate_catalog()
+        self.addCleanup(invalidate_catalog)
+
+    def _csv(self, linhas):
+        arquivo = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        self.addCleanup(os.unlink, arquivo.name)
+        with arquivo:
+            arquivo.write('Sig_Ingles,Sig_Portugues,Complexidade_Comprimento\n')
+            arquivo.writelines(f'{linha}\n' for linha in linhas)
+        return arquivo.name
+
+    def test_partial_failure_publishes_committed_batches(self):
+        # O primeiro lote é gravado; a segunda linha tem complexidade inválida
+        caminho = self._csv(['house,casa,4', 'dog,cachorro,não-é-número'])
+        versao = CatalogVersion.current()
+
+        with self.assertRaises(CommandError):
+            call_command('import_words', caminho, batch_size=1, stdout=io.StringIO())
+
+        word = Word.objects.get(text_english='house')
+        self.assertGreater(CatalogVersion.current(), versao)
+        self.assertEqual(get_word_or_404(word.id).text_portuguese, 'casa')
+        self.assertTrue(Job.objects.filter(name='build_distractors').exists())
+
+    def test_missing_file_raises(self):
+        with self.assertRaises(CommandError):
+            call_command('import_words', '/nao/existe.csv', stdout=io.StringIO())
+        self.assertEqual(CatalogVersion.current(), 0)
+
+
+class LearningTestMixin:
+    # Usuário logado e um catálogo pequeno; o catálogo em memória é do processo e é
+    # descartado em volta de cada teste (os ids das palavras mudam de um teste para outro)
+    PALAVRAS = 6
+
+    def setUp(self):
+        invalidate_catalog()
+        self.addCleanup(invalidate_catalog)
+        self.user = User.objects.create_user('aluno', password='senha-de-teste')
+        self.client.force_login(self.user)
+        Word.objects.bulk_create([
+            Word(text_english=f'word{i}', text_portuguese=f'palavra{i}', complexity=i) for i in range(self.PALAVRAS)
+        ])
+        self.words = list(Word.objects.order_by('id'))
+
+    def _post(self, nome, dados):
+        return self.client.post(reverse(nome), data=json.dumps(dados), content_type='application/json')
+
+    def _responder(self, word, certa):
+        resposta = word.text_portuguese if certa else 'errada'
+        return self._post('check_answer', {'word_id': word.id, 'user_answer': resposta})
+
+    def _estatisticas(self):
+        stats = UserStats.objects.get(user=self.user)
+        return {campo: getattr(stats, campo) for campo in ('known_first_try', 'mastered', 'in_review', 'total')}
+
+
+class LearningTestCase(LearningTestMixin, TestCase):
+    def _post(self, nome, dados):
+        # O TestCase nunca faz COMMIT: roda os on_commit (troca da versão do progresso) na hora
+        with self.captureOnCommitCallbacks(execute=True):
+            return super()._post(nome, dados)
+
+
+class StudySessionTest(LearningTestCase):
+    def _estudar(self):
+        return self.client.get(reverse('study_session'))
+
+    def test_most_overdue_review_comes_first(self):
+        agora = timezone.now()
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=self.words[0], status='Em Revisao', next_review_date=agora - timedelta(hours=1)),
+            UserWordStatus(user=self.user, word=self.words[1], status='Dominado', next_review_date=agora - timedelta(hours=5)),
+            UserWordStatus(user=self.user, word=self.words[2], status='Em Revisao', next_review_date=agora + timedelta(hours=1)),
+        ])
+        fila = UserWordStatus.objects.due_for_review(self.user, agora)
+        self.assertEqual([status.word_id for status in fila], [self.words[1].id, self.words[0].id])
+        self.assertEqual(self._estudar().context['word'].id, self.words[1].id)
+
+    def test_new_words_when_nothing_is_due(self):
+        amanha = timezone.now() + timedelta(days=1)
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=word, status='Dominado', next_review_date=amanha) for word in self.words[:5]
+        ])
+        self.assertEqual(self._estudar().context['word'].id, self.words[5].id)
+
+        UserWordStatus.objects.create(user=self.user, word=self.words[5], status='Dominado', next_review_date=amanha)
+        self.assertTemplateUsed(self._estudar(), 'session_finished.html')
+
+
+class NewWordSamplingTest(LearningTestCase):
+    def test_samples_distinct_unseen_words_without_scanning_statuses(self):
+        self._responder(self.words[0], certa=True)
+        get_catalog()
+        # Só a leitura do mapa de bits: nem ORDER BY aleatório nem lista de status do usuário
+        with CaptureQueriesContext(connection) as consultas:
+            novas = sample_new_words(self.user, quantidade=3, excluir_ids=[self.words[1].id])
+        self.assertEqual(len(consultas), 1)
+        self.assertNotIn('learning_userwordstatus', consultas[0]['sql'].lower())
+        ids = [word.id for word in novas]
+        self.assertEqual(len(set(ids)), 3)
+        self.assertFalse({self.words[0].id, self.words[1].id} & set(ids))
+
+    def test_returns_fewer_words_when_catalog_is_exhausted(self):
+        excluir = [word.id for word in self.words[1:]]
+        self.assertEqual([word.id for word in sample_new_words(self.user, 5, excluir_ids=excluir)], [self.words[0].id])
+        self.assertEqual(sample_new_words(self.user, 5, excluir_ids=excluir + [self.words[0].id]), [])
+
+
+class NextCardsTest(LearningTestCase):
+    def _proximos(self, **parametros):
+        return self.client.get(reverse('next_cards'), parametros)
+
+    def test_batch_respects_limit_and_exclusions(self):
+        UserWordStatus.objects.create(user=self.user, word=self.words[3], status='Em Revisao', next_review_date=timezone.now() - timedelta(hours=1))
+        cards = self._proximos(limit=4, exclude=f'{self.words[0].id},{self.words[1].id}').json()['cards']
+        ids = [card['word_id'] for card in cards]
+        # A revisão vencida vem antes das palavras novas
+        self.assertEqual(ids[0], self.words[3].id)
+        self.assertCountEqual(ids, [word.id for word in self.words[2:]])
+        self.assertEqual(cards[0]['text_english'], self.words[3].text_english)
+        self.assertNotIn('choices', cards[0])
+
+    def test_training_set_batch_brings_counters(self):
+        for word in self.words[:2]:
+            self._responder(word, certa=False)
+        training_set = TrainingSet.objects.get(user=self.user)
+        self._responder(self.words[0], certa=True)
+        dados = self._proximos(set_id=training_set.id).json()
+        self.assertEqual([card['word_id'] for card in dados['cards']], [self.words[1].id])
+        self.assertEqual((dados['total_palavras_no_conjunto'], dados['palavras_respondidas']), (2, 1))
+
+    def test_invalid_parameters(self):
+        for parametros in ({'limit': 'dez'}, {'limit': 0}, {'limit': -1}, {'exclude': '1,x'}, {'set_id': 'abc'}):
+            with self.subTest(**parametros):
+                self.assertEqual(self._proximos(**parametros).status_code, 400)
+        training_set = TrainingSet.objects.create(user=self.user)
+        self.assertEqual(self._proximos(set_id=training_set.id, limit=-1).status_code, 400)
+        self.assertEqual(len(self._proximos(limit=1000).json()['cards']), len(self.words))
+        outro = User.objects.create_user('outro')
+        self.assertEqual(self._proximos(set_id=TrainingSet.objects.create(user=outro).id).status_code, 404)
+
+
+class BatchAnswersTest(LearningTestCase):
+    def test_batch_grades_and_records_every_answer(self):
+        futuro = (timezone.now() + timedelta(days=1)).isoformat()
+        resposta = self._post('check_answers_batch', {'answers': [
+            {'word_id': self.words[0].id, 'user_answer': 'palavra0'},
+            {'word_id': self.words[1].id, 'user_answer': 'errada', 'answered_at': futuro},
+            {'word_id': 999999, 'user_answer': 'palavra2'},
+            {'word_id': self.words[2].id},
+            'lixo',
+        ]})
+        self.assertEqual(resposta.json()['results'], [
+            {'word_id': self.words[0].id, 'correct': True, 'correct_answer': 'palavra0'},
+            {'word_id': self.words[1].id, 'correct': False, 'correct_answer': 'palavra1'},
+            {'word_id': 999999, 'error': 'Resposta inválida.'},
+            {'word_id': self.words[2].id, 'error': 'Resposta inválida.'},
+            {'word_id': None, 'error': 'Resposta inválida.'},
+        ])
+
+        statuses = dict(UserWordStatus.objects.filter(user=self.user).values_list('word_id', 'status'))
+        self.assertEqual(statuses, {self.words[0].id: 'Acertou de Primeira', self.words[1].id: 'Em Revisao'})
+        self.assertEqual(UserWordStatus.objects.get(training_set__user=self.user).word_id, self.words[1].id)
+        # O horário do cliente no futuro vira o horário do servidor
+        self.assertLessEqual(ReviewEvent.objects.get(user=self.user, word=self.words[1]).created_at, timezone.now())
+        self.assertEqual(DailyProgress.objects.get(user=self.user).answers, 2)
+        incremental = self._estatisticas()
+        recompute_user_stats([self.user.id])
+        self.assertEqual(self._estatisticas(), incremental)
+
+    def test_batch_matches_answering_one_by_one(self):
+        respostas = [(self.words[0], 'errada'), (self.words[0], 'palavra0'), (self.words[1], 'palavra1')]
+        self._post('check_answers_batch', {'answers': [{'word_id': word.id, 'user_answer': texto} for word, texto in respostas]})
+        em_lote = list(UserWordStatus.objects.filter(user=self.user).order_by('word_id').values_list('word_id', 'status', 'consecutive_correct_answers', 'training_answered'))
+
+        UserWordStatus.objects.filter(user=self.user).delete()
+        for word, texto in respostas:
+            self._post('check_answer', {'word_id': word.id, 'user_answer': texto})
+        uma_a_uma = list(UserWordStatus.objects.filter(user=self.user).order_by('word_id').values_list('word_id', 'status', 'consecutive_correct_answers', 'training_answered'))
+        self.assertEqual(em_lote, uma_a_uma)
+
+    def test_rejects_empty_or_oversized_batches(self):
+        for corpo in ({}, {'answers': []}, {'answers': [{}] * 101}, {'answers': 'x'}):
+            self.assertEqual(self._post('check_answers_batch', corpo).status_code, 400)
+        self.assertFalse(UserWordStatus.objects.exists())
+
+
+class MasterSetTest(LearningTestCase):
+    def _errar(self, words):
+        for word in words:
+            self._responder(word, certa=False)
+        return TrainingSet.objects.get(user=self.user, is_mastered=False).id
+
+    def _dominar(self, set_id):
+        return self._post('master_set', {'set_id': set_id})
+
+    def test_query_count_does_not_grow_with_the_set(self):
+        set_id = self._errar(self.words[:1])
+        with CaptureQueriesContext(connection) as pequeno:
+            self._dominar(set_id)
+        set_id = self._errar(self.words[1:])
+        with CaptureQueriesContext(connection) as grande:
+            self._dominar(set_id)
+        self.assertEqual(len(grande), len(pequeno))
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user, status='Dominado').count(), 6)
+
+    def test_second_click_masters_nothing(self):
+        set_id = self._errar(self.words[:3])
+        self.assertEqual(self._dominar(set_id).json()['words_mastered'], 3)
+        self.assertEqual(self._dominar(set_id).json()['words_mastered'], 0)
+        self.assertEqual(DailyMasteryLog.objects.get(user=self.user).mastered_words_count, 3)
+        self.assertTrue(TrainingSet.objects.get(pk=set_id).is_mastered)
+
+    def test_other_users_set_is_not_found(self):
+        outro = User.objects.create_user('outro')
+        self.assertEqual(self._dominar(TrainingSet.objects.create(user=outro).id).status_code, 404)
+
+
+class AnswerIndexTest(LearningTestCase):
+    def _certa(self, word, texto):
+        return self._post('check_answer', {'word_id': word.id, 'user_answer': texto}).json()['correct']
+
+    def test_normalization(self):
+        self.assertEqual(normalize_answer('  Ação,  Rápida! '), 'acao rapida')
+        self.assertEqual(build_answer_keys('Andar', 'seguir; caminhar / ir,, Andar'), 'andar\ncaminhar\nir\nseguir')
+        self.assertEqual(build_answer_keys('', None), '')
+
+    def test_synonyms_accents_and_case_are_accepted(self):
+        word = Word.objects.create(text_english='to walk', text_portuguese='andar', synonyms_portuguese='caminhar, passear')
+        for texto, certa in (('ANDAR', True), ('Caminhar.', True), (' passear ', True), ('correr', False), ('', False)):
+            with self.subTest(texto=texto):
+                self.assertEqual(self._certa(word, texto), certa)
+
+    def test_index_follows_edits(self):
+        # O save() recalcula o índice e o sinal troca a versão do catálogo
+        word = self.words[0]
+        word.synonyms_portuguese = 'vocábulo'
+        word.save(update_fields=['synonyms_portuguese'])
+        self.assertEqual(Word.objects.get(pk=word.pk).answer_keys, 'palavra0\nvocabulo')
+        self.assertTrue(self._certa(word, 'Vocabulo'))
+
+
+class CatalogCacheTest(LearningTestCase):
+    @override_settings(LEARNING_CATALOG_CHECK_INTERVAL=60)
+    def test_copy_is_reused_until_the_version_changes(self):
+        catalogo = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), catalogo)
+        # Sem mudança de versão a verificação forçada é uma consulta e mantém a cópia
+        with self.assertNumQueries(1):
+            self.assertIs(get_catalog(verificar_versao=True), catalogo)
+
+        # Outro processo importa em massa (sem sinais) e troca a versão
+        Word.objects.filter(pk=self.words[0].pk).update(text_portuguese='vocábulo')
+        CatalogVersion.bump()
+        self.assertEqual(get_catalog().get(self.words[0].id).text_portuguese, 'palavra0')
+        atual = get_catalog(verificar_versao=True)
+        self.assertIsNot(atual, catalogo)
+        self.assertEqual(atual.get(self.words[0].id).text_portuguese, 'vocábulo')
+
+    @override_settings(LEARNING_CATALOG_CHECK_INTERVAL=60)
+    def test_unknown_word_forces_a_version_check(self):
+        get_catalog()
+        nova = Word.objects.bulk_create([Word(text_english='new', text_portuguese='nova')])[0]
+        CatalogVersion.bump()
+        self.assertEqual(get_word_or_404(str(nova.id)).text_portuguese, 'nova')
+        for word_id in (None, 'x', 999999):
+            with self.subTest(word_id=word_id), self.assertRaises(Http404):
+                get_word_or_404(word_id)
+
+
+class UserStatsTest(LearningTestCase):
+    def test_delta_between_snapshots(self):
+        delta = stats_delta(('Em Revisao', True), ('Dominado', False))
+        self.assertEqual(delta, {'known_first_try': 0, 'mastered': 1, 'in_review': -1, 'total': 0})
+        self.assertEqual(stats_delta(None, ('Acertou de Primeira', False))['total'], 1)
+
+    def test_incremental_stats_match_recompute(self):
+        self._responder(self.words[0], certa=True)
+        self._responder(self.words[1], certa=False)
+        self._responder(self.words[2], certa=False)
+        self._post('mark_as_correct', {'word_id': self.words[2].id})
+        set_id = TrainingSet.objects.get(user=self.user).id
+        self._post('master_set', {'set_id': set_id})
+
+        incremental = self._estatisticas()
+        self.assertEqual(incremental, {'known_first_try': 1, 'mastered': 2, 'in_review': 0, 'total': 3})
+        recompute_user_stats([self.user.id])
+        self.assertEqual(self._estatisticas(), incremental)
+
+    def test_missing_row_is_rebuilt_from_statuses(self):
+        self._responder(self.words[0], certa=True)
+        UserStats.objects.filter(user=self.user).delete()
+        self._responder(self.words[1], certa=False)
+        self.assertEqual(self._estatisticas(), {'known_first_try': 1, 'mastered': 0, 'in_review': 1, 'total': 2})
+
+
+class ChartDataTest(LearningTestCase):
+    def _grafico(self):
+        return self.client.get(reverse('chart_data')).json()
+
+    def test_daily_rollup_counts_answers(self):
+        self._responder(self.words[0], certa=True)
+        self._responder(self.words[1], certa=False)
+
+        progresso = DailyProgress.objects.get(user=self.user)
+        self.assertEqual((progresso.answers, progresso.correct_answers, progresso.words_learned), (2, 1, 1))
+        self.assertEqual(ReviewEvent.objects.filter(user=self.user).count(), 2)
+        self.assertEqual(self._grafico()['data'], [1])
+
+    def test_series_starts_from_progress_before_the_rollup(self):
+        # Usuário com 5 palavras dominadas de antes do resumo diário (sem DailyProgress)
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=word, status='Dominado', consecutive_correct_answers=1) for word in self.words[:5]
+        ])
+        recompute_user_stats([self.user.id])
+        self.assertEqual(self._grafico()['data'], [5])
+
+        # Errar duas delas tira duas do vocabulário: o gráfico vai a 3, não a -2
+        self._responder(self.words[0], certa=False)
+        self._responder(self.words[1], certa=False)
+        self.assertEqual(self._grafico()['data'], [3])
+        self.assertEqual(self.client.get(reverse('dashboard')).context['vocabulario_total'], 3)
+
+
+class SchedulerTest(SimpleTestCase):
+    def test_intervals(self):
+        self.assertEqual([LinearScheduler().interval_days(n) for n in (0, 1, 3)], [1, 1, 3])
+        self.assertEqual([SM2Scheduler().interval_days(n) for n in (1, 2, 3)], [1, 6, 15])
+        self.assertAlmostEqual(ExponentialScheduler(growth=2).interval_days(3), 4)
+
+    def test_long_streaks_stop_at_maximum_interval(self):
+        for scheduler in (SM2Scheduler(), ExponentialScheduler(initial_stability_days=0.5), LinearScheduler()):
+            with self.subTest(scheduler.name):
+                self.assertEqual(scheduler.interval_days(10 ** 6), scheduler.maximum_interval_days)
+                self.assertEqual(scheduler.interval_days_batch([10 ** 6]).tolist(), [scheduler.maximum_interval_days])
+
+    def test_batch_matches_single(self):
+        consecutivos = [0, 1, 2, 5, 9, 40, 5000]
+        for scheduler in (LinearScheduler(), SM2Scheduler(ease_factor=2.3), ExponentialScheduler(desired_retention=0.8)):
+            with self.subTest(scheduler.name):
+                lote = scheduler.interval_days_batch(consecutivos).tolist()
+                for consecutivo, intervalo in zip(consecutivos, lote):
+                    self.assertAlmostEqual(intervalo, scheduler.interval_days(consecutivo), places=6)
+
+    def test_wrong_answer_relearns_in_minutes(self):
+        agora = timezone.now()
+        self.assertEqual(SM2Scheduler(relearn_minutes=15).next_review(7, False, agora), agora + timedelta(minutes=15))
+
+    def test_base_class_is_abstract(self):
+        with self.assertRaises(TypeError):
+            Scheduler()
+        with self.assertRaises(ImproperlyConfigured):
+            build_scheduler('desconhecido')
+
+
+class RescheduleReviewsTest(LearningTestCase):
+    @override_settings(LEARNING_SCHEDULER={'ALGORITHM': 'sm2'})
+    def test_only_words_scheduled_by_a_correct_answer_move(self):
+        agora = timezone.now()
+        training_set = TrainingSet.objects.create(user=self.user)
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=self.words[0], status='Dominado', consecutive_correct_answers=2, next_review_date=agora + timedelta(days=2)),
+            # Acertos dentro do treino: a data ainda é a de reaprendizado, em minutos
+            UserWordStatus(user=self.user, word=self.words[1], status='Em Revisao', consecutive_correct_answers=2,
+                           next_review_date=agora + timedelta(minutes=10), training_set=training_set),
+        ])
+        call_command('reschedule_reviews', stdout=io.StringIO())
+
+        datas = dict(UserWordStatus.objects.filter(user=self.user).values_list('word_id', 'next_review_date'))
+        # Linear: 2 dias para 2 acertos; SM-2: 6 dias
+        self.assertEqual(datas[self.words[0].id], agora + timedelta(days=6))
+        self.assertEqual(datas[self.words[1].id], agora + timedelta(minutes=10))
+
+
+class TrainingProgressTest(LearningTestCase):
+    def test_progress_comes_from_the_statuses(self):
+        for word in self.words[:3]:
+            self._responder(word, certa=False)
+        training_set = TrainingSet.objects.get(user=self.user)
+        self._responder(self.words[0], certa=True)
+        self._post('mark_as_correct', {'word_id': self.words[1].id})
+        # Errar de novo dentro do treino deixa a palavra pendente no mesmo conjunto
+        self._responder(self.words[2], certa=False)
+
+        progresso = training_progress(training_set)
+        self.assertEqual((progresso.total, progresso.respondidas, progresso.pendentes), (3, 2, [self.words[2].id]))
+        resposta = self.client.get(reverse('training_session', args=[training_set.id]))
+        self.assertEqual(resposta.context['word'].id, self.words[2].id)
+        self.assertEqual((resposta.context['total_palavras_no_conjunto'], resposta.context['palavras_respondidas']), (3, 2))
+        self.assertFalse(any(chave.startswith('training') for chave in self.client.session.keys()))
+
+
+class TrainingSetListTest(LearningTestCase):
+    def _conjunto(self, words, dias_atras, **campos):
+        training_set = TrainingSet.objects.create(user=self.user, creation_date=timezone.localdate() - timedelta(days=dias_atras), **campos)
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=word, status='Em Revisao', training_set=training_set) for word in words
+        ])
+        return training_set
+
+    def test_pending_sets_with_word_counts_in_one_query(self):
+        recente = self._conjunto(self.words[1:4], dias_atras=1)
+        antigo = self._conjunto(self.words[:1], dias_atras=2)
+        self._conjunto(self.words[4:], dias_atras=0, is_mastered=True)
+        self._conjunto([], dias_atras=0)
+        DailyMasteryLog.objects.create(user=self.user, date=timezone.localdate(), mastered_words_count=4)
+
+        # Conjuntos, contagem de palavras e progresso do dia numa consulta (o perfil já está no usuário)
+        with self.assertNumQueries(1):
+            contexto = TrainingSetListView._contexto(self.user)
+        self.assertEqual([(ts.id, ts.word_count) for ts in contexto['training_sets']], [(antigo.id, 1), (recente.id, 3)])
+        self.assertEqual((contexto['progresso_hoje'], contexto['progresso_percentagem']), (4, 40))
+
+    def test_progress_without_pending_sets(self):
+        DailyMasteryLog.objects.create(user=self.user, date=timezone.localdate(), mastered_words_count=25)
+        contexto = self.client.get(reverse('training_set_list')).context
+        self.assertEqual(list(contexto['training_sets']), [])
+        self.assertEqual((contexto['progresso_hoje'], contexto['progresso_percentagem']), (25, 100))
+
+
+class AsyncApiTest(LearningTestCase):
+    # As views assíncronas chamadas direto (as URLs escolhem sync ou async na importação,
+    # pelo LEARNING_ASYNC_API), com o usuário entregue pelo request.auser()
+    def _chamar(self, view, metodo, dados=None, user=None):
+        fabrica = AsyncRequestFactory()
+        request = fabrica.post('/', data=json.dumps(dados), content_type='application/json') if metodo == 'post' else fabrica.get('/')
+
+        async def auser():
+            return user or self.user
+        request.auser = auser
+        return async_to_sync(view.as_view())(request)
+
+    def test_answers_are_graded_and_recorded(self):
+        resposta = self._chamar(async_views.CheckAnswerView, 'post', {'word_id': self.words[0].id, 'user_answer': 'Palavra0'})
+        self.assertEqual(json.loads(resposta.content), {'correct': True, 'correct_answer': 'palavra0'})
+        self._chamar(async_views.CheckAnswerView, 'post', {'word_id': self.words[1].id, 'user_answer': 'errada'})
+        self._chamar(async_views.MarkAsCorrectView, 'post', {'word_id': self.words[1].id})
+        self.assertEqual(self._estatisticas(), {'known_first_try': 1, 'mastered': 0, 'in_review': 1, 'total': 2})
+        self.assertTrue(UserWordStatus.objects.get(user=self.user, word=self.words[1]).training_answered)
+        with self.assertRaises(Http404):
+            self._chamar(async_views.CheckAnswerView, 'post', {'word_id': 999999, 'user_answer': 'x'})
+
+    def test_chart_matches_sync_view(self):
+        self._responder(self.words[0], certa=True)
+        resposta = self._chamar(async_views.DashboardChartDataView, 'get')
+        self.assertEqual(json.loads(resposta.content), self.client.get(reverse('chart_data')).json())
+        self.assertEqual(resposta.headers['ETag'], self.client.get(reverse('chart_data')).headers['ETag'])
+
+    def test_master_set_in_background_checks_the_owner(self):
+        self._responder(self.words[0], certa=False)
+        set_id = TrainingSet.objects.get(user=self.user).id
+        resposta = self._chamar(async_views.MasterSetView, 'post', {'set_id': set_id, 'background': True})
+        self.assertEqual(resposta.status_code, 202)
+        self.assertEqual(Job.objects.get(pk=json.loads(resposta.content)['job_id']).payload, {'user_id': self.user.id, 'set_id': set_id})
+        with self.assertRaises(Http404):
+            self._chamar(async_views.MasterSetView, 'post', {'set_id': set_id, 'background': True}, user=User.objects.create_user('outro'))
+
+    def test_anonymous_user_is_redirected_to_login(self):
+        resposta = self._chamar(async_views.CheckAnswerView, 'post', {}, user=AnonymousUser())
+        self.assertEqual(resposta.status_code, 302)
+
+
+class BenchmarkSuiteTest(TestCase):
+    def setUp(self):
+        invalidate_catalog()
+        self.addCleanup(invalidate_catalog)
+
+    def _gerar(self, **opcoes):
+        opcoes = {'words': 60, 'users': 3, 'statuses_per_user': 20, 'days': 5, 'batch_size': 50, **opcoes}
+        call_command('generate_synthetic_data', stdout=io.StringIO(), **opcoes)
+        return list(UserWordStatus.objects.order_by('user__username', 'word__text_english').values_list('user__username', 'word__text_english', 'status'))
+
+    def test_synthetic_data_is_reproducible_and_consistent(self):
+        primeira = self._gerar()
+        self.assertEqual(len(primeira), 60)
+        self.assertEqual(Word.objects.count(), 60)
+        # Rodar de novo não duplica nada; com a mesma semente o resultado é o mesmo
+        self.assertEqual(self._gerar(), primeira)
+        User.objects.filter(username__startswith='sintetico_u').delete()
+        Word.objects.all().delete()
+        self.assertEqual(self._gerar(), primeira)
+
+        # Estatísticas, mapas de vistas e histórico batem com os status gerados
+        user = User.objects.get(username='sintetico_u0000000')
+        stats = {campo: getattr(UserStats.objects.get(user=user), campo) for campo in ('known_first_try', 'mastered', 'in_review', 'total')}
+        recompute_user_stats([user.id])
+        self.assertEqual({campo: getattr(UserStats.objects.get(user=user), campo) for campo in stats}, stats)
+        self.assertEqual(count_seen(get_seen_bits(user.id), get_catalog().id_array()), 20)
+        aprendidas = sum(DailyProgress.objects.filter(user=user).values_list('words_learned', flat=True))
+        self.assertEqual(aprendidas, stats['known_first_try'] + stats['mastered'])
+
+    def test_benchmark_writes_a_report(self):
+        self._gerar()
+        pasta = tempfile.TemporaryDirectory()
+        self.addCleanup(pasta.cleanup)
+        saida = os.path.join(pasta.name, 'bench.json')
+        # O test runner já preparou o ambiente de testes que o comando prepara sozinho, e nos
+        # testes a réplica espelha o default: as consultas são contadas só no banco de testes
+        comando = 'learning.management.commands.benchmark_endpoints'
+        with mock.patch(f'{comando}.setup_test_environment'), mock.patch(f'{comando}.connections', {DEFAULT_DB_ALIAS: connection}):
+            call_command('benchmark_endpoints', endpoint=['dashboard', 'check_answer'], iterations=3, warmup=1, output=saida, stdout=io.StringIO())
+            with self.assertRaises(CommandError):
+                call_command('benchmark_endpoints', endpoint=['nao_existe'], output=saida, stdout=io.StringIO())
+        with open(saida, encoding='utf-8') as arquivo:
+            relatorio = json.load(arquivo)
+        self.assertEqual(relatorio['user'], 'sintetico_u0000000')
+        self.assertEqual([resultado['name'] for resultado in relatorio['endpoints']], ['dashboard', 'check_answer'])
+        for resultado in relatorio['endpoints']:
+            self.assertEqual(resultado['status_codes'], {'200': 3})
+            self.assertLessEqual(resultado['p50_ms'], resultado['p99_ms'])
+
+
+@override_settings(LEARNING_METRICS={'ENABLED': True, 'SAMPLE_RATE': 1.0, 'TOKEN': 'segredo'})
+class MetricsTest(LearningTestCase):
+    def setUp(self):
+        super().setUp()
+        registry.reset()
+        self.addCleanup(registry.reset)
+        # Cliente novo: o middleware é montado na primeira requisição, já com as métricas ligadas
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_recorder_counts_repeated_queries(self):
+        gravador = QueryRecorder()
+        executar = lambda sql, params, many, context: None
+        for params in ((1,), (2,), (1,)):
+            gravador(executar, 'SELECT %s', params, False, {})
+        self.assertEqual((gravador.count, gravador.duplicates), (3, 1))
+        self.assertEqual(gravador.duplicate_sql, {'SELECT %s': 1})
+
+    def test_requests_show_up_per_view(self):
+        for _ in range(2):
+            self.client.get(reverse('dashboard'))
+        metricas = self.client.get(reverse('metrics'), {'format': 'json'}, HTTP_AUTHORIZATION='Bearer segredo').json()
+        painel = metricas['views']['dashboard']
+        self.assertEqual(painel['requests'], 2)
+        self.assertEqual(painel['queries']['count'], 2)
+        self.assertGreater(painel['queries']['sum'], 0)
+
+        texto = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo').content.decode()
+        self.assertIn('learning_request_queries_count{view="dashboard"} 2', texto)
+        self.assertIn('learning_request_duration_seconds_bucket{view="dashboard",le="+Inf"} 2', texto)
+
+    def test_only_staff_or_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        self.assertEqual(self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer errado').status_code, 403)
+        User.objects.filter(pk=self.user.pk).update(is_staff=True)
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+
+
+class ResetProgressTest(LearningTestCase):
+    def test_deletes_only_this_users_progress_by_primary_key(self):
+        outro = User.objects.create_user('outro', password='senha-de-teste')
+        for word in self.words[:4]:
+            self._responder(word, certa=word.id % 2 == 0)
+        deck = DailyDeck.objects.create(user=self.user, date=timezone.localdate(), size=1)
+        DailyDeckCard.objects.create(deck=deck, position=0, word=self.words[5])
+        UserWordStatus.objects.create(user=outro, word=self.words[0], status='Dominado')
+        training_set = TrainingSet.objects.get(user=self.user)
+
+        with CaptureQueriesContext(connection) as consultas:
+            apagadas = delete_user_progress(self.user.id, chunk_size=2)
+
+        self.assertEqual(apagadas['userwordstatus'], 4)
+        self.assertEqual(apagadas['dailydeckcard'], 1)
+        for model, campo_do_usuario in MODELOS_DO_PROGRESSO:
+            self.assertFalse(model.objects.filter(**{campo_do_usuario: self.user.id}).exists(), model.__name__)
+        self.assertEqual(UserWordStatus.objects.filter(user=outro).count(), 1)
+        # Nenhuma linha inteira é lida antes do DELETE: só ids, pelo caminho rápido ou pelo coletor
+        sqls = [consulta['sql'] for consulta in consultas.captured_queries]
+        colunas_lidas = [sql.split(' FROM ')[0] for sql in sqls if sql.startswith('SELECT')]
+        self.assertFalse([colunas for colunas in colunas_lidas if ',' in colunas])
+        # O único UPDATE é o SET_NULL do coletor nos status, que já foram apagados
+        updates = [sql for sql in sqls if sql.startswith('UPDATE')]
+        self.assertEqual(len(updates), 1)
+        self.assertIn('learning_userwordstatus', updates[0])
+        self.assertTrue(updates[0].endswith(f'IN ({training_set.id})'))
+
+
+class JobQueueTest(LearningTestCase):
+    def test_missing_object_fails_without_retrying(self):
+        job = enqueue('master_set', {'user_id': self.user.id, 'set_id': 999999}, user=self.user)
+        with self.assertLogs('learning.jobs', 'WARNING'):
+            run_next_job('teste')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), ('failed', 1))
+        self.assertIn('Http404', job.error)
+
+    def test_transient_error_is_retried_then_done(self):
+        chamadas = []
+
+        def instavel(payload):
+            chamadas.append(payload)
+            if len(chamadas) == 1:
+                raise ConnectionError('banco fora do ar')
+            return {'ok': True}
+
+        with mock.patch.dict(TASKS, {'instavel': instavel}):
+            job = enqueue('instavel')
+            with self.assertLogs('learning.jobs', 'WARNING'):
+                run_next_job('teste')
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), ('queued', 1))
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            run_next_job('teste')
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.result), ('done', {'ok': True}))
+
+    def test_task_result_is_saved(self):
+        self._responder(self.words[0], certa=False)
+        set_id = TrainingSet.objects.get(user=self.user).id
+        resposta = self._post('master_set', {'set_id': set_id, 'background': True})
+        self.assertEqual(resposta.status_code, 202)
+        with self.captureOnCommitCallbacks(execute=True):
+            run_next_job('teste')
+        self.assertEqual(self.client.get(resposta.json()['status_url']).json()['result'], {'words_mastered': 1})
+
+    def test_settings_page_resets_synchronously_by_default(self):
+        # Sem workers a tarefa nunca sairia da fila: o reset pela fila é opcional
+        self.assertContains(self.client.get(reverse('settings')), 'JSON.stringify({ background: false })')
+        with override_settings(LEARNING_JOBS={'BACKGROUND_RESET': True}):
+            self.assertContains(self.client.get(reverse('settings')), 'JSON.stringify({ background: true })')
+
+
+class DailyDeckTest(LearningTestCase):
+    def setUp(self):
+        super().setUp()
+        # Quatro revisões vencidas (posições 0 a 3, em ordem de vencimento) e duas palavras novas
+        agora = timezone.now()
+        UserWordStatus.objects.bulk_create([
+            UserWordStatus(user=self.user, word=word, status='Em Revisao', next_review_date=agora - timedelta(hours=10 - i))
+            for i, word in enumerate(self.words[:4])
+        ])
+        build_daily_decks([self.user.id], timezone.localdate(), get_catalog().id_array())
+        self.revisoes = self.words[:4]
+
+    def test_deck_lists_reviews_then_new_words(self):
+        proximos = next_deck_word_ids(self.user, limite=10)
+        self.assertEqual(proximos[:4], [word.id for word in self.revisoes])
+        self.assertCountEqual(proximos[4:], [word.id for word in self.words[4:]])
+        self.assertEqual(cards_remaining(self.user), 6)
+
+    def test_answering_out_of_order_does_not_skip_earlier_cards(self):
+        self._responder(self.revisoes[3], certa=True)
+        self.assertEqual(cards_remaining(self.user), 5)
+        self.assertEqual(next_deck_word_ids(self.user, limite=3), [word.id for word in self.revisoes[:3]])
+
+        for word in self.revisoes[:3]:
+            self._responder(word, certa=True)
+        self.assertEqual(cards_remaining(self.user), 2)
+        self.assertEqual(DailyDeck.objects.get(user=self.user).cursor, 4)
+        self.assertCountEqual(next_deck_word_ids(self.user, limite=10), [word.id for word in self.words[4:]])
+
+    def test_answering_again_counts_once(self):
+        self._responder(self.revisoes[0], certa=False)
+        self._responder(self.revisoes[0], certa=True)
+        self.assertEqual(cards_remaining(self.user), 5)
+
+
+class SeenWordsTest(LearningTestCase):
+    def test_set_and_test_bits(self):
+        bits = bits_from_word_ids([1, 9])
+        self.assertEqual(is_seen(bits, [0, 1, 8, 9, 500]).tolist(), [False, True, False, True, False])
+        # Ids além do fim fazem o mapa crescer
+        bits = add_word_ids(bits, [500, 2])
+        self.assertEqual(is_seen(bits, [1, 2, 9, 500, 501]).tolist(), [True, True, True, True, False])
+        self.assertEqual(count_seen(bits, list(range(600))), 4)
+        self.assertEqual(add_word_ids(b'', []), b'')
+
+    def test_sample_unseen_only_returns_unseen_ids(self):
+        bits = bits_from_word_ids([2, 4, 6])
+        amostra = sample_unseen(bits, list(range(1, 9)), 10, rng=random.Random(1), excluir_ids=[8])
+        self.assertCountEqual(amostra, [1, 3, 5, 7])
+        self.assertEqual(sample_unseen(bits, [2, 4], 3), [])
+
+    def test_answers_mark_words_as_seen(self):
+        self._responder(self.words[0], certa=True)
+        self._responder(self.words[1], certa=False)
+        vistas = is_seen(get_seen_bits(self.user.id), [word.id for word in self.words]).tolist()
+        self.assertEqual(vistas, [True, True, False, False, False, False])
+        novas = sample_new_words(self.user, quantidade=10)
+        self.assertCountEqual([word.id for word in novas], [word.id for word in self.words[2:]])
+
+    def test_missing_map_is_rebuilt_from_statuses(self):
+        # Status de antes do mapa de bits (sem linha em SeenWords)
+        UserWordStatus.objects.create(user=self.user, word=self.words[3], status='Dominado')
+        self.assertEqual(is_seen(get_seen_bits(self.user.id), [self.words[3].id, self.words[4].id]).tolist(), [True, False])
+
+
+@override_settings(LEARNING_DB_REPLICAS={'ALIASES': ['replica'], 'PIN_SECONDS': 5})
+class ReplicaRoutingTest(LearningTestMixin, TransactionTestCase):
+    # O banco de testes é um só: o roteador real decide, e o espião anota o que iria para a
+    # "réplica" e executa no primário. TransactionTestCase: dentro da transação do TestCase
+    # o roteador mandaria toda leitura para o primário
+    def setUp(self):
+        super().setUp()
+        self.lidas_na_replica = []
+        decidir = PrimaryReplicaRouter.db_for_read
+
+        def espiao(router, model, **hints):
+            if decidir(router, model, **hints) != DEFAULT_DB_ALIAS:
+                self.lidas_na_replica.append(model)
+            return DEFAULT_DB_ALIAS
+        patcher = mock.patch.object(PrimaryReplicaRouter, 'db_for_read', espiao)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_dashboard_reads_from_replica(self):
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        self.assertIn(UserStats, self.lidas_na_replica)
+
+    def test_rebuilds_read_statuses_from_primary(self):
+        # Os recálculos gravam o resultado: UserWordStatus não pode vir da réplica atrasada
+        UserWordStatus.objects.create(user=self.user, word=self.words[0], status='Dominado')
+        token = _estado_atual.set(_EstadoDaRequisicao('replica', fixado=False))
+        try:
+            with read_from_replica():
+                recompute_user_stats([self.user.id])
+                rebuild_seen_words([self.user.id])
+        finally:
+            _estado_atual.reset(token)
+        self.assertNotIn(UserWordStatus, self.lidas_na_replica)
+        self.assertEqual(UserStats.objects.get(user=self.user).total, 1)
+
+    def test_get_requests_do_not_write(self):
+        # Sem UserStats nem SeenWords as telas calculam a partir dos status (na réplica), sem gravar
+        UserWordStatus.objects.create(user=self.user, word=self.words[0], status='Dominado')
+        resposta = self.client.get(reverse('dashboard'))
+        self.client.get(reverse('study_session'))
+
+        self.assertEqual(resposta.context['vocabulario_total'], 1)
+        self.assertEqual(resposta.context['palavras_vistas'], 1)
+        self.assertNotIn(COOKIE_DO_PRIMARIO, resposta.cookies)
+        self.assertFalse(UserStats.objects.filter(user=self.user).exists())
+        self.assertFalse(SeenWords.objects.filter(user=self.user).exists())
+
+    def test_write_pins_user_to_primary(self):
+        resposta = self._responder(self.words[0], certa=True)
+        self.assertIn(COOKIE_DO_PRIMARIO, resposta.cookies)
+
+        self.lidas_na_replica.clear()
+        self.client.get(reverse('dashboard'))
+        self.assertEqual(self.lidas_na_replica, [])
+        self.assertNotIn(COOKIE_DO_PRIMARIO, self.client.get(reverse('chart_data')).cookies)
+
+
+@skipUnless('replica' in settings.DATABASES, "Precisa de um alias 'replica' (ex.: --settings=core.settings_replica_sqlite)")
+class ReplicaSQLiteTest(LearningTestMixin, TransactionTestCase):
+    # Com a réplica de verdade (outro alias, outra conexão): as consultas são contadas em cada
+    # banco. '__all__' e não o nome do alias: o runner lê o atributo mesmo de classes puladas
+    databases = '__all__'
+
+    def _consultas(self, metodo, nome, **kwargs):
+        with CaptureQueriesContext(connections[DEFAULT_DB_ALIAS]) as primario, CaptureQueriesContext(connections['replica']) as replica:
+            resposta = getattr(self.client, metodo)(reverse(nome), **kwargs)
+        return resposta, self._do_progresso(primario), self._do_progresso(replica)
+
+    @staticmethod
+    def _do_progresso(captura):
+        # Consultas às tabelas do usuário; o catálogo (Word, CatalogVersion) é de todos e pode
+        # vir da réplica em qualquer caso (learning/catalog.py)
+        return [c['sql'] for c in captura.captured_queries if 'learning_word' not in c['sql'] and 'learning_catalogversion' not in c['sql']]
+
+    def test_dashboard_reads_go_to_the_replica(self):
+        resposta, primario, replica = self._consultas('get', 'dashboard')
+        self.assertEqual(resposta.status_code, 200)
+        self.assertTrue([sql for sql in replica if 'learning_userstats' in sql])
+        self.assertFalse([sql for sql in primario if 'learning_userstats' in sql])
+
+    def test_reads_after_a_write_stay_on_the_primary(self):
+        resposta, primario, replica = self._consultas(
+            'post', 'check_answer', data=json.dumps({'word_id': self.words[0].id, 'user_answer': 'palavra0'}), content_type='application/json',
+        )
+        self.assertIn(COOKIE_DO_PRIMARIO, resposta.cookies)
+        self.assertEqual(replica, [])
+
+        for nome in ('dashboard', 'chart_data'):
+            with self.subTest(nome):
+                resposta, primario, replica = self._consultas('get', nome)
+                self.assertEqual(replica, [])
+                self.assertTrue([sql for sql in primario if 'learning_' in sql])
+        self.assertEqual(resposta.json()['data'], [1])
+
+
+class ProgressCacheTest(LearningTestCase):
+    def test_unchanged_dashboard_answers_304(self):
+        resposta = self.client.get(reverse('dashboard'))
+        etag = resposta.headers['ETag']
+        self.assertEqual(self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        # Uma resposta troca a versão do progresso: o painel é montado de novo
+        self._responder(self.words[0], certa=True)
+        resposta = self.client.get(reverse('dashboard'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resposta.status_code, 200)
+        self.assertNotEqual(resposta.headers['ETag'], etag)
+        self.assertEqual(resposta.context['vocabulario_total'], 1)
+
+    def test_chart_etag_changes_with_progress(self):
+        etag = self.client.get(reverse('chart_data')).headers['ETag']
+        self.assertEqual(self.client.get(reverse('chart_data'), HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self._responder(self.words[0], certa=True)
+        self.assertEqual(self.client.get(reverse('chart_data'), HTTP_IF_NONE_MATCH=etag).json()['data'], [1])
+
+
+class TrainingSessionTest(LearningTestCase):
+    def test_finished_round_is_restarted_by_post_only(self):
+        self._responder(self.words[0], certa=False)
+        training_set = TrainingSet.objects.get(user=self.user)
+        url = reverse('training_session', args=[training_set.id])
+        self._responder(self.words[0], certa=True)
+
+        # Rodada concluída: o GET mostra a tela de conjunto completo e não grava nada
+        for _ in range(2):
+            self.assertTemplateUsed(self.client.get(url), 'training_set_mastered.html')
+        self.assertTrue(UserWordStatus.objects.get(user=self.user, word=self.words[0]).training_answered)
+
+        self.assertRedirects(self.client.post(url), url)
+        self.assertFalse(UserWordStatus.objects.get(user=self.user, word=self.words[0]).training_answered)
+        self.assertTemplateUsed(self.client.get(url), 'flashcard.html')
+
+
+class AnswerUpsertTest(LearningTestCase):
+    # Versão determinística (um só processo, banco de testes padrão) das garantias do ConcurrentAnswersTest
+    def test_one_open_set_per_user_and_day(self):
+        agora = timezone.now()
+        primeiro = get_or_create_today_set(self.user, agora)
+        self.assertEqual(get_or_create_today_set(self.user, agora).pk, primeiro.pk)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            TrainingSet.objects.create(user=self.user, open_date=agora.date())
+
+        # Dominar o conjunto o fecha (open_date vazio): o próximo erro do dia abre outro
+        self._responder(self.words[0], certa=False)
+        self._post('master_set', {'set_id': primeiro.pk})
+        self.assertIsNone(TrainingSet.objects.get(pk=primeiro.pk).open_date)
+        self.assertNotEqual(get_or_create_today_set(self.user, agora).pk, primeiro.pk)
+
+    def test_upsert_creates_missing_and_keeps_existing_statuses(self):
+        UserWordStatus.objects.create(user=self.user, word=self.words[0], status='Dominado', consecutive_correct_answers=3)
+        with transaction.atomic():
+            statuses = lock_or_create_statuses(self.user, [self.words[1].id, self.words[0].id, self.words[1].id])
+
+        self.assertEqual(sorted(statuses), [self.words[0].id, self.words[1].id])
+        self.assertEqual((statuses[self.words[0].id].status, statuses[self.words[0].id].consecutive_correct_answers), ('Dominado', 3))
+        self.assertEqual(statuses[self.words[1].id].status, 'Nao Visto')
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user).count(), 2)
+
+    def test_repeated_answers_keep_one_status(self):
+        for _ in range(3):
+            self._responder(self.words[0], certa=False)
+        self.assertEqual(UserWordStatus.objects.filter(user=self.user, word=self.words[0]).count(), 1)
+        self.assertEqual(TrainingSet.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(self._estatisticas()['total'], 1)
+
+
+class ExportProgressTest(LearningTestCase):
+    def setUp(self):
+        super().setUp()
+        for word in self.words[:5]:
+            self._responder(word, certa=word.id % 2 == 0)
+        outro = User.objects.create_user('outro', password='senha-de-teste')
+        UserWordStatus.objects.create(user=outro, word=self.words[5], status='Dominado')
+
+    @staticmethod
+    def _conteudo(response):
+        # Views assíncronas (LEARNING_ASYNC_API) devolvem um iterador assíncrono
+        if response.is_async:
+            async def ler():
+                return [chunk async for chunk in response.streaming_content]
+            return b''.join(async_to_sync(ler)())
+        return b''.join(response.streaming_content)
+
+    def test_pages_cover_every_row_once(self):
+        chunks = list(export_chunks(progress_queryset([self.user.id]), 'csv', chunk_size=2))
+        # Cabeçalho + três páginas (2 + 2 + 1 linhas)
+        self.assertEqual(len(chunks), 4)
+        linhas = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+        self.assertEqual([int(linha['word_id']) for linha in linhas], [word.id for word in self.words[:5]])
+
+    def test_endpoint_exports_only_own_rows_as_ndjson(self):
+        response = self.client.get(reverse('export_progress'), {'format': 'ndjson'})
+        linhas = [json.loads(linha) for linha in self._conteudo(response).decode().splitlines()]
+        self.assertEqual(len(linhas), 5)
+        self.assertEqual(linhas[0]['text_english'], self.words[0].text_english)
+        self.assertIn('X-Export-Started-At', response.headers)
+
+    def test_gzip_and_updated_since(self):
+        response = self.client.get(reverse('export_progress'), HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(gzip.decompress(self._conteudo(response)).decode().splitlines()), 6)
+
+        depois = timezone.now()
+        UserWordStatus.objects.filter(user=self.user, word=self.words[0]).update(updated_at=depois + timedelta(seconds=1))
+        response = self.client.get(reverse('export_progress'), {'updated_since': depois.isoformat()})
+        linhas = list(csv.DictReader(io.StringIO(self._conteudo(response).decode())))
+        self.assertEqual([int(linha['word_id']) for linha in linhas], [self.words[0].id])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get(reverse('export_progress'), {'format': 'xml'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('export_progress'), {'updated_since': 'ontem'}).status_code, 400)
+
+
+class DistractorsTest(LearningTestCase):
+    PALAVRAS = 0
+    TRADUCOES = {
+        'house': ('casa', 'lar'), 'cottage': ('Casa', None), 'home': ('lar', None), 'houses': ('casas', None),
+        'coat': ('casaco', None), 'case': ('caso', None), 'hunt': ('caça', None), 'box': ('caixa', None),
+        'cat': ('gato', None), 'table': ('mesa', None), 'dog': ('cachorro', None),
+    }
+
+    def setUp(self):
+        super().setUp()
+        # Pelo save(), que calcula as respostas aceitas (sinônimos incluídos)
+        self.words = {
+            ingles: Word.objects.create(text_english=ingles, text_portuguese=traducao, synonyms_portuguese=sinonimos, complexity=len(traducao))
+            for ingles, (traducao, sinonimos) in self.TRADUCOES.items()
+        }
+        self.catalogo = get_catalog(verificar_versao=True)
+        self.entries = [self.catalogo.get(word_id) for word_id in self.catalogo]
+
+    def test_never_offers_accepted_answers(self):
+        casa = self.words['house'].id
+        # Pedindo todos os candidatos: sobram as outras palavras menos 'Casa' (mesma tradução) e 'lar' (sinônimo)
+        distratores = compute_distractors(self.entries, quantidade=len(self.words))[casa]
+        textos = [self.catalogo.get(word_id).text_portuguese for word_id in distratores]
+        self.assertEqual(len(distratores), len(self.words) - 3)
+        self.assertNotIn('Casa', textos)
+        self.assertNotIn('lar', textos)
+        self.assertIn(textos[0], {'casas', 'casaco', 'caso', 'caça'})
+
+    def test_incremental_build_matches_full_build(self):
+        completo = compute_distractors(self.entries, quantidade=4, janela=3)
+        alguns = [self.words['house'].id, self.words['dog'].id]
+        self.assertEqual(compute_distractors(self.entries, alguns, quantidade=4, janela=3), {word_id: completo[word_id] for word_id in alguns})
+
+    @override_settings(LEARNING_DISTRACTORS={'CHOICES': 3, 'STORED': 5})
+    def test_choices_include_the_answer_and_distractors(self):
+        self.assertEqual(rebuild_distractors(), len(self.words))
+        casa = self.catalogo.get(self.words['house'].id)
+        opcoes = choices_for([casa], rng=random.Random(1))[casa.id]
+        self.assertEqual(len(opcoes), 4)
+        self.assertIn('casa', opcoes)
+        self.assertEqual(len({normalize_answer(texto) for texto in opcoes}), 4)
+        self.assertNotIn('lar', opcoes)
+
+        resposta = self.client.get(reverse('next_cards'), {'choices': 1, 'limit': 50})
+        cards = resposta.json()['cards']
+        self.assertEqual(len(cards), len(self.words))
+        for card in cards:
+            self.assertEqual(len(card['choices']), 4)
+            self.assertIn(self.catalogo.get(card['word_id']).text_portuguese, card['choices'])
+
+    def test_words_without_distractors_fall_back_to_typed_answer(self):
+        resposta = self.client.get(reverse('next_cards'), {'choices': 1, 'limit': 50})
+        self.assertTrue(all(card['choices'] is None for card in resposta.json()['cards']))
@@ -0,0 +1,74 @@
+# learning/training.py
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.shortcuts import get_object_or_404
+from .models import DailyMasteryLog, TrainingSet, UserWordStatus
+from .progress import add_daily_progress, learned_from_delta
+from .progress_cache import bump_progress_version
+from .scheduling import get_scheduler
+from .stats import apply_stats_delta
+
+
+class TrainingProgress:
+    __slots__ = ('total', 'respondidas', 'pendentes')
+
+    def __init__(self, total, respondidas, pendentes):
+        self.total = total
+        self.respondidas = respondidas
+        # ids das palavras (word_id) que ainda faltam acertar nesta rodada
+        self.pendentes = pendentes
+
+
+def training_progress(training_set):
+    # Uma única consulta sobre o índice (training_set, training_answered, word):
+    # um conjunto de treino tem no máximo as palavras erradas de um dia
+    linhas = UserWordStatus.objects.filter(training_set=training_set).values_list('word_id', 'training_answered')
+    pendentes = [word_id for word_id, respondida in linhas if not respondida]
+    return TrainingProgress(len(linhas), len(linhas) - len(pendentes), pendentes)
+
+
+def restart_training_round(training_set, now):
+    # Zera o progresso da rodada (botão "Treinar de novo" da tela de conjunto completo)
+    return UserWordStatus.objects.filter(training_set=training_set).update(training_answered=False, updated_at=now)
+
+
+def master_training_set(user, set_id, now):
+    # Número constante de comandos SQL, independente do tamanho do conjunto.
+    # O SELECT ... FOR UPDATE no conjunto serializa cliques duplicados: o segundo
+    # encontra o conjunto já vazio e não conta as palavras de novo.
+    # Devolve quantas palavras passaram a 'Dominado'.
+    with transaction.atomic():
+        training_set = get_object_or_404(TrainingSet.objects.select_for_update(), id=set_id, user=user)
+        palavras_do_conjunto = UserWordStatus.objects.filter(training_set=training_set)
+        # Contagem por status antes do UPDATE, para o delta das estatísticas do painel
+        antes = palavras_do_conjunto.aggregate(
+            total=Count('id'),
+            known_first_try=Count('id', filter=Q(status='Acertou de Primeira')),
+            mastered=Count('id', filter=Q(status='Dominado')),
+        )
+        word_count = palavras_do_conjunto.update(
+            status='Dominado',
+            training_set=None,
+            consecutive_correct_answers=1,
+            training_answered=False,
+            next_review_date=get_scheduler().next_review(1, True, now),
+            updated_at=now,
+        )
+        if word_count > 0:
+            # Upsert atômico: o incremento é feito pelo banco (F), não em Python
+            DailyMasteryLog.objects.get_or_create(user=user, date=now.date())
+            DailyMasteryLog.objects.filter(user=user, date=now.date()).update(
+                mastered_words_count=F('mastered_words_count') + word_count
+            )
+            # Todas as palavras saem do conjunto e passam a 'Dominado'
+            delta = {
+                'in_review': -word_count,
+                'mastered': word_count - antes['mastered'],
+                'known_first_try': -antes['known_first_try'],
+            }
+            apply_stats_delta(user.id, delta)
+            add_daily_progress(user.id, now.date(), words_learned=learned_from_delta(delta))
+        TrainingSet.objects.filter(pk=training_set.pk).update(is_mastered=True, open_date=None)
+        bump_progress_version(user.id)
+    return word_count
@@ -1,5 +1,9 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, views
+
+# Com LEARNING_ASYNC_API = True as APIs JSON abaixo usam as views assíncronas (servidas nativamente pelo ASGI)
+api_views = async_views if getattr(settings, 'LEARNING_ASYNC_API', False) else views
 
 urlpatterns = [
     # Esta rota corresponde à página inicial do nosso site (ex: http://127.0.0.1:8000/)
@@ -21,14 +25,29 @@ urlpatterns = [
     # --- ROTAS DE API ---
     
     # API PARA VERIFICAR A RESPOSTA DO USUÁRIO (durante sessão de estudo ou treino)
-    path('api/check-answer/', views.CheckAnswerView.as_view(), name='check_answer'),
+    path('api/check-answer/', api_views.CheckAnswerView.as_view(), name='check_answer'),
+
+    # API PARA VERIFICAR VÁRIAS RESPOSTAS DE UMA VEZ (respostas guardadas em buffer pelo cliente)
+    path('api/check-answers/', views.CheckAnswersBatchView.as_view(), name='check_answers_batch'),
+
+    # API PARA BUSCAR UM LOTE DOS PRÓXIMOS CARTÕES (fila local do flashcard)
+    path('api/next-cards/', views.NextCardsView.as_view(), name='next_cards'),
 
     # API PARA MARCAR UMA PALAVRA COMO CORRETA MANUALMENTE
-    path('api/mark-as-correct/', views.MarkAsCorrectView.as_view(), name='mark_as_correct'),
+    path('api/mark-as-correct/', api_views.MarkAsCorrectView.as_view(), name='mark_as_correct'),
 
     # API PARA MARCAR UM CONJUNTO COMO DOMINADO
-    path('api/master-set/', views.MasterSetView.as_view(), name='master_set'),
+    path('api/master-set/', api_views.MasterSetView.as_view(), name='master_set'),
 
     # API PARA OBTER OS DADOS DO GRÁFICO DO PAINEL
-    path('api/chart-data/', views.DashboardChartDataView.as_view(), name='chart_data'),
+    path('api/chart-data/', api_views.DashboardChartDataView.as_view(), name='chart_data'),
+
+    # API PARA EXPORTAR O PROGRESSO (CSV ou NDJSON em streaming, ?updated_since= para exportações incrementais)
+    path('api/export-progress/', api_views.ExportProgressView.as_view(), name='export_progress'),
+
+    # API PARA ACOMPANHAR UMA TAREFA EM SEGUNDO PLANO (reset, dominar conjunto, importação...)
+    path('api/jobs/<int:job_id>/', views.JobStatusView.as_view(), name='job_status'),
+
+    # API DE MÉTRICAS (formato Prometheus, ou JSON com ?format=json), só para a equipe
+    path('api/metrics/', views.MetricsView.as_view(), name='metrics'),
 ]
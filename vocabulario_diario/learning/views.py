@@ -1,79 +1,117 @@
 # learning/views.py
 
 import json
-from datetime import timedelta
+import random
+from django.db import transaction
 from django.utils import timezone
-from django.shortcuts import render, get_object_or_404
+from django.utils.dateparse import parse_datetime
+from django.shortcuts import redirect, render, get_object_or_404
+from django.urls import reverse
 from django.views.generic import TemplateView, View
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import JsonResponse
-from django.db.models import Count
-from django.db.models.functions import TruncDate
-from .models import Word, UserWordStatus, TrainingSet, DailyMasteryLog
+from django.http import HttpResponse, HttpResponseForbidden, JsonResponse
+from django.db.models import Count, Subquery
+from .models import UserWordStatus, TrainingSet, DailyMasteryLog, DailyProgress, Job
+from .catalog import get_catalog, get_word_or_404
+from .decks import advance_deck, cards_remaining, next_deck_word_ids
+from .distractors import choices_for
+from .export import export_chunks, export_response, parse_export_request, progress_queryset
+from .jobs import enqueue, job_as_dict
+from .metrics import metrics_authorized, registry
+from .answers import answer_word, apply_answer, get_or_create_today_set, grade_answer, is_new_status, lock_or_create_statuses, mark_word_as_correct
+from .progress_cache import CACHE_DO_GRAFICO, CACHE_DO_PAINEL, CACHE_DOS_TREINOS, bump_progress_version
+from .routers import ReplicaReadMixin
+from .progress import Answer, cumulative_chart_data, learned_from_delta, record_answers
+from .sampling import sample_new_words
+from .seen import count_seen, get_seen_bits, mark_seen
+from .stats import apply_stats_delta, get_user_stats, stats_delta, stats_snapshot, vocabulary_total
+from .training import master_training_set, restart_training_round, training_progress
 
 class HomeView(LoginRequiredMixin, TemplateView):
     template_name = 'home.html'
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # Lido do baralho do dia (tamanho - respondidos), sem contar nada nas tabelas de status
+        context['cartoes_restantes'] = cards_remaining(self.request.user)
+        return context
+
 class StudySessionView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         user = request.user
-        palavras_para_revisar = UserWordStatus.objects.filter(
-            user=user, status__in=['Em Revisao', 'Dominado'], next_review_date__lte=timezone.now()
-        ).order_by('next_review_date')
         word_to_study = None
-        if palavras_para_revisar.exists():
-            word_to_study = palavras_para_revisar.first().word
+        # O próximo cartão do baralho do dia (montado à noite pelo build_daily_decks); sem
+        # baralho, ou com ele esgotado, escolhe na hora: fila de revisão e depois palavra nova
+        word_ids_do_baralho = next_deck_word_ids(user)
+        if word_ids_do_baralho:
+            word_to_study = get_catalog().get(word_ids_do_baralho[0])
         else:
-            palavras_ja_vistas_ids = UserWordStatus.objects.filter(user=user).values_list('word__id', flat=True)
-            palavra_nova = Word.objects.exclude(id__in=palavras_ja_vistas_ids).order_by('?').first()
-            if palavra_nova:
-                word_to_study = palavra_nova
+            # Um único SELECT ... LIMIT 1 pelo índice da fila; os dados da palavra vêm do cache do catálogo
+            word_id_para_revisar = UserWordStatus.objects.due_for_review(user).values_list('word_id', flat=True).first()
+            if word_id_para_revisar:
+                word_to_study = get_catalog().get(word_id_para_revisar)
+            else:
+                # Sorteio de uma palavra nova sem ORDER BY RAND() nem lista de ids já vistos
+                palavras_novas = sample_new_words(user)
+                if palavras_novas:
+                    word_to_study = palavras_novas[0]
         if not word_to_study:
             return render(request, 'session_finished.html')
-        context = {'word': word_to_study, 'is_training_session': False}
+        # Opções do modo de múltipla escolha: uma leitura pela chave primária em WordDistractors
+        context = {'word': word_to_study, 'choices': choices_for([word_to_study]).get(word_to_study.id), 'is_training_session': False}
         return render(request, 'flashcard.html', context)
 
-class TrainingSetListView(LoginRequiredMixin, View):
+class TrainingSetListView(LoginRequiredMixin, ReplicaReadMixin, View):
+    @CACHE_DOS_TREINOS.conditional
     def get(self, request, *args, **kwargs):
-        user = request.user
-        training_sets = TrainingSet.objects.filter(
-            user=user, 
-            is_mastered=False,
-            words__isnull=False
-        ).distinct().order_by('creation_date')
+        context = CACHE_DOS_TREINOS.get_or_build(request, lambda: self._contexto(request.user))
+        return render(request, 'training_set_list.html', context)
+
+    @staticmethod
+    def _contexto(user):
+        hoje = timezone.now().date()
+        # Uma única consulta: conjuntos pendentes com o número de palavras de cada um
+        # (conjuntos vazios saem pelo HAVING) e o progresso de hoje como subconsulta.
+        registro_do_dia = DailyMasteryLog.objects.filter(user=user, date=hoje)
+        progresso_do_dia = registro_do_dia.values('mastered_words_count')[:1]
+        training_sets = list(
+            TrainingSet.objects.filter(user=user, is_mastered=False)
+            .annotate(word_count=Count('words'), progresso_hoje=Subquery(progresso_do_dia))
+            .filter(word_count__gt=0)
+            .order_by('creation_date')
+        )
         daily_goal = user.profile.daily_goal
-        log_hoje = DailyMasteryLog.objects.filter(user=user, date=timezone.now().date()).first()
-        progresso_hoje = log_hoje.mastered_words_count if log_hoje else 0
+        if training_sets:
+            progresso_hoje = training_sets[0].progresso_hoje or 0
+        else:
+            # Sem conjuntos pendentes a subconsulta não volta; busca o registro de hoje pela chave única
+            progresso_hoje = registro_do_dia.values_list('mastered_words_count', flat=True).first() or 0
         progresso_percentagem = int((progresso_hoje / daily_goal) * 100) if daily_goal > 0 else 0
         if progresso_percentagem > 100:
             progresso_percentagem = 100
-        context = {'training_sets': training_sets, 'daily_goal': daily_goal, 'progresso_hoje': progresso_hoje, 'progresso_percentagem': progresso_percentagem}
-        return render(request, 'training_set_list.html', context)
+        return {'training_sets': training_sets, 'daily_goal': daily_goal, 'progresso_hoje': progresso_hoje, 'progresso_percentagem': progresso_percentagem}
 
 class TrainingSessionView(LoginRequiredMixin, View):
     def get(self, request, *args, **kwargs):
         user = request.user
         set_id = kwargs.get('set_id')
         training_set = get_object_or_404(TrainingSet, id=set_id, user=user)
-        palavras_para_treinar = UserWordStatus.objects.filter(training_set=training_set)
-        
-        session_key = f'training_set_{set_id}_correct_words'
-        palavras_corretas_na_sessao = request.session.get(session_key, [])
-        palavras_pendentes = palavras_para_treinar.exclude(word__id__in=palavras_corretas_na_sessao)
 
         # --- LÓGICA DO CONTADOR ADICIONADA AQUI ---
-        total_palavras_no_conjunto = palavras_para_treinar.count()
-        palavras_respondidas = len(palavras_corretas_na_sessao)
+        # Total, respondidas e pendentes saem de uma única consulta (coberta pelo índice de progresso)
+        progresso = training_progress(training_set)
+        total_palavras_no_conjunto = progresso.total
+        palavras_respondidas = progresso.respondidas
 
-        if not palavras_pendentes.exists():
+        if not progresso.pendentes:
+            # Rodada concluída; o GET só lê: recomeçar o treino é o POST abaixo
             context = {'training_set': training_set}
-            request.session.pop(session_key, None)
             return render(request, 'training_set_mastered.html', context)
 
-        palavra_selecionada_status = palavras_pendentes.order_by('?').first()
-        word_to_study = palavra_selecionada_status.word
+        word_to_study = get_catalog().get(random.choice(progresso.pendentes))
         context = {
             'word': word_to_study,
+            'choices': choices_for([word_to_study]).get(word_to_study.id),
             'is_training_session': True,
             'set_id': set_id,
             'total_palavras_no_conjunto': total_palavras_no_conjunto,
@@ -81,101 +119,230 @@ class TrainingSessionView(LoginRequiredMixin, View):
         }
         return render(request, 'flashcard.html', context)
 
-class DashboardView(LoginRequiredMixin, View):
+    def post(self, request, *args, **kwargs):
+        # "Treinar de novo": zera a rodada e volta para o treino do conjunto
+        training_set = get_object_or_404(TrainingSet, id=kwargs.get('set_id'), user=request.user)
+        restart_training_round(training_set, timezone.now())
+        return redirect('training_session', set_id=training_set.id)
+
+class NextCardsView(LoginRequiredMixin, View):
+    # Devolve um lote dos próximos cartões (sessão de estudo ou de treino) para o
+    # flashcard.html manter uma fila local, em vez de recarregar a página a cada cartão.
+    # Com ?choices=1 cada cartão traz as opções da múltipla escolha (None: resposta digitada).
+    LIMITE_PADRAO = 10
+    LIMITE_MAXIMO = 50
+
     def get(self, request, *args, **kwargs):
         user = request.user
-        palavras_ja_sabe = UserWordStatus.objects.filter(user=user, status='Acertou de Primeira').count()
-        palavras_dominadas = UserWordStatus.objects.filter(user=user, status='Dominado').count()
-        palavras_em_revisao = UserWordStatus.objects.filter(user=user, training_set__is_mastered=False).count()
-        vocabulario_total = palavras_ja_sabe + palavras_dominadas
-        context = {'palavras_ja_sabe': palavras_ja_sabe, 'palavras_aprendidas_com_esforco': palavras_dominadas, 'palavras_em_revisao': palavras_em_revisao, 'vocabulario_total': vocabulario_total}
+        try:
+            limite = int(request.GET.get('limit', self.LIMITE_PADRAO))
+            # Ids que o cliente já tem na fila (ou na tela), para não virem repetidos
+            excluir_ids = [int(i) for i in request.GET.get('exclude', '').split(',') if i]
+            set_id = int(request.GET['set_id']) if request.GET.get('set_id') else None
+        except ValueError:
+            return JsonResponse({'error': 'Parâmetros inválidos.'}, status=400)
+        if limite < 1:
+            return JsonResponse({'error': 'Parâmetros inválidos.'}, status=400)
+        limite = min(limite, self.LIMITE_MAXIMO)
+
+        if set_id is not None:
+            training_set = get_object_or_404(TrainingSet, id=set_id, user=user)
+            progresso = training_progress(training_set)
+            excluir = set(excluir_ids)
+            pendentes = [word_id for word_id in progresso.pendentes if word_id not in excluir]
+            words = list(get_catalog().in_bulk(random.sample(pendentes, min(limite, len(pendentes)))).values())
+            contadores = {
+                'total_palavras_no_conjunto': progresso.total,
+                'palavras_respondidas': progresso.respondidas,
+            }
+        else:
+            # Cartões do baralho do dia primeiro; depois revisões vencidas (uma leitura pelo
+            # índice da fila), completadas com palavras novas
+            words = list(get_catalog().in_bulk(next_deck_word_ids(user, limite, excluir_ids)).values())
+            if len(words) < limite:
+                due_ids = UserWordStatus.objects.due_for_review(user).exclude(word__id__in=excluir_ids + [word.id for word in words]).values_list('word_id', flat=True)[:limite - len(words)]
+                words += list(get_catalog().in_bulk(list(due_ids)).values())
+            if len(words) < limite:
+                words += sample_new_words(user, limite - len(words), excluir_ids=excluir_ids + [word.id for word in words])
+            contadores = {}
+
+        cards = [{'word_id': word.id, 'text_english': word.text_english} for word in words]
+        if request.GET.get('choices'):
+            # Modo de múltipla escolha: as opções de todo o lote numa consulta (learning/distractors.py)
+            opcoes = choices_for(words)
+            for card in cards:
+                card['choices'] = opcoes.get(card['word_id'])
+        return JsonResponse({'cards': cards, **contadores})
+
+class DashboardView(LoginRequiredMixin, ReplicaReadMixin, View):
+    @CACHE_DO_PAINEL.conditional
+    def get(self, request, *args, **kwargs):
+        context = CACHE_DO_PAINEL.get_or_build(request, lambda: self._contexto(request.user))
         return render(request, 'dashboard.html', context)
 
+    @staticmethod
+    def _contexto(user):
+        # Uma leitura da linha de estatísticas do usuário, mantida pelas views de resposta
+        stats = get_user_stats(user)
+        palavras_ja_sabe = stats.known_first_try
+        palavras_dominadas = stats.mastered
+        palavras_em_revisao = stats.in_review
+        vocabulario_total = palavras_ja_sabe + palavras_dominadas
+        # Quanto do catálogo o usuário já viu, pelo mapa de bits (learning/seen.py)
+        catalogo = get_catalog()
+        palavras_vistas = count_seen(get_seen_bits(user.id), catalogo.id_array())
+        percentual_visto = round(100 * palavras_vistas / len(catalogo)) if len(catalogo) else 0
+        return {'palavras_ja_sabe': palavras_ja_sabe, 'palavras_aprendidas_com_esforco': palavras_dominadas, 'palavras_em_revisao': palavras_em_revisao, 'vocabulario_total': vocabulario_total,
+                'palavras_vistas': palavras_vistas, 'total_do_catalogo': len(catalogo), 'percentual_visto': percentual_visto}
+
 class CheckAnswerView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         data = json.loads(request.body)
         word_id = data.get('word_id')
         user_answer = data.get('user_answer')
-        word = get_object_or_404(Word, id=word_id)
-        is_correct = user_answer.strip().lower() == word.text_portuguese.strip().lower()
-        status, created = UserWordStatus.objects.get_or_create(user=request.user, word=word)
-        if is_correct:
-            if status.training_set:
-                status.consecutive_correct_answers += 1
-                set_id = status.training_set.id
-                session_key = f'training_set_{set_id}_correct_words'
-                palavras_corretas_na_sessao = request.session.get(session_key, [])
-                if status.word.id not in palavras_corretas_na_sessao:
-                    palavras_corretas_na_sessao.append(status.word.id)
-                request.session[session_key] = palavras_corretas_na_sessao
-            else:
-                status.status = 'Acertou de Primeira' if created else 'Dominado'
-                status.consecutive_correct_answers += 1
-                status.next_review_date = timezone.now() + timedelta(days=status.consecutive_correct_answers)
-                status.training_set = None
-        else:
-            status.status = 'Em Revisao'
-            status.consecutive_correct_answers = 0
-            status.next_review_date = timezone.now() + timedelta(minutes=10)
-            today_set = TrainingSet.objects.filter(user=request.user, creation_date=timezone.now().date(), is_mastered=False).first()
-            if not today_set:
-                today_set = TrainingSet.objects.create(user=request.user, creation_date=timezone.now().date())
-            status.training_set = today_set
-        status.save()
+        # A palavra vem do cache do catálogo: o único acesso ao banco é o do status
+        word = get_word_or_404(word_id)
+        is_correct = grade_answer(word, user_answer)
+        answer_word(request.user, word.id, is_correct, timezone.now())
         return JsonResponse({'correct': is_correct, 'correct_answer': word.text_portuguese})
 
+class CheckAnswersBatchView(LoginRequiredMixin, View):
+    # Versão em lote do CheckAnswerView: recebe {"answers": [{word_id, user_answer, answered_at}, ...]},
+    # corrige tudo com as mesmas regras e grava numa única transação (upsert em massa + bulk_update).
+    LIMITE_MAXIMO = 100
+
+    def post(self, request, *args, **kwargs):
+        try:
+            answers = json.loads(request.body).get('answers')
+        except (ValueError, AttributeError):
+            answers = None
+        if not isinstance(answers, list) or not answers or len(answers) > self.LIMITE_MAXIMO:
+            return JsonResponse({'error': f'Envie entre 1 e {self.LIMITE_MAXIMO} respostas em "answers".'}, status=400)
+
+        user = request.user
+        agora = timezone.now()
+        # Só os itens válidos: um item recusado não deixa linha de status para trás
+        words = get_catalog().in_bulk([
+            item['word_id'] for item in answers
+            if isinstance(item, dict) and isinstance(item.get('word_id'), int) and isinstance(item.get('user_answer'), str)
+        ])
+        results = []
+
+        with transaction.atomic():
+            # Cria os status que faltam e trava todos com um upsert e um SELECT ... FOR UPDATE
+            statuses = lock_or_create_statuses(user, words.keys())
+            today_set = []  # criado/buscado no máximo uma vez por lote
+
+            def get_today_set():
+                if not today_set:
+                    today_set.append(get_or_create_today_set(user, agora))
+                return today_set[0]
+
+            novos, alterados, campos_alterados = set(), {}, set()
+            delta = None
+            respostas = []
+            for item in answers:
+                item = item if isinstance(item, dict) else {}
+                word = words.get(item.get('word_id'))
+                user_answer = item.get('user_answer')
+                if word is None or not isinstance(user_answer, str):
+                    results.append({'word_id': item.get('word_id'), 'error': 'Resposta inválida.'})
+                    continue
+
+                # O horário informado pelo cliente (respostas guardadas em buffer) nunca fica no futuro
+                answered_at = self._parse_answered_at(item.get('answered_at'), agora)
+
+                status = statuses[word.id]
+                created = is_new_status(status)
+                if created:
+                    novos.add(word.id)
+
+                is_correct = grade_answer(word, user_answer)
+                antes = None if created else stats_snapshot(status)
+                campos = apply_answer(status, created, is_correct, answered_at, get_today_set)
+                delta_da_resposta = stats_delta(antes, stats_snapshot(status))
+                delta = {campo: valor + (delta or {}).get(campo, 0) for campo, valor in delta_da_resposta.items()}
+                respostas.append(Answer(word.id, 'correct' if is_correct else 'incorrect', answered_at, learned_from_delta(delta_da_resposta)))
+                alterados[status.pk] = status
+                campos_alterados.update(campos)
+                results.append({'word_id': word.id, 'correct': is_correct, 'correct_answer': word.text_portuguese})
+
+            if novos:
+                mark_seen(user.id, novos)
+            if alterados and campos_alterados:
+                # O bulk_update não aplica o auto_now: a data da gravação vai explícita
+                for status in alterados.values():
+                    status.updated_at = agora
+                UserWordStatus.objects.bulk_update(alterados.values(), [*campos_alterados, 'updated_at'])
+            if delta:
+                apply_stats_delta(user.id, delta)
+            record_answers(user.id, respostas)
+            bump_progress_version(user.id)
+            advance_deck(user.id, [resposta.word_id for resposta in respostas], agora)
+
+        return JsonResponse({'results': results})
+
+    @staticmethod
+    def _parse_answered_at(valor, agora):
+        try:
+            answered_at = parse_datetime(valor) if isinstance(valor, str) else None
+        except ValueError:
+            answered_at = None
+        if answered_at is None:
+            return agora
+        if timezone.is_naive(answered_at):
+            answered_at = timezone.make_aware(answered_at)
+        return min(answered_at, agora)
+
 class MarkAsCorrectView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         data = json.loads(request.body)
-        word_id = data.get('word_id')
-        status = get_object_or_404(UserWordStatus, user=request.user, word_id=word_id)
-        if status.training_set:
-            set_id = status.training_set.id
-            session_key = f'training_set_{set_id}_correct_words'
-            palavras_corretas_na_sessao = request.session.get(session_key, [])
-            if status.word.id not in palavras_corretas_na_sessao:
-                palavras_corretas_na_sessao.append(status.word.id)
-            request.session[session_key] = palavras_corretas_na_sessao
-        else:
-            status.status = 'Dominado'
-            status.consecutive_correct_answers = 1
-            status.next_review_date = timezone.now() + timedelta(days=1)
-            status.training_set = None
-        status.save()
+        mark_word_as_correct(request.user, data.get('word_id'), timezone.now())
         return JsonResponse({'status': 'success'})
 
 class MasterSetView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         data = json.loads(request.body)
         set_id = data.get('set_id')
-        training_set = get_object_or_404(TrainingSet, id=set_id, user=request.user)
-        word_count = UserWordStatus.objects.filter(training_set=training_set).count()
-        if word_count > 0:
-            log, created = DailyMasteryLog.objects.get_or_create(
-                user=request.user, date=timezone.now().date(), defaults={'mastered_words_count': 0}
-            )
-            log.mastered_words_count += word_count
-            log.save()
-        training_set.is_mastered = True
-        training_set.save()
-        words_in_set = UserWordStatus.objects.filter(training_set=training_set)
-        for status in words_in_set:
-            status.status = 'Dominado'
-            status.training_set = None
-            status.consecutive_correct_answers = 1
-            status.next_review_date = timezone.now() + timedelta(days=1)
-            status.save()
-        return JsonResponse({'status': 'success'})
+        if data.get('background'):
+            # Responde na hora; o resultado (words_mastered) sai no job_status
+            get_object_or_404(TrainingSet, id=set_id, user=request.user)
+            job = enqueue('master_set', {'user_id': request.user.id, 'set_id': set_id}, user=request.user)
+            return JsonResponse({'status': 'accepted', 'job_id': job.id, 'status_url': reverse('job_status', args=[job.id])}, status=202)
+        word_count = master_training_set(request.user, set_id, timezone.now())
+        return JsonResponse({'status': 'success', 'words_mastered': word_count})
 
-class DashboardChartDataView(LoginRequiredMixin, View):
+class DashboardChartDataView(LoginRequiredMixin, ReplicaReadMixin, View):
+    @CACHE_DO_GRAFICO.conditional
     def get(self, request, *args, **kwargs):
         user = request.user
-        progress_data = UserWordStatus.objects.filter(user=user, status__in=['Acertou de Primeira', 'Dominado']).exclude(next_review_date__isnull=True).annotate(date=TruncDate('next_review_date')).values('date').annotate(words_learned_on_day=Count('id')).order_by('date')
-        labels, cumulative_data, total_learned = [], [], 0
-        for entry in progress_data:
-            if entry['date']:
-                total_learned += entry['words_learned_on_day']
-                labels.append(entry['date'].strftime('%d/%m/%Y'))
-                cumulative_data.append(total_learned)
-        data = {'labels': labels, 'data': cumulative_data}
-        return JsonResponse(data)
\ No newline at end of file
+        # Lê só o resumo diário (uma linha por dia com atividade), sem varrer os status do usuário
+        progress_data = DailyProgress.objects.filter(user=user).exclude(words_learned=0).order_by('date').values_list('date', 'words_learned')
+        data = CACHE_DO_GRAFICO.get_or_build(request, lambda: cumulative_chart_data(progress_data, vocabulary_total(user)))
+        return JsonResponse(data)
+
+class JobStatusView(LoginRequiredMixin, View):
+    # Andamento de uma tarefa em segundo plano (learning/jobs.py): só o dono ou a equipe consultam
+    def get(self, request, job_id, *args, **kwargs):
+        jobs = Job.objects.all() if request.user.is_staff else Job.objects.filter(user=request.user)
+        return JsonResponse(job_as_dict(get_object_or_404(jobs, id=job_id)))
+
+class ExportProgressView(LoginRequiredMixin, View):
+    # Progresso do usuário em CSV ou NDJSON, em streaming (learning/export.py)
+    def get(self, request, *args, **kwargs):
+        try:
+            formato, updated_since, gzip = parse_export_request(request)
+        except ValueError as erro:
+            return JsonResponse({'error': str(erro)}, status=400)
+        iniciada_em = timezone.now()
+        statuses = progress_queryset([request.user.id], updated_since)
+        return export_response(request, export_chunks(statuses, formato, gzip=gzip), formato, gzip, iniciada_em)
+
+class MetricsView(View):
+    # Métricas de SQL e tempo por view deste processo (learning/metrics.py), só para a equipe
+    def get(self, request, *args, **kwargs):
+        if not metrics_authorized(request):
+            return HttpResponseForbidden()
+        if request.GET.get('format') == 'json':
+            return JsonResponse(registry.as_dict())
+        return HttpResponse(registry.as_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
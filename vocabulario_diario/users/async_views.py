@@ -0,0 +1,32 @@
+# users/async_views.py
+
+# Versões assíncronas das APIs JSON de users/ (ver learning/async_views.py)
+
+import json
+from asgiref.sync import sync_to_async
+from django.contrib.auth import alogout
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views import View
+from learning.async_views import AsyncLoginRequiredMixin
+from learning.reset import delete_user_progress, start_background_reset
+from .models import Profile
+
+
+class ResetProgressView(AsyncLoginRequiredMixin, View):
+    async def post(self, request, *args, **kwargs):
+        data = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+        if data.get('background'):
+            job = await sync_to_async(start_background_reset)(request.user)
+        else:
+            await sync_to_async(delete_user_progress)(request.user.id)
+        await Profile.objects.aupdate_or_create(user=request.user, defaults={'daily_goal': 10})
+        if data.get('background'):
+            return JsonResponse({'status': 'accepted', 'message': 'Reinício do progresso iniciado.', 'job_id': job.id, 'status_url': reverse('job_status', args=[job.id])}, status=202)
+        return JsonResponse({'status': 'success', 'message': 'Progresso reiniciado com sucesso.'})
+
+
+class LogoutAPIView(AsyncLoginRequiredMixin, View):
+    async def post(self, request, *args, **kwargs):
+        await alogout(request)
+        return JsonResponse({'status': 'success', 'message': 'Logout realizado com sucesso.'})
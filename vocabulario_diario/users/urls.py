@@ -1,10 +1,15 @@
+from django.conf import settings
 from django.urls import path
 from . import views  # Importa as views do app 'users'
+from . import async_views
 from . import views as user_views # Renomeamos nossas views para evitar conflito de nome
 from django.contrib.auth import views as auth_views # Importamos as views de autenticação do Django
 
 
 
+# Com LEARNING_ASYNC_API = True as APIs JSON usam as views assíncronas (ver learning/urls.py)
+api_views = async_views if getattr(settings, 'LEARNING_ASYNC_API', False) else user_views
+
 urlpatterns = [
     # O Django já sabe que estamos dentro de "/contas/".
     # Então, esta linha corresponde à URL final "/contas/cadastro/".
@@ -23,8 +28,8 @@ urlpatterns = [
     path('configuracoes/', user_views.SettingsView.as_view(), name='settings'),
 
     # NOVA ROTA PARA A API DE RESET
-    path('api/reset-progress/', user_views.ResetProgressView.as_view(), name='reset_progress'),
+    path('api/reset-progress/', api_views.ResetProgressView.as_view(), name='reset_progress'),
 
     # NOVA ROTA PARA A API DE LOGOUT
-    path('api/logout/', user_views.LogoutAPIView.as_view(), name='api_logout'),
+    path('api/logout/', api_views.LogoutAPIView.as_view(), name='api_logout'),
 ]
\ No newline at end of file
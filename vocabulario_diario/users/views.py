@@ -1,13 +1,15 @@
 # users/views.py
 
+import json
 from django.shortcuts import render
 from django.contrib.auth.forms import UserCreationForm
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.views import generic, View
 from django.views.generic import UpdateView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.http import JsonResponse
-from learning.models import UserWordStatus, TrainingSet, DailyMasteryLog
+from learning.jobs import jobs_config
+from learning.reset import delete_user_progress, start_background_reset
 from .forms import ProfileForm
 from .models import Profile
 from django.contrib.auth import logout
@@ -27,6 +29,12 @@ class SettingsView(LoginRequiredMixin, UpdateView):
         profile, created = Profile.objects.get_or_create(user=self.request.user)
         return profile
 
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        # O reset pela fila só é pedido quando há workers (LEARNING_JOBS['BACKGROUND_RESET'])
+        context['reset_em_segundo_plano'] = jobs_config()['BACKGROUND_RESET']
+        return context
+
     def form_valid(self, form):
         from django.contrib import messages
         messages.success(self.request, 'A sua meta foi atualizada com sucesso!')
@@ -35,9 +43,10 @@ class SettingsView(LoginRequiredMixin, UpdateView):
 class ResetProgressView(LoginRequiredMixin, View):
     def post(self, request, *args, **kwargs):
         user_to_reset = request.user
-        UserWordStatus.objects.filter(user=user_to_reset).delete()
-        TrainingSet.objects.filter(user=user_to_reset).delete()
-        DailyMasteryLog.objects.filter(user=user_to_reset).delete()
+        data = json.loads(request.body) if request.content_type == 'application/json' and request.body else {}
+        # {"background": true}: responde na hora (202) e apaga em segundo plano
+        if not data.get('background'):
+            delete_user_progress(user_to_reset.id)
         
         try:
             profile = user_to_reset.profile
@@ -46,6 +55,9 @@ class ResetProgressView(LoginRequiredMixin, View):
         except Profile.DoesNotExist:
             Profile.objects.create(user=user_to_reset, daily_goal=10)
 
+        if data.get('background'):
+            job = start_background_reset(user_to_reset)
+            return JsonResponse({'status': 'accepted', 'message': 'Reinício do progresso iniciado.', 'job_id': job.id, 'status_url': reverse('job_status', args=[job.id])}, status=202)
         return JsonResponse({'status': 'success', 'message': 'Progresso reiniciado com sucesso.'})
    
     